@@ -1,58 +1,148 @@
+import asyncio
+import contextvars
+import functools
+import inspect
 import logging
-from typing import Any, Callable
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable
+
+_IMPORT_STARTED = time.perf_counter()
 
 from mcp.server.fastmcp import FastMCP
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
-from starlette.responses import StreamingResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
+from src import deltas, formats, ingest, live, metrics, paths, profiling, records, resources, upstream
+from src.paths import DEFAULT_HANDLE
+from src.batch import DEFAULT_SOURCE, AggregateSpec, parse_specs, run_aggregate, run_aggregate_columns, run_batch
 from src.download import (
-    get_avg_per_day, get_cc_csv, get_data_range, get_first_tweet_date, get_time_now, get_total_tweets,
-    get_tweets_by_15min, get_tweets_by_date, get_tweets_by_hour, get_tweets_by_week, get_tweets_by_weekday, get_utc_csv,
+    get_aggregate_columns, get_avg_per_day, get_bucket_delta, get_cc_csv, get_csv_artifact, get_data_range,
+    get_first_tweet_date, get_time_now, get_total_tweets, get_tweets_by_15min, get_tweets_by_date, get_tweets_by_hour,
+    get_tweets_by_week, get_tweets_by_weekday, get_utc_csv, get_week_stats, get_window_count_columns, get_window_counts,
+    warm_up,
 )
 from src.download_polymarket import (
-    get_avg_per_day_pm, get_cc_csv_pm, get_data_range_pm, get_first_tweet_date_pm, get_latest_counts_pm, get_time_now_pm,
-    get_total_tweets_pm, get_tweets_by_15min_pm, get_tweets_by_date_pm, get_tweets_by_hour_pm, get_tweets_by_week_pm,
-    get_tweets_by_weekday_pm, get_utc_csv_pm,
+    get_aggregate_columns_pm, get_avg_per_day_pm, get_bucket_delta_pm, get_cc_csv_pm, get_csv_artifact_pm, get_data_range_pm,
+    get_first_tweet_date_pm, get_latest_count_columns_pm, get_latest_counts_pm, get_time_now_pm, get_total_tweets_pm,
+    get_tweets_by_15min_pm, get_tweets_by_date_pm, get_tweets_by_hour_pm, get_tweets_by_week_pm, get_projection_pm,
+    get_tweets_by_weekday_pm, get_utc_csv_pm, get_week_stats_pm, get_window_count_columns_pm, get_window_counts_pm,
+    warm_up_pm,
 )
 
+WARMUP_ENV = "XT_WARMUP"
+STARTUP_SECONDS = "xt_startup_seconds"
+
 mcp = FastMCP(
     name="xtracker-mcp",
     instructions=(
         "This MCP server exposes tools that fetch and aggregate public tweet data "
-        "for handle `elonmusk` on platform `X` via the XTracker API."
+        "for handle `elonmusk` on platform `X` via the XTracker API. "
+        "Every data tool takes an optional `handle` argument to track another account. "
+        "CSV tools also take `format`: csv (default), json (column lists), arrow or npy (base64-encoded bytes)."
     ),
 )
 
 
 # ---------- MCP tools ----------
+# Set by profile_tool so the profiled tool's body runs on the profiled thread instead of the threadpool
+_inline_tools: contextvars.ContextVar[bool] = contextvars.ContextVar("xt_inline_tools", default=False)
+
+
+async def _fresh_then(keys: Iterable[ingest.Key], func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Refresh the (source, handle) snapshots in keys on the event loop (see src.ingest), then run the sync func in
+    the threadpool, where the pipeline answers from the snapshots resolved for this request.
+    """
+    await ingest.ensure_fresh(keys)
+    if _inline_tools.get():
+        return func(*args, **kwargs)
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+def _ingest_tool(*sources: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Turn a sync MCP tool into an async one that reads its snapshots like an HTTP route (see _ingest_first).
+    FastMCP calls sync tools inline on the event loop, where a blocking refresh would stall every other request.
+    Without explicit sources they follow the tool's `source` argument (default: the union).
+    """
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapped(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = bound.arguments
+            feeds = sources or ingest.feeds(values.get("source", DEFAULT_SOURCE))
+            try:
+                handle = paths.validate_handle(values.get("handle", DEFAULT_HANDLE))
+            except ValueError:
+                feeds = ()  # the tool body rejects the handle itself
+            keys = [] if values.get("force") else [(source, handle) for source in feeds]
+            return await _fresh_then(keys, func, *args, **kwargs)
+
+        return wrapped
+
+    return decorate
+
+
 @mcp.tool()
-def tweets_by_hour_grouped() -> str:
-    """Return normalized tweet counts grouped by hour (ET) as CSV text."""
-    return get_tweets_by_hour()
+@_ingest_tool("xtracker")
+def tweets_by_hour_grouped(handle: str = DEFAULT_HANDLE, format: str = formats.CSV) -> str | dict[str, Any]:
+    """Return normalized tweet counts grouped by hour (ET) as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns("hour", handle=handle), format)
+    return get_tweets_by_hour(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_date_grouped() -> str:
-    """Return tweet counts grouped by date (ET) as CSV text."""
-    return get_tweets_by_date()
+@_ingest_tool("xtracker")
+def tweets_by_date_grouped(
+    handle: str = DEFAULT_HANDLE, since: str | None = None, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts grouped by date (ET) as CSV text. With `since` (a cursor from a previous call, or an ISO timestamp) returns only the changed rows and a new cursor as JSON. `format`: csv (default), json, arrow or npy."""
+    if since is not None:
+        return get_bucket_delta("date", since, handle=handle)
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns("date", handle=handle), format)
+    return get_tweets_by_date(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_weekday_grouped() -> str:
-    """Return tweet counts grouped by weekday (ET) as CSV text."""
-    return get_tweets_by_weekday()
+@_ingest_tool("xtracker")
+def tweets_by_weekday_grouped(handle: str = DEFAULT_HANDLE, format: str = formats.CSV) -> str | dict[str, Any]:
+    """Return tweet counts grouped by weekday (ET) as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns("weekday", handle=handle), format)
+    return get_tweets_by_weekday(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_week_grouped(anchor: int = 4, utc: bool = False) -> str:
-    """Return tweet counts grouped by week (anchor weekday 0=Mon .. 6=Sun, default Friday noon ET) as CSV text."""
-    return get_tweets_by_week(anchor, utc)
+@_ingest_tool("xtracker")
+def tweets_by_week_grouped(
+    anchor: int = 4, utc: bool = False, handle: str = DEFAULT_HANDLE, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts grouped by week (anchor weekday 0=Mon .. 6=Sun, default Friday noon ET) as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns("week", anchor, utc, handle=handle), format)
+    return get_tweets_by_week(anchor, utc, handle=handle)
 
 
 @mcp.tool()
-def tweets_by_15min_grouped() -> str:
-    """Return tweet counts grouped into 15-minute buckets (ET) aligned to wall-clock quarter-hour boundaries as CSV text."""
-    return get_tweets_by_15min()
+@_ingest_tool("xtracker")
+def tweets_by_15min_grouped(
+    handle: str = DEFAULT_HANDLE, since: str | None = None, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts grouped into 15-minute buckets (ET) aligned to wall-clock quarter-hour boundaries as CSV text. With `since` (a cursor from a previous call, or an ISO timestamp) returns only the changed rows and a new cursor as JSON. `format`: csv (default), json, arrow or npy."""
+    if since is not None:
+        return get_bucket_delta("15min", since, handle=handle)
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns("15min", handle=handle), format)
+    return get_tweets_by_15min(handle=handle)
 
 
 # @mcp.tool()
@@ -62,128 +152,378 @@ def tweets_by_15min_grouped() -> str:
 
 
 @mcp.tool()
-def total_tweet_count() -> int:
+@_ingest_tool("xtracker")
+def total_tweet_count(handle: str = DEFAULT_HANDLE) -> int:
     """Return the total number of tweets."""
-    return get_total_tweets()
+    return get_total_tweets(handle=handle)
 
 
 @mcp.tool()
-def avg_tweets_per_day() -> float:
+@_ingest_tool("xtracker")
+def avg_tweets_per_day(handle: str = DEFAULT_HANDLE) -> float:
     """Return the average tweets per day."""
-    return get_avg_per_day()
+    return get_avg_per_day(handle=handle)
 
 
 @mcp.tool()
-def iso_first_tweet_date() -> str:
+@_ingest_tool("xtracker")
+def iso_first_tweet_date(handle: str = DEFAULT_HANDLE) -> str:
     """Return the ISO timestamp of the first tweet (ET)."""
-    return get_first_tweet_date()
+    return get_first_tweet_date(handle=handle)
 
 
 @mcp.tool()
-def iso_time_now() -> str:
+async def iso_time_now() -> str:
     """Return the current ET ISO timestamp."""
     return get_time_now()
 
 
 @mcp.tool()
-def data_timespan() -> int:
+@_ingest_tool("xtracker")
+def data_timespan(handle: str = DEFAULT_HANDLE) -> int:
     """Return the elapsed seconds between the first tweet and now (ET)."""
-    return get_data_range()
+    return get_data_range(handle=handle)
 
 
 @mcp.tool()
-def utc_csv_bytes() -> str:
+@_ingest_tool("xtracker")
+def week_count_stats(anchor: int | None = None, window: str | None = None, bracket_width: int = 20, handle: str = DEFAULT_HANDLE) -> list[dict[str, Any]]:
+    """
+    Return the distribution of complete anchored-week counts (anchor weekday 0=Mon .. 6=Sun at noon ET; all anchors if omitted):
+    quantiles, mean/stdev, min/max and bracket frequencies for full history ('all') and trailing 4/12/26/52 weeks.
+    """
+    return get_week_stats(anchor, window, bracket_width, handle=handle)
+
+
+@mcp.tool()
+@_ingest_tool("xtracker")
+def tweet_count_windows(
+    windows: list[list[str | None]], handle: str = DEFAULT_HANDLE, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts for many [start, end) windows (ISO timestamps, naive = ET, end null/'now' = now) as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_window_count_columns(windows, handle=handle), format)
+    return get_window_counts(windows, handle=handle)
+
+
+@mcp.tool()
+@_ingest_tool("xtracker")
+def utc_csv_bytes(handle: str = DEFAULT_HANDLE) -> str:
     """Return the utc_elonmusk.csv file as raw bytes."""
-    return get_utc_csv()
+    return get_utc_csv(handle=handle)
 
 
 @mcp.tool()
-def cc_csv_bytes() -> str:
+@_ingest_tool("xtracker")
+def cc_csv_bytes(handle: str = DEFAULT_HANDLE) -> str:
     """Return the cc_elonmusk.csv file (recent 6 months) as raw bytes."""
-    return get_cc_csv()
+    return get_cc_csv(handle=handle)
 
 
 # ---------- Polymarket MCP tools ----------
 @mcp.tool()
-def tweets_by_hour_grouped_pm() -> str:
-    """Return normalized tweet counts grouped by hour (ET) from Polymarket data as CSV text."""
-    return get_tweets_by_hour_pm()
+@_ingest_tool("polymarket")
+def tweets_by_hour_grouped_pm(handle: str = DEFAULT_HANDLE, format: str = formats.CSV) -> str | dict[str, Any]:
+    """Return normalized tweet counts grouped by hour (ET) from Polymarket data as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns_pm("hour", handle=handle), format)
+    return get_tweets_by_hour_pm(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_date_grouped_pm() -> str:
-    """Return tweet counts grouped by date (ET) from Polymarket data as CSV text."""
-    return get_tweets_by_date_pm()
+@_ingest_tool("polymarket")
+def tweets_by_date_grouped_pm(
+    handle: str = DEFAULT_HANDLE, since: str | None = None, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts grouped by date (ET) from Polymarket data as CSV text. With `since` (a cursor from a previous call, or an ISO timestamp) returns only the changed rows and a new cursor as JSON. `format`: csv (default), json, arrow or npy."""
+    if since is not None:
+        return get_bucket_delta_pm("date", since, handle=handle)
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns_pm("date", handle=handle), format)
+    return get_tweets_by_date_pm(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_weekday_grouped_pm() -> str:
-    """Return tweet counts grouped by weekday (ET) from Polymarket data as CSV text."""
-    return get_tweets_by_weekday_pm()
+@_ingest_tool("polymarket")
+def tweets_by_weekday_grouped_pm(handle: str = DEFAULT_HANDLE, format: str = formats.CSV) -> str | dict[str, Any]:
+    """Return tweet counts grouped by weekday (ET) from Polymarket data as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns_pm("weekday", handle=handle), format)
+    return get_tweets_by_weekday_pm(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_week_grouped_pm(anchor: int = 4, utc: bool = False) -> str:
-    """Return tweet counts grouped by week (anchor weekday 0=Mon .. 6=Sun, default Friday noon ET) from Polymarket data as CSV text."""
-    return get_tweets_by_week_pm(anchor, utc)
+@_ingest_tool("polymarket")
+def tweets_by_week_grouped_pm(
+    anchor: int = 4, utc: bool = False, handle: str = DEFAULT_HANDLE, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts grouped by week (anchor weekday 0=Mon .. 6=Sun, default Friday noon ET) from Polymarket data as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns_pm("week", anchor, utc, handle=handle), format)
+    return get_tweets_by_week_pm(anchor, utc, handle=handle)
 
 
 @mcp.tool()
-def latest_counts_pm() -> str:
-    """Return Tue/Fri counts and refresh weekly UTC CSVs from Polymarket data as CSV text."""
-    return get_latest_counts_pm()
+@_ingest_tool("polymarket")
+def latest_counts_pm(handle: str = DEFAULT_HANDLE, format: str = formats.CSV) -> str | dict[str, Any]:
+    """Return Tue/Fri counts and refresh weekly UTC CSVs from Polymarket data as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_latest_count_columns_pm(handle=handle), format)
+    return get_latest_counts_pm(handle=handle)
 
 
 @mcp.tool()
-def tweets_by_15min_grouped_pm() -> str:
-    """Return tweet counts grouped into 15-minute buckets (ET) from Polymarket data as CSV text."""
-    return get_tweets_by_15min_pm()
+@_ingest_tool("polymarket")
+def tweets_by_15min_grouped_pm(
+    handle: str = DEFAULT_HANDLE, since: str | None = None, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return tweet counts grouped into 15-minute buckets (ET) from Polymarket data as CSV text. With `since` (a cursor from a previous call, or an ISO timestamp) returns only the changed rows and a new cursor as JSON. `format`: csv (default), json, arrow or npy."""
+    if since is not None:
+        return get_bucket_delta_pm("15min", since, handle=handle)
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_aggregate_columns_pm("15min", handle=handle), format)
+    return get_tweets_by_15min_pm(handle=handle)
 
 
 @mcp.tool()
-def total_tweet_count_pm() -> int:
+@_ingest_tool("polymarket")
+def total_tweet_count_pm(handle: str = DEFAULT_HANDLE) -> int:
     """Return the total number of tweets from Polymarket data."""
-    return get_total_tweets_pm()
+    return get_total_tweets_pm(handle=handle)
 
 
 @mcp.tool()
-def avg_tweets_per_day_pm() -> float:
+@_ingest_tool("polymarket")
+def avg_tweets_per_day_pm(handle: str = DEFAULT_HANDLE) -> float:
     """Return the average tweets per day from Polymarket data."""
-    return get_avg_per_day_pm()
+    return get_avg_per_day_pm(handle=handle)
 
 
 @mcp.tool()
-def iso_first_tweet_date_pm() -> str:
+@_ingest_tool("polymarket")
+def iso_first_tweet_date_pm(handle: str = DEFAULT_HANDLE) -> str:
     """Return the ISO timestamp of the first tweet (ET) from Polymarket data."""
-    return get_first_tweet_date_pm()
+    return get_first_tweet_date_pm(handle=handle)
 
 
 @mcp.tool()
-def iso_time_now_pm() -> str:
+async def iso_time_now_pm() -> str:
     """Return the current ET ISO timestamp (Polymarket endpoint)."""
     return get_time_now_pm()
 
 
 @mcp.tool()
-def data_timespan_pm() -> int:
+@_ingest_tool("polymarket")
+def data_timespan_pm(handle: str = DEFAULT_HANDLE) -> int:
     """Return the elapsed seconds between the first tweet and now (ET) from Polymarket data."""
-    return get_data_range_pm()
+    return get_data_range_pm(handle=handle)
+
+
+@mcp.tool()
+@_ingest_tool("polymarket")
+def tweet_count_windows_pm(
+    windows: list[list[str | None]], handle: str = DEFAULT_HANDLE, format: str = formats.CSV,
+) -> str | dict[str, Any]:
+    """Return Polymarket tweet counts for many [start, end) windows (ISO timestamps, naive = ET, end null/'now' = now) as CSV text. `format`: csv (default), json, arrow or npy."""
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(get_window_count_columns_pm(windows, handle=handle), format)
+    return get_window_counts_pm(windows, handle=handle)
 
 
 @mcp.tool()
-def utc_csv_bytes_pm() -> str:
+@_ingest_tool("polymarket")
+def week_count_stats_pm(anchor: int | None = None, window: str | None = None, bracket_width: int = 20, handle: str = DEFAULT_HANDLE) -> list[dict[str, Any]]:
+    """
+    Return the distribution of complete anchored-week counts from Polymarket data (anchor weekday 0=Mon .. 6=Sun at noon ET;
+    all anchors if omitted): quantiles, mean/stdev, min/max and bracket frequencies for 'all' and trailing 4/12/26/52 weeks.
+    """
+    return get_week_stats_pm(anchor, window, bracket_width, handle=handle)
+
+
+@mcp.tool()
+@_ingest_tool("polymarket")
+def projected_week_count_pm(
+    anchor: int = 4, simulations: int = 10_000, bracket_width: int = 20, history_weeks: int = 12,
+    handle: str = DEFAULT_HANDLE,
+) -> dict[str, Any]:
+    """
+    Project the final tweet count of the current market week (anchor weekday 0=Mon .. 6=Sun at noon ET, default Friday)
+    from the partial count plus Monte Carlo simulations of the remaining window; returns quantiles and bracket probabilities.
+    """
+    return get_projection_pm(anchor, simulations, bracket_width, history_weeks, handle=handle)
+
+
+@mcp.tool()
+@_ingest_tool("polymarket")
+def utc_csv_bytes_pm(handle: str = DEFAULT_HANDLE) -> str:
     """Return the utc_elonmusk_pm.csv file from Polymarket data as raw bytes."""
-    return get_utc_csv_pm()
+    return get_utc_csv_pm(handle=handle)
 
 
 @mcp.tool()
-def cc_csv_bytes_pm() -> str:
+@_ingest_tool("polymarket")
+def cc_csv_bytes_pm(handle: str = DEFAULT_HANDLE) -> str:
     """Return the cc_elonmusk_pm.csv file (recent 6 months) from Polymarket data as raw bytes."""
-    return get_cc_csv_pm()
+    return get_cc_csv_pm(handle=handle)
+
+
+@mcp.tool()
+async def batch_aggregates(specs: list[dict[str, Any]], force: bool = False) -> dict[str, Any]:
+    """
+    Compute several aggregates in one call from a single loaded snapshot per source.
+    Each spec: kind (hour|weekday|date|week|15min|buckets|total|avg_per_day|first_tweet_date|data_span),
+    source (xtracker|polymarket|union), handle (default elonmusk), anchor (0..6), utc (bool), optional range [start, end) as ISO timestamps (naive = ET).
+    kind=buckets counts at any resolution ('1m', '5m', '15m', '1h', '4h', 'day', 'week', 'month', 'anchored_week'),
+    sparse unless dense=true.
+    Returns per-spec results (CSV text or scalar) with their cost in milliseconds.
+    """
+    parsed = parse_specs(specs)
+    keys = [] if force else [(source, spec.handle) for spec in parsed for source in ingest.feeds(spec.source)]
+    return await _fresh_then(keys, run_batch, parsed, force)
+
+
+@mcp.tool()
+@_ingest_tool()
+def aggregate(
+    kind: str,
+    source: str = DEFAULT_SOURCE,
+    anchor: int = 4,
+    utc: bool = False,
+    start: str | None = None,
+    end: str | None = None,
+    resolution: str = "15m",
+    dense: bool = False,
+    handle: str = DEFAULT_HANDLE,
+    format: str = formats.CSV,
+) -> int | float | str | dict[str, Any]:
+    """
+    Compute one aggregate (same kinds and fields as batch_aggregates) over xtracker, polymarket,
+    or the union of both feeds merged by tweet id (each tweet counted once). `format`: csv (default), json, arrow or npy.
+    """
+    spec = AggregateSpec.from_dict({
+        "kind": kind, "source": source, "handle": handle, "anchor": anchor, "utc": utc,
+        "start": start, "end": end, "resolution": resolution, "dense": dense,
+    })
+    if formats.parse_format(format) != formats.CSV:
+        return formats.tool_output(run_aggregate_columns(spec), format)
+    return run_aggregate(spec)
+
+
+@mcp.tool()
+async def profile_tool(tool: str, token: str, arguments: dict[str, Any] | None = None) -> str:
+    """Run another MCP tool under the profiler and return its hottest functions and wall/CPU split as CSV text."""
+    if not profiling.token_matches(token):
+        raise PermissionError("profiling requires a valid XT_PROFILE_TOKEN")
+    if tool == "profile_tool":
+        raise ValueError("profile_tool cannot profile itself")
+    inline_token = _inline_tools.set(True)
+    try:
+        _, report = await profiling.profile_awaitable(tool, mcp.call_tool(tool, arguments or {}))
+    finally:
+        _inline_tools.reset(inline_token)
+    profiling.persist(report)
+    return report.to_text()
+
+
+# ---------- MCP resources ----------
+resources.install(mcp)
 
 
 # ---------- HTTP app and routes ----------
 app = mcp.streamable_http_app()  # MCP routes live at /mcp/
+app.add_middleware(metrics.RouteMetricsMiddleware)
+app.add_middleware(upstream.StaleHeadersMiddleware)
+_mcp_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def lifespan(app_: Starlette) -> AsyncIterator[None]:
+    """
+    Create the download directories, optionally warm the in-memory snapshots, then run the MCP session manager.
+    Open live streams, the sanitize and upstream refresh pools and the ingestion HTTP client are closed on exit.
+    With XT_WARMUP=1 the last snapshot checkpoints are restored at boot; stale ones are refreshed concurrently in the
+    background on the event loop.
+    """
+    paths.ensure_dirs()
+    warmup: asyncio.Task | None = None
+    if os.environ.get(WARMUP_ENV, "").lower() in {"1", "true", "yes", "on"}:
+        started = time.perf_counter()
+        fresh = [warm_up(), warm_up_pm()]
+        if not all(fresh):
+            warmup = asyncio.create_task(ingest.refresh_all(DEFAULT_HANDLE))
+        metrics.set_gauge(STARTUP_SECONDS, time.perf_counter() - started, phase="warmup")
+    try:
+        async with _mcp_lifespan(app_):
+            yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        live.close_all()
+        records.shutdown_pool()
+        upstream.shutdown()
+        await ingest.aclose()
+
+
+app.router.lifespan_context = lifespan
+
+
+def _call(request: Request, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Invoke a route's backing callable, profiling it when asked to.
+    `?profile=1` (authenticated via the X-Profile-Token header) returns the profile report instead of the payload;
+    XT_PROFILE=1 profiles sampled calls, skipping any that arrive while another profile runs, and only persists
+    the reports under downloads/profiles/.
+    """
+    name = getattr(func, "__name__", str(func))
+    if _parse_bool_flag(request, "profile"):
+        if not profiling.token_matches(request.headers.get(profiling.TOKEN_HEADER)):
+            raise PermissionError(f"profiling requires a valid {profiling.TOKEN_HEADER} header")
+        _, report = profiling.profile_call(name, func, *args)
+        profiling.persist(report)
+        return report.to_text()
+    if profiling.env_sampled():
+        result, report = profiling.try_profile_call(name, func, *args)
+        if report is not None:
+            profiling.persist(report)
+        return result
+    return func(*args)
+
+
+def _ingest_first(handler: Callable[[Request], Response], *sources: str) -> Callable[[Request], Any]:
+    """
+    Refresh the snapshots a route reads on the event loop (see src.ingest), then run its sync handler in the
+    threadpool, where it finds them resolved. Without explicit sources they follow `?source=` (default: the union).
+    Forced refreshes and queries the handler rejects anyway go straight to the handler.
+    """
+    async def wrapped(request: Request) -> Response:
+        try:
+            force = _parse_bool_flag(request, "force")
+            handle = _parse_handle(request)
+            feeds = sources or ingest.feeds(request.query_params.get("source", DEFAULT_SOURCE))
+        except ValueError:
+            force, feeds = True, ()
+        return await _fresh_then(() if force else [(source, handle) for source in feeds], handler, request)
+
+    return wrapped
+
+
+def _error_response(request: Request, exc: Exception, *, json: bool = False, invalid: str = "invalid query") -> Response:
+    """
+    Map a route failure to its response: PermissionError 403, ValueError 400, UpstreamError 503, anything else a
+    logged 500. Text routes answer in text/plain, JSON routes with an {"error": ...} object.
+    """
+    if isinstance(exc, PermissionError):
+        status, message = 403, f"forbidden: {exc}"
+    elif isinstance(exc, ValueError):
+        status, message = 400, f"{invalid}: {exc}"
+    elif isinstance(exc, upstream.UpstreamError):
+        status, message = 503, f"upstream unavailable: {exc}"
+    else:
+        logging.getLogger(__name__).exception("Unhandled error in %s %s", request.method, request.url.path)
+        status, message = 500, (str(exc) if json else f"error: {exc}")
+    if json:
+        return JSONResponse({"error": message}, status_code=status)
+    return PlainTextResponse(message, status_code=status)
 
 
 def _make_stream_handler(func: Callable[[], Any]) -> Callable[[Request], StreamingResponse]:
@@ -194,14 +534,11 @@ def _make_stream_handler(func: Callable[[], Any]) -> Callable[[Request], Streami
 
     def handler(request: Request) -> StreamingResponse:
         try:
-            result = func()
+            result = _call(request, func)
             body = result if isinstance(result, (str, bytes)) else str(result)
-            return StreamingResponse(body, media_type="text/event-stream")
+            return StreamingResponse(iter((body,)), media_type="text/event-stream")
         except Exception as exc:
-            logging.getLogger(__name__).exception(
-                "Unhandled error in handler for %s", getattr(func, "__name__", str(func)),
-            )
-            return StreamingResponse(f"error: {exc}", status_code=500, media_type="text/event-stream")
+            return _error_response(request, exc)
 
     return handler
 
@@ -231,50 +568,329 @@ def _parse_bool_flag(request: Request, param: str, default: bool = False) -> boo
     raise ValueError(f"query parameter '{param}' must be a boolean (true/false)")
 
 
-def _make_force_stream_handler(func: Callable[[bool], Any]) -> Callable[[Request], StreamingResponse]:
+def _parse_handle(request: Request) -> str:
+    return paths.validate_handle(request.query_params.get("handle", DEFAULT_HANDLE))
+
+
+def _make_force_stream_handler(func: Callable[[bool, str], Any]) -> Callable[[Request], StreamingResponse]:
     def handler(request: Request) -> StreamingResponse:
         try:
             force = _parse_bool_flag(request, "force")
-            result = func(force)
+            handle = _parse_handle(request)
+            result = _call(request, func, force, handle)
             body = result if isinstance(result, (str, bytes)) else str(result)
-            return StreamingResponse(body, media_type="text/event-stream")
-        except ValueError as exc:
-            return StreamingResponse(f"invalid query: {exc}", status_code=400, media_type="text/event-stream")
+            return StreamingResponse(iter((body,)), media_type="text/event-stream")
         except Exception as exc:
-            logging.getLogger(__name__).exception(
-                "Unhandled error in handler for %s", getattr(func, "__name__", str(func)),
-            )
-            return StreamingResponse(f"error: {exc}", status_code=500, media_type="text/event-stream")
+            return _error_response(request, exc)
 
     return handler
 
 
-def _week_handler_factory(func: Callable[[int, bool, bool], str]) -> Callable[[Request], StreamingResponse]:
+def _artifact_handler_factory(
+    func: Callable[[str, str | None, bool, str], tuple[bytes, str | None]],
+    kind: str,
+) -> Callable[[Request], Response]:
+    """Serve a persisted CSV; when it is stored compressed and the client accepts that coding, the file goes out as is."""
+    def handler(request: Request) -> Response:
+        try:
+            force = _parse_bool_flag(request, "force")
+            handle = _parse_handle(request)
+            result = _call(request, func, kind, request.headers.get("accept-encoding"), force, handle)
+            if isinstance(result, str):
+                return StreamingResponse(iter((result,)), media_type="text/event-stream")
+            body, coding = result
+            headers = {"Vary": "Accept-Encoding"}
+            if coding is not None:
+                headers["Content-Encoding"] = coding
+            return Response(body, media_type="text/event-stream", headers=headers)
+        except Exception as exc:
+            return _error_response(request, exc)
+
+    return handler
+
+
+def _week_handler_factory(func: Callable[[int, bool, bool, str], str]) -> Callable[[Request], StreamingResponse]:
     def handler(request: Request) -> StreamingResponse:
         try:
             anchor = _parse_anchor(request)
             utc_flag = _parse_bool_flag(request, "utc")
             force = _parse_bool_flag(request, "force")
-            result = func(anchor, utc_flag, force)
+            handle = _parse_handle(request)
+            result = _call(request, func, anchor, utc_flag, force, handle)
             body = result if isinstance(result, (str, bytes)) else str(result)
-            return StreamingResponse(body, media_type="text/event-stream")
+            return StreamingResponse(iter((body,)), media_type="text/event-stream")
+        except Exception as exc:
+            return _error_response(request, exc)
+
+    return handler
+
+
+def _parse_windows(request: Request) -> list[tuple[str, str | None]]:
+    """
+    Collect count windows, in query order, from `window=start/end` params and/or `start=`/`end=` params
+    (the n-th end belongs to the n-th start). An omitted end means now.
+    """
+    windows: list[tuple[str, str | None]] = []
+    paired: list[int] = []  # positions of start= windows, in order, for pairing with end= values
+    ends: list[str] = []
+    for key, raw in request.query_params.multi_items():
+        if key == "window":
+            start, sep, end = raw.partition("/")
+            windows.append((start, end if sep and end else None))
+        elif key == "start":
+            paired.append(len(windows))
+            windows.append((raw, None))
+        elif key == "end":
+            ends.append(raw)
+    if len(ends) > len(paired):
+        raise ValueError("every 'end' query parameter needs a matching 'start'")
+    for pos, end in zip(paired, ends):
+        windows[pos] = (windows[pos][0], end)
+    if not windows:
+        raise ValueError("query parameter 'start' (or 'window=start/end') is required")
+    return windows
+
+
+def _count_handler_factory(func: Callable[[list, bool, str], str]) -> Callable[[Request], StreamingResponse]:
+    def handler(request: Request) -> StreamingResponse:
+        try:
+            windows = _parse_windows(request)
+            force = _parse_bool_flag(request, "force")
+            handle = _parse_handle(request)
+            result = _call(request, func, windows, force, handle)
+            return StreamingResponse(iter((result,)), media_type="text/event-stream")
+        except Exception as exc:
+            return _error_response(request, exc)
+
+    return handler
+
+
+def _negotiated_handler_factory(
+    csv_handler: Callable[[Request], Response],
+    columns: Callable[[Request], Any],
+) -> Callable[[Request], Response]:
+    """
+    CSV through csv_handler unless `format=json|arrow|npy` (or, without it, the Accept header) asks for
+    another format, which is then serialized from the columns returned by columns(request).
+    """
+    def handler(request: Request) -> Response:
+        try:
+            fmt = formats.negotiate(request.query_params.get("format"), request.headers.get("accept"))
         except ValueError as exc:
-            return StreamingResponse(f"invalid query: {exc}", status_code=400, media_type="text/event-stream")
+            return _error_response(request, exc)
+        if fmt == formats.CSV:
+            return csv_handler(request)
+        try:
+            result = columns(request)
+            if isinstance(result, str):
+                return StreamingResponse(iter((result,)), media_type="text/event-stream")
+            return Response(formats.encode(result, fmt), media_type=formats.MEDIA_TYPES[fmt])
         except Exception as exc:
-            logging.getLogger(__name__).exception(
-                "Unhandled error in week handler for %s", getattr(func, "__name__", str(func)),
-            )
-            return StreamingResponse(f"error: {exc}", status_code=500, media_type="text/event-stream")
+            return _error_response(request, exc)
 
     return handler
 
 
+def _aggregate_columns(func: Callable[..., Any], kind: str) -> Callable[[Request], Any]:
+    def columns(request: Request) -> Any:
+        anchor = _parse_anchor(request) if kind == "week" else 4
+        utc_flag = _parse_bool_flag(request, "utc") if kind == "week" else False
+        force = _parse_bool_flag(request, "force")
+        handle = _parse_handle(request)
+        return _call(request, func, kind, anchor, utc_flag, force, handle)
+
+    return columns
+
+
+def _count_columns(func: Callable[[list, bool, str], Any]) -> Callable[[Request], Any]:
+    def columns(request: Request) -> Any:
+        windows = _parse_windows(request)
+        force = _parse_bool_flag(request, "force")
+        handle = _parse_handle(request)
+        return _call(request, func, windows, force, handle)
+
+    return columns
+
+
+def _force_columns(func: Callable[[bool, str], Any]) -> Callable[[Request], Any]:
+    def columns(request: Request) -> Any:
+        return _call(request, func, _parse_bool_flag(request, "force"), _parse_handle(request))
+
+    return columns
+
+
+def _delta_handler_factory(
+    full_handler: Callable[[Request], Response],
+    delta_func: Callable[[str, str, bool, str], dict],
+    kind: str,
+) -> Callable[[Request], Response]:
+    """full_handler as usual; with `since=<cursor>` only the rows changed since then, plus the next cursor, as JSON."""
+    def handler(request: Request) -> Response:
+        if "since" not in request.query_params:
+            return full_handler(request)
+        try:
+            force = _parse_bool_flag(request, "force")
+            handle = _parse_handle(request)
+            result = _call(request, delta_func, kind, request.query_params["since"], force, handle)
+            if isinstance(result, str):
+                return StreamingResponse(iter((result,)), media_type="text/event-stream")
+            return JSONResponse(result)
+        except Exception as exc:
+            return _error_response(request, exc, json=True)
+
+    return handler
+
+
+def _parse_int(request: Request, param: str, default: int) -> int:
+    raw = request.query_params.get(param)
+    if raw is None:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"query parameter '{param}' must be an integer")
+
+
+def _projection_handler_factory(func: Callable[..., dict]) -> Callable[[Request], Response]:
+    def handler(request: Request) -> Response:
+        try:
+            anchor = _parse_anchor(request)
+            simulations = _parse_int(request, "sims", 10_000)
+            bracket_width = _parse_int(request, "bracket", 20)
+            history_weeks = _parse_int(request, "weeks", 12)
+            force = _parse_bool_flag(request, "force")
+            handle = _parse_handle(request)
+            result = _call(request, func, anchor, simulations, bracket_width, history_weeks, force, handle)
+            if isinstance(result, str):
+                return StreamingResponse(iter((result,)), media_type="text/event-stream")
+            return JSONResponse(result)
+        except Exception as exc:
+            return _error_response(request, exc, json=True)
+
+    return handler
+
+
+def _week_stats_handler_factory(func: Callable[..., list]) -> Callable[[Request], Response]:
+    def handler(request: Request) -> Response:
+        try:
+            anchor = _parse_anchor(request) if "a" in request.query_params else None
+            window = request.query_params.get("window")
+            bracket_width = _parse_int(request, "bracket", 20)
+            force = _parse_bool_flag(request, "force")
+            handle = _parse_handle(request)
+            result = _call(request, func, anchor, window, bracket_width, force, handle)
+            if isinstance(result, str):
+                return StreamingResponse(iter((result,)), media_type="text/event-stream")
+            return JSONResponse(result)
+        except Exception as exc:
+            return _error_response(request, exc, json=True)
+
+    return handler
+
+
+def _aggregate_spec(request: Request) -> AggregateSpec:
+    params = request.query_params
+    raw: dict[str, Any] = {
+        "kind": params.get("kind"),
+        "source": params.get("source", DEFAULT_SOURCE),
+        "handle": _parse_handle(request),
+        "anchor": _parse_anchor(request),
+        "utc": _parse_bool_flag(request, "utc"),
+        "dense": _parse_bool_flag(request, "dense"),
+    }
+    for key in ("start", "end", "resolution"):
+        if key in params:
+            raw[key] = params[key]
+    return AggregateSpec.from_dict(raw)
+
+
+def _aggregate_csv_handler(request: Request) -> StreamingResponse:
+    """One aggregate (`kind=`) over `source=xtracker|polymarket|union` as CSV, or a scalar as text."""
+    try:
+        spec = _aggregate_spec(request)
+        force = _parse_bool_flag(request, "force")
+        result = _call(request, run_aggregate, spec, force)
+        body = result if isinstance(result, (str, bytes)) else str(result)
+        return StreamingResponse(iter((body,)), media_type="text/event-stream")
+    except Exception as exc:
+        return _error_response(request, exc)
+
+
+def _aggregate_spec_columns(request: Request) -> Any:
+    return _call(request, run_aggregate_columns, _aggregate_spec(request), _parse_bool_flag(request, "force"))
+
+
+aggregate_handler = _negotiated_handler_factory(_aggregate_csv_handler, _aggregate_spec_columns)
+
+
+async def batch_handler(request: Request) -> Response:
+    """
+    Evaluate a JSON list of aggregate specs (or {"specs": [...], "force": bool}) against one snapshot per source.
+    Supports the same profiling switches as the GET routes.
+    """
+    try:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise ValueError("request body must be JSON")
+        force = _parse_bool_flag(request, "force")
+        if isinstance(payload, dict):
+            force = bool(payload.get("force", force))
+            payload = payload.get("specs")
+        specs = parse_specs(payload)
+        if not force:
+            await ingest.ensure_fresh((source, spec.handle) for spec in specs for source in ingest.feeds(spec.source))
+        result = await run_in_threadpool(_call, request, run_batch, specs, force)
+        if isinstance(result, str):
+            return StreamingResponse(iter((result,)), media_type="text/event-stream")
+        return JSONResponse(result)
+    except Exception as exc:
+        return _error_response(request, exc, json=True, invalid="invalid batch")
+
+
+def _live_handler_factory(source: str) -> Callable[[Request], Any]:
+    async def handler(request: Request) -> StreamingResponse:
+        """Server-Sent Events: a `snapshot` event on connect, then an `update` event after every refresh."""
+        try:
+            handle = _parse_handle(request)
+        except ValueError as exc:
+            return _error_response(request, exc)
+        return StreamingResponse(
+            live.stream(source, handle),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    return handler
+
+
+def metrics_handler(request: Request) -> Response:
+    """Expose pipeline, cache, and route metrics in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), media_type=metrics.CONTENT_TYPE)
+
+
 bump = _make_stream_handler(lambda: "ok!")
-hour = _make_force_stream_handler(get_tweets_by_hour)
-date = _make_force_stream_handler(get_tweets_by_date)
-weekday = _make_force_stream_handler(get_tweets_by_weekday)
-week = _week_handler_factory(get_tweets_by_week)
-fifteen = _make_force_stream_handler(get_tweets_by_15min)
+hour = _negotiated_handler_factory(
+    _make_force_stream_handler(get_tweets_by_hour), _aggregate_columns(get_aggregate_columns, "hour"),
+)
+date = _delta_handler_factory(
+    _negotiated_handler_factory(
+        _make_force_stream_handler(get_tweets_by_date), _aggregate_columns(get_aggregate_columns, "date"),
+    ),
+    get_bucket_delta,
+    "date",
+)
+weekday = _negotiated_handler_factory(
+    _make_force_stream_handler(get_tweets_by_weekday), _aggregate_columns(get_aggregate_columns, "weekday"),
+)
+week = _negotiated_handler_factory(_week_handler_factory(get_tweets_by_week), _aggregate_columns(get_aggregate_columns, "week"))
+fifteen = _delta_handler_factory(
+    _negotiated_handler_factory(
+        _make_force_stream_handler(get_tweets_by_15min), _aggregate_columns(get_aggregate_columns, "15min"),
+    ),
+    get_bucket_delta,
+    "15min",
+)
 # fifteen_with_empty = _make_force_stream_handler(get_tweets_by_15min_with_empty)
 # fifteen_recent = _make_force_stream_handler(lambda force: get_tweets_by_15min_recent(6))
 
@@ -284,51 +900,87 @@ avg_day = _make_force_stream_handler(get_avg_per_day)
 iso_first_tweet = _make_force_stream_handler(get_first_tweet_date)
 now = _make_stream_handler(get_time_now)
 data_span = _make_force_stream_handler(get_data_range)
-utc_csv = _make_force_stream_handler(get_utc_csv)
-cc_csv = _make_force_stream_handler(get_cc_csv)
+utc_csv = _artifact_handler_factory(get_csv_artifact, "utc")
+cc_csv = _artifact_handler_factory(get_csv_artifact, "cc")
+count = _negotiated_handler_factory(_count_handler_factory(get_window_counts), _count_columns(get_window_count_columns))
+week_stats = _week_stats_handler_factory(get_week_stats)
+live_feed = _live_handler_factory("xtracker")
 
 # Polymarket endpoint handlers
-hour_pm = _make_force_stream_handler(get_tweets_by_hour_pm)
-date_pm = _make_force_stream_handler(get_tweets_by_date_pm)
-weekday_pm = _make_force_stream_handler(get_tweets_by_weekday_pm)
-week_pm = _week_handler_factory(get_tweets_by_week_pm)
-latest_pm = _make_force_stream_handler(get_latest_counts_pm)
-fifteen_pm = _make_force_stream_handler(get_tweets_by_15min_pm)
+hour_pm = _negotiated_handler_factory(
+    _make_force_stream_handler(get_tweets_by_hour_pm), _aggregate_columns(get_aggregate_columns_pm, "hour"),
+)
+date_pm = _delta_handler_factory(
+    _negotiated_handler_factory(
+        _make_force_stream_handler(get_tweets_by_date_pm), _aggregate_columns(get_aggregate_columns_pm, "date"),
+    ),
+    get_bucket_delta_pm,
+    "date",
+)
+weekday_pm = _negotiated_handler_factory(
+    _make_force_stream_handler(get_tweets_by_weekday_pm), _aggregate_columns(get_aggregate_columns_pm, "weekday"),
+)
+week_pm = _negotiated_handler_factory(_week_handler_factory(get_tweets_by_week_pm), _aggregate_columns(get_aggregate_columns_pm, "week"))
+latest_pm = _negotiated_handler_factory(_make_force_stream_handler(get_latest_counts_pm), _force_columns(get_latest_count_columns_pm))
+fifteen_pm = _delta_handler_factory(
+    _negotiated_handler_factory(
+        _make_force_stream_handler(get_tweets_by_15min_pm), _aggregate_columns(get_aggregate_columns_pm, "15min"),
+    ),
+    get_bucket_delta_pm,
+    "15min",
+)
 total_pm = _make_force_stream_handler(get_total_tweets_pm)
 avg_day_pm = _make_force_stream_handler(get_avg_per_day_pm)
 iso_first_tweet_pm = _make_force_stream_handler(get_first_tweet_date_pm)
 now_pm = _make_stream_handler(get_time_now_pm)
 data_span_pm = _make_force_stream_handler(get_data_range_pm)
-utc_csv_pm = _make_force_stream_handler(get_utc_csv_pm)
-cc_csv_pm = _make_force_stream_handler(get_cc_csv_pm)
+utc_csv_pm = _artifact_handler_factory(get_csv_artifact_pm, "utc")
+cc_csv_pm = _artifact_handler_factory(get_csv_artifact_pm, "cc")
+count_pm = _negotiated_handler_factory(_count_handler_factory(get_window_counts_pm), _count_columns(get_window_count_columns_pm))
+projection_pm = _projection_handler_factory(get_projection_pm)
+week_stats_pm = _week_stats_handler_factory(get_week_stats_pm)
+live_feed_pm = _live_handler_factory("polymarket")
 
 # Starlette route registration
 app.add_route("/", bump, methods=["GET", "POST"])  # healthcheck
-app.add_route("/hour", hour, methods=["GET"])  # CSV
-app.add_route("/date", date, methods=["GET"])  # CSV
-app.add_route("/weekday", weekday, methods=["GET"])  # CSV
-app.add_route("/week", week, methods=["GET"])  # CSV
-app.add_route("/15min", fifteen, methods=["GET"])  # CSV aligned to wall-clock 15-minute buckets
+app.add_route("/metrics", metrics_handler, methods=["GET"])  # Prometheus text format
+app.add_route("/batch", batch_handler, methods=["POST"])  # JSON: many aggregates from one snapshot
+app.add_route("/aggregate", _ingest_first(aggregate_handler), methods=["GET"])  # CSV/scalar (or ?format=) for one kind over a source or the union
+app.add_route("/hour", _ingest_first(hour, "xtracker"), methods=["GET"])  # CSV (or ?format=json|arrow|npy)
+app.add_route("/date", _ingest_first(date, "xtracker"), methods=["GET"])  # CSV (or ?format=); JSON delta with ?since=
+app.add_route("/weekday", _ingest_first(weekday, "xtracker"), methods=["GET"])  # CSV (or ?format=json|arrow|npy)
+app.add_route("/week", _ingest_first(week, "xtracker"), methods=["GET"])  # CSV (or ?format=json|arrow|npy)
+app.add_route("/week/stats", _ingest_first(week_stats, "xtracker"), methods=["GET"])  # JSON weekly-count distributions per anchor
+app.add_route("/15min", _ingest_first(fifteen, "xtracker"), methods=["GET"])  # CSV aligned to wall-clock 15-minute buckets (or ?format=); JSON delta with ?since=
 # app.add_route("/15min_with_empty", fifteen_with_empty, methods=["GET"])  # CSV including empty intervals
-app.add_route("/total", total, methods=["GET"])  # integer as text
-app.add_route("/avg_per_day", avg_day, methods=["GET"])  # float as text
-app.add_route("/first_tweet_date", iso_first_tweet, methods=["GET"])  # ISO string
+app.add_route("/total", _ingest_first(total, "xtracker"), methods=["GET"])  # integer as text
+app.add_route("/avg_per_day", _ingest_first(avg_day, "xtracker"), methods=["GET"])  # float as text
+app.add_route("/first_tweet_date", _ingest_first(iso_first_tweet, "xtracker"), methods=["GET"])  # ISO string
 app.add_route("/time_now", now, methods=["GET"])  # ISO string
-app.add_route("/data_span", data_span, methods=["GET"])  # int seconds as text
-app.add_route("/utc_csv", utc_csv, methods=["GET"])  # CSV bytes (UTC timestamps)
-app.add_route("/cc_csv", cc_csv, methods=["GET"])  # CSV bytes (recent 6 months ET)
+app.add_route("/data_span", _ingest_first(data_span, "xtracker"), methods=["GET"])  # int seconds as text
+app.add_route("/utc_csv", _ingest_first(utc_csv, "xtracker"), methods=["GET"])  # CSV bytes (UTC timestamps), precompressed when stored so
+app.add_route("/cc_csv", _ingest_first(cc_csv, "xtracker"), methods=["GET"])  # CSV bytes (recent 6 months ET), precompressed when stored so
+app.add_route("/count", _ingest_first(count, "xtracker"), methods=["GET"])  # CSV counts per [start, end) window (or ?format=)
+app.add_route("/live", live_feed, methods=["GET"])  # SSE: new tweets, Tue/Fri window counts and latest 15-minute bucket per refresh
 
 # Polymarket routes
-app.add_route("/pm/hour", hour_pm, methods=["GET"])  # CSV
-app.add_route("/pm/date", date_pm, methods=["GET"])  # CSV
-app.add_route("/pm/weekday", weekday_pm, methods=["GET"])  # CSV
-app.add_route("/pm/week", week_pm, methods=["GET"])  # CSV
-app.add_route("/pm/latest", latest_pm, methods=["GET"])  # CSV counts since last Tue/Fri noon ET; refreshes weekly CSVs
-app.add_route("/pm/15min", fifteen_pm, methods=["GET"])  # CSV
-app.add_route("/pm/total", total_pm, methods=["GET"])  # integer as text
-app.add_route("/pm/avg_per_day", avg_day_pm, methods=["GET"])  # float as text
-app.add_route("/pm/first_tweet_date", iso_first_tweet_pm, methods=["GET"])  # ISO string
+app.add_route("/pm/hour", _ingest_first(hour_pm, "polymarket"), methods=["GET"])  # CSV (or ?format=json|arrow|npy)
+app.add_route("/pm/date", _ingest_first(date_pm, "polymarket"), methods=["GET"])  # CSV (or ?format=); JSON delta with ?since=
+app.add_route("/pm/weekday", _ingest_first(weekday_pm, "polymarket"), methods=["GET"])  # CSV (or ?format=json|arrow|npy)
+app.add_route("/pm/week", _ingest_first(week_pm, "polymarket"), methods=["GET"])  # CSV (or ?format=json|arrow|npy)
+app.add_route("/pm/week/stats", _ingest_first(week_stats_pm, "polymarket"), methods=["GET"])  # JSON weekly-count distributions per anchor
+app.add_route("/pm/latest", _ingest_first(latest_pm, "polymarket"), methods=["GET"])  # CSV counts since last Tue/Fri noon ET; refreshes weekly CSVs (not with ?format=)
+app.add_route("/pm/15min", _ingest_first(fifteen_pm, "polymarket"), methods=["GET"])  # CSV (or ?format=); JSON delta with ?since=
+app.add_route("/pm/total", _ingest_first(total_pm, "polymarket"), methods=["GET"])  # integer as text
+app.add_route("/pm/avg_per_day", _ingest_first(avg_day_pm, "polymarket"), methods=["GET"])  # float as text
+app.add_route("/pm/first_tweet_date", _ingest_first(iso_first_tweet_pm, "polymarket"), methods=["GET"])  # ISO string
 app.add_route("/pm/time_now", now_pm, methods=["GET"])  # ISO string
-app.add_route("/pm/data_span", data_span_pm, methods=["GET"])  # int seconds as text
-app.add_route("/pm/utc_csv", utc_csv_pm, methods=["GET"])  # CSV bytes (UTC timestamps)
-app.add_route("/pm/cc_csv", cc_csv_pm, methods=["GET"])  # CSV bytes (recent 6 months ET)
+app.add_route("/pm/data_span", _ingest_first(data_span_pm, "polymarket"), methods=["GET"])  # int seconds as text
+app.add_route("/pm/utc_csv", _ingest_first(utc_csv_pm, "polymarket"), methods=["GET"])  # CSV bytes (UTC timestamps), precompressed when stored so
+app.add_route("/pm/cc_csv", _ingest_first(cc_csv_pm, "polymarket"), methods=["GET"])  # CSV bytes (recent 6 months ET), precompressed when stored so
+app.add_route("/pm/count", _ingest_first(count_pm, "polymarket"), methods=["GET"])  # CSV counts per [start, end) window (or ?format=)
+app.add_route("/pm/live", live_feed_pm, methods=["GET"])  # SSE: new tweets, Tue/Fri window counts and latest 15-minute bucket per refresh
+app.add_route("/pm/projection", _ingest_first(projection_pm, "polymarket"), methods=["GET"])  # JSON projected final count for the current week
+
+metrics.describe(STARTUP_SECONDS, "gauge", "Time spent importing the app and warming snapshots at boot.")
+metrics.set_gauge(STARTUP_SECONDS, time.perf_counter() - _IMPORT_STARTED, phase="import")
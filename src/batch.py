@@ -0,0 +1,213 @@
+"""Evaluate many aggregate specs against a single loaded snapshot per source."""
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable
+
+from src import metrics, snapshot
+from src.paths import DEFAULT_HANDLE, validate_handle
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('xtracker', 'polymarket', 'union')
+# Source of a spec, /aggregate query or aggregate tool call that names none
+DEFAULT_SOURCE = 'union'
+AGGREGATE_KINDS = ('hour', 'weekday', 'date', 'week', '15min', 'buckets')
+SCALAR_KINDS = ('total', 'avg_per_day', 'first_tweet_date', 'data_span')
+KINDS = AGGREGATE_KINDS + SCALAR_KINDS
+MAX_SPECS = 64
+MAX_PARALLEL_LOADS = 8
+ENCODING = 'utf-8'
+
+
+@dataclass(frozen=True)
+class AggregateSpec:
+    """One requested output: an aggregate kind over a source of a handle, optionally limited to [start, end)."""
+    kind: str
+    source: str = DEFAULT_SOURCE
+    handle: str = DEFAULT_HANDLE
+    anchor: int = 4
+    utc: bool = False
+    start: str | None = None
+    end: str | None = None
+    resolution: str = '15m'
+    dense: bool = False
+
+    @classmethod
+    def from_dict(cls, raw: Any) -> 'AggregateSpec':
+        if not isinstance(raw, dict):
+            raise ValueError('each spec must be an object')
+        unknown = set(raw) - {
+            'kind', 'source', 'handle', 'anchor', 'utc', 'start', 'end', 'range', 'resolution', 'dense',
+        }
+        if unknown:
+            raise ValueError(f"unknown spec field(s): {', '.join(sorted(unknown))}")
+        kind = raw.get('kind')
+        if kind not in KINDS:
+            raise ValueError(f"spec 'kind' must be one of {', '.join(KINDS)}")
+        source = raw.get('source', DEFAULT_SOURCE)
+        if source not in SOURCES:
+            raise ValueError(f"spec 'source' must be one of {', '.join(SOURCES)}")
+        handle = validate_handle(raw.get('handle', DEFAULT_HANDLE))
+        anchor = raw.get('anchor', 4)
+        if isinstance(anchor, bool) or not isinstance(anchor, int) or anchor not in range(7):
+            raise ValueError("spec 'anchor' must be an integer between 0 and 6")
+        utc = raw.get('utc', False)
+        if not isinstance(utc, bool):
+            raise ValueError("spec 'utc' must be a boolean")
+        resolution = raw.get('resolution', '15m')
+        if not isinstance(resolution, str):
+            raise ValueError("spec 'resolution' must be a string such as '5m', '4h', 'day' or 'month'")
+        dense = raw.get('dense', False)
+        if not isinstance(dense, bool):
+            raise ValueError("spec 'dense' must be a boolean")
+        start, end = raw.get('start'), raw.get('end')
+        if 'range' in raw:
+            if start is not None or end is not None:
+                raise ValueError("use either 'range' or 'start'/'end', not both")
+            window = raw['range']
+            if isinstance(window, dict):
+                start, end = window.get('start'), window.get('end')
+            elif isinstance(window, (list, tuple)) and len(window) == 2:
+                start, end = window
+            else:
+                raise ValueError("spec 'range' must be [start, end] or {'start': ..., 'end': ...}")
+        spec = cls(
+            kind=kind, source=source, handle=handle, anchor=anchor, utc=utc, start=start, end=end,
+            resolution=resolution, dense=dense,
+        )
+        if kind == 'buckets':
+            from src.buckets import validate_resolution
+
+            validate_resolution(resolution)
+        bounds = spec.bounds_ms()
+        if bounds[0] is not None and bounds[1] is not None and bounds[0] >= bounds[1]:
+            raise ValueError("spec range 'start' must be before 'end'")
+        return spec
+
+    def bounds_ms(self) -> tuple[int | None, int | None]:
+        start = snapshot.parse_instant_ms(self.start, 'start') if self.start is not None else None
+        end = snapshot.parse_instant_ms(self.end, 'end') if self.end is not None else None
+        return start, end
+
+
+def parse_specs(raw_specs: Any) -> list[AggregateSpec]:
+    if not isinstance(raw_specs, list) or not raw_specs:
+        raise ValueError('specs must be a non-empty list')
+    if len(raw_specs) > MAX_SPECS:
+        raise ValueError(f'at most {MAX_SPECS} specs are allowed per batch')
+    return [AggregateSpec.from_dict(raw) for raw in raw_specs]
+
+
+def _scalar(kind: str, epoch_ms: Any, end_ms: int | None) -> int | float | str:
+    stats = snapshot.compute_stats(epoch_ms)
+    # A bounded range is measured up to its end rather than up to the current time
+    now = end_ms / 1000.0 if end_ms is not None else None
+    if kind == 'total':
+        return stats.count
+    if kind == 'avg_per_day':
+        return stats.avg_per_day(now)
+    if kind == 'first_tweet_date':
+        return stats.first_tweet_iso()
+    return int(stats.seconds_since_first(now))
+
+
+def _bounded(spec: AggregateSpec, epoch_ms: Any) -> tuple[Any, int | None]:
+    """The part of a sorted epoch array inside the spec's range, plus the range end."""
+    start_ms, end_ms = spec.bounds_ms()
+    if start_ms is not None or end_ms is not None:
+        lo = 0 if start_ms is None else int(epoch_ms.searchsorted(start_ms, side='left'))
+        hi = epoch_ms.size if end_ms is None else int(epoch_ms.searchsorted(end_ms, side='left'))
+        epoch_ms = epoch_ms[lo:hi]
+    return epoch_ms, end_ms
+
+
+def evaluate(spec: AggregateSpec, epoch_ms: Any) -> int | float | str:
+    """Compute one spec over a sorted epoch array: CSV text for aggregates, a scalar otherwise."""
+    from src.sanitize import aggregate_csv_bytes
+
+    epoch_ms, end_ms = _bounded(spec, epoch_ms)
+    if spec.kind in SCALAR_KINDS:
+        return _scalar(spec.kind, epoch_ms, end_ms)
+    csv_bytes = aggregate_csv_bytes(
+        epoch_ms, spec.kind, anchor_weekday=spec.anchor, use_utc=spec.utc,
+        resolution=spec.resolution, dense=spec.dense,
+    )
+    return csv_bytes.decode(ENCODING)
+
+
+def run_aggregate(spec: AggregateSpec | dict[str, Any], force: bool = False) -> int | float | str:
+    """Evaluate a single spec, e.g. one aggregate over source='union'."""
+    from src import dataset
+
+    spec = spec if isinstance(spec, AggregateSpec) else AggregateSpec.from_dict(spec)
+    epoch_ms, _ = dataset.epoch_ms(spec.source, force, spec.handle)
+    return evaluate(spec, epoch_ms)
+
+
+def _evaluate_columns(spec: AggregateSpec, epoch_ms: Any) -> dict[str, Any]:
+    """Like evaluate, but as named columns; a scalar becomes a one-row column named after its kind."""
+    import numpy as np
+
+    from src.sanitize import aggregate_columns
+
+    epoch_ms, end_ms = _bounded(spec, epoch_ms)
+    if spec.kind in SCALAR_KINDS:
+        return {spec.kind: np.array([_scalar(spec.kind, epoch_ms, end_ms)])}
+    return aggregate_columns(
+        epoch_ms, spec.kind, anchor_weekday=spec.anchor, use_utc=spec.utc,
+        resolution=spec.resolution, dense=spec.dense,
+    )
+
+
+def run_aggregate_columns(spec: AggregateSpec | dict[str, Any], force: bool = False) -> dict[str, Any]:
+    """Evaluate a single spec into columns, for the JSON and binary output formats."""
+    from src import dataset
+
+    spec = spec if isinstance(spec, AggregateSpec) else AggregateSpec.from_dict(spec)
+    epoch_ms, _ = dataset.epoch_ms(spec.source, force, spec.handle)
+    return _evaluate_columns(spec, epoch_ms)
+
+
+def run_batch(specs: Iterable[AggregateSpec | dict[str, Any]], force: bool = False) -> dict[str, Any]:
+    """
+    Evaluate every spec against the epoch array of each source's snapshot (or the merged
+    union of both), loading every source once.
+
+    Returns:
+        dict with 'results' (spec, result, cost_ms or error per spec, in request order)
+        and 'snapshots' (version, fetched_at, load_ms per source used, keyed 'source' for the
+        default handle and 'source:handle' otherwise; versions and overlap counts for the union)
+    """
+    from src import dataset
+
+    specs = [s if isinstance(s, AggregateSpec) else AggregateSpec.from_dict(s) for s in specs]
+    arrays: dict[tuple[str, str], Any] = {}
+    snapshot_info: dict[str, dict[str, Any]] = {}
+    results: list[dict[str, Any]] = []
+
+    with metrics.stage('batch', source='batch') as st:
+        pairs = list(dict.fromkeys((spec.source, spec.handle) for spec in specs))
+        # Each (source, handle) has its own refresh lock, so cold handles refresh side by side
+        # Each load runs in a copy of the request's context so staleness reported by a source reaches the response
+        contexts = [contextvars.copy_context() for _ in pairs]
+        with ThreadPoolExecutor(max_workers=min(len(pairs), MAX_PARALLEL_LOADS)) as pool:
+            loaded = list(pool.map(lambda ctx, pair: ctx.run(dataset.epoch_ms, pair[0], force, pair[1]), contexts, pairs))
+        for (source, handle), (values, info) in zip(pairs, loaded):
+            label = source if handle == DEFAULT_HANDLE else f"{source}:{handle}"
+            arrays[(source, handle)], snapshot_info[label] = values, info
+
+        for spec in specs:
+            started = time.perf_counter()
+            entry: dict[str, Any] = {'spec': asdict(spec)}
+            try:
+                entry['result'] = evaluate(spec, arrays[(spec.source, spec.handle)])
+            except ValueError as exc:
+                entry['error'] = str(exc)
+            entry['cost_ms'] = (time.perf_counter() - started) * 1000.0
+            results.append(entry)
+        st['rows'] = len(results)
+
+    return {'results': results, 'snapshots': snapshot_info}
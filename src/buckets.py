@@ -0,0 +1,204 @@
+"""Vectorized time bucketing: map epoch milliseconds to bucket indices and count them with one np.bincount.
+
+Resolutions:
+    '<n>m' (n divides 60) and '1h' are floored on absolute time, like the historical
+    UTC-floor-then-convert 15-minute buckets; '<n>h' (n divides 24, n > 1), 'day',
+    'week' (ISO, Monday 00:00), 'month' and 'anchored_week' (anchor weekday at 12:00)
+    follow the ET wall clock, so DST days are 23/25 hours long.
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from src import tz
+# Wall-clock conversions live in src.tz; re-exported here for the modules that bucket with them
+from src.tz import DAY_MS, EPOCH_WEEKDAY, ET_TZ, HOUR_MS, MINUTE_MS, local_ms, localize_ms, utc_offset_ms  # noqa: F401
+
+NOON_MS = 12 * HOUR_MS
+
+CALENDAR_RESOLUTIONS = ('day', 'week', 'month', 'anchored_week')
+CYCLIC_FIELDS = {'hour': 24, 'weekday': 7, 'quarter_hour': 96}
+
+_WIDTH_RE = re.compile(r'^(\d+)(m|h)$')
+
+
+@dataclass(frozen=True)
+class Buckets:
+    """Bucket start instants (epoch ms, ascending) and their counts."""
+    resolution: str
+    start_ms: np.ndarray
+    counts: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.counts.size)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def nonzero(self) -> 'Buckets':
+        keep = self.counts > 0
+        return Buckets(self.resolution, self.start_ms[keep], self.counts[keep])
+
+    def labels(self, *, utc: bool = False, zulu: bool = False) -> np.ndarray:
+        return iso_labels(self.start_ms, utc=utc, zulu=zulu)
+
+
+def _parse_resolution(resolution: str) -> tuple[str, int]:
+    """Return (mode, width_ms); mode is 'absolute', 'local' or one of CALENDAR_RESOLUTIONS."""
+    if resolution in CALENDAR_RESOLUTIONS:
+        return resolution, 0
+    if resolution == '1d':
+        return 'day', 0
+    match = _WIDTH_RE.match(resolution)
+    if match:
+        n, unit = int(match.group(1)), match.group(2)
+        if unit == 'm' and n > 0 and 60 % n == 0:
+            return 'absolute', n * MINUTE_MS
+        if unit == 'h' and n == 1:
+            return 'absolute', HOUR_MS
+        if unit == 'h' and n > 0 and 24 % n == 0:
+            return 'local', n * HOUR_MS
+    raise ValueError(
+        f"unsupported resolution {resolution!r}; use '<n>m' (n divides 60), '<n>h' (n divides 24), "
+        f"or one of {', '.join(CALENDAR_RESOLUTIONS)}"
+    )
+
+
+def validate_resolution(resolution: str) -> None:
+    """Raise ValueError unless resolution is supported by bucketize()."""
+    _parse_resolution(resolution)
+
+
+def _index(epoch_ms: np.ndarray, mode: str, width: int, anchor_weekday: int) -> np.ndarray:
+    if mode == 'absolute':
+        return epoch_ms // width
+    local = local_ms(epoch_ms)
+    if mode == 'local':
+        return local // width
+    if mode == 'day':
+        return local // DAY_MS
+    if mode == 'week':
+        return (local // DAY_MS + EPOCH_WEEKDAY) // 7
+    if mode == 'month':
+        return (local // DAY_MS).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return anchored_week_from_local(local, anchor_weekday)
+
+
+def anchored_week_from_local(local: np.ndarray, anchor_weekday: int) -> np.ndarray:
+    """Anchored week numbers from ET wall-clock milliseconds (see local_ms), for reuse across anchors."""
+    # Shifting by 12h makes anything before the anchor's noon fall into the previous week
+    return ((local - NOON_MS) // DAY_MS + EPOCH_WEEKDAY - anchor_weekday) // 7
+
+
+def _starts(keys: np.ndarray, mode: str, width: int, anchor_weekday: int) -> np.ndarray:
+    if mode == 'absolute':
+        return keys * width
+    if mode == 'local':
+        wall = keys * width
+    elif mode == 'day':
+        wall = keys * DAY_MS
+    elif mode == 'week':
+        wall = (keys * 7 - EPOCH_WEEKDAY) * DAY_MS
+    elif mode == 'month':
+        wall = keys.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) * DAY_MS
+    else:
+        wall = (keys * 7 - EPOCH_WEEKDAY + anchor_weekday) * DAY_MS + NOON_MS
+    return localize_ms(wall)
+
+
+def bucket_index(epoch_ms: np.ndarray, resolution: str, *, anchor_weekday: int = 4) -> np.ndarray:
+    """Map each instant to a global bucket number (consecutive buckets differ by one)."""
+    mode, width = _parse_resolution(resolution)
+    _check_anchor(anchor_weekday)
+    return _index(np.asarray(epoch_ms, dtype=np.int64), mode, width, anchor_weekday)
+
+
+def bucket_starts(keys: np.ndarray, resolution: str, *, anchor_weekday: int = 4) -> np.ndarray:
+    """Start instant (epoch ms) of each global bucket number returned by bucket_index."""
+    mode, width = _parse_resolution(resolution)
+    _check_anchor(anchor_weekday)
+    return _starts(np.asarray(keys, dtype=np.int64), mode, width, anchor_weekday)
+
+
+def _check_anchor(anchor_weekday: int) -> None:
+    if anchor_weekday not in range(7):
+        raise ValueError("anchor_weekday must be in range 0..6 (0=Mon .. 6=Sun).")
+
+
+def bucketize(
+    epoch_ms: np.ndarray,
+    resolution: str,
+    *,
+    anchor_weekday: int = 4,
+    dense: bool = True,
+    start_ms: int | None = None,
+    end_ms: int | None = None,
+) -> Buckets:
+    """Count instants per bucket.
+
+    The covered range runs from the bucket holding start_ms (default: the earliest
+    instant) through the bucket holding end_ms (default: the latest), inclusive;
+    instants outside it are ignored. Dense output includes empty buckets, sparse
+    output only the non-empty ones.
+    """
+    mode, width = _parse_resolution(resolution)
+    _check_anchor(anchor_weekday)
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    idx = _index(epoch_ms, mode, width, anchor_weekday)
+
+    bounds = np.array([b for b in (start_ms, end_ms) if b is not None], dtype=np.int64)
+    bound_idx = _index(bounds, mode, width, anchor_weekday) if bounds.size else bounds
+    lo = bound_idx[0] if start_ms is not None else (idx.min() if idx.size else None)
+    hi = bound_idx[-1] if end_ms is not None else (idx.max() if idx.size else None)
+    if lo is None and hi is None:
+        empty = np.empty(0, dtype=np.int64)
+        return Buckets(resolution, empty, empty.copy())
+    lo = hi if lo is None else lo
+    hi = lo if hi is None else hi
+    if start_ms is not None or end_ms is not None:
+        idx = idx[(idx >= lo) & (idx <= hi)]
+
+    counts = np.bincount(idx - lo, minlength=max(int(hi - lo) + 1, 0)).astype(np.int64)
+    keys = np.arange(lo, lo + counts.size, dtype=np.int64)
+    if not dense:
+        keep = counts > 0
+        keys, counts = keys[keep], counts[keep]
+    return Buckets(resolution, _starts(keys, mode, width, anchor_weekday), counts)
+
+
+def cyclic_counts(epoch_ms: np.ndarray, field: str) -> np.ndarray:
+    """Counts per ET wall-clock position: 'hour' (24), 'weekday' (7, Mon=0) or 'quarter_hour' (96)."""
+    if field not in CYCLIC_FIELDS:
+        raise ValueError(f"field must be one of {', '.join(CYCLIC_FIELDS)}")
+    if field == 'hour':
+        keys = tz.hour_of_day(epoch_ms)
+    elif field == 'weekday':
+        keys = tz.weekday(epoch_ms)
+    else:
+        keys = tz.quarter_hour(epoch_ms)
+    return np.bincount(keys, minlength=CYCLIC_FIELDS[field]).astype(np.int64)
+
+
+def weekday_occurrences(first_day: int, last_day: int) -> np.ndarray:
+    """How often each weekday (Mon=0) occurs among local day numbers first_day..last_day inclusive."""
+    days = np.arange(first_day, last_day + 1, dtype=np.int64)
+    return np.bincount((days + EPOCH_WEEKDAY) % 7, minlength=7).astype(np.int64)
+
+
+def local_day(epoch_ms: int) -> int:
+    """ET local day number (days since 1970-01-01) of one instant."""
+    return int(tz.day_number(np.array([epoch_ms], dtype=np.int64))[0])
+
+
+def iso_labels(start_ms: np.ndarray, *, utc: bool = False, zulu: bool = False) -> np.ndarray:
+    """ISO 8601 labels to the second: ET with its offset, or UTC as '+00:00' (or 'Z' when zulu)."""
+    start_ms = np.asarray(start_ms, dtype=np.int64)
+    if utc:
+        text = np.datetime_as_string(start_ms.astype('datetime64[ms]'), unit='s')
+        return np.char.add(text, 'Z' if zulu else '+00:00')
+    offsets = utc_offset_ms(start_ms)
+    text = np.datetime_as_string((start_ms + offsets).astype('datetime64[ms]'), unit='s')
+    suffixes = {int(o): tz.offset_suffix(int(o)) for o in np.unique(offsets)}
+    return np.char.add(text, np.array([suffixes[int(o)] for o in offsets], dtype='<U6'))
@@ -0,0 +1,88 @@
+"""Adaptive upstream polling: how long a snapshot stays fresh, from the recent tweet rate and the market calendar.
+
+A snapshot is refreshed once roughly TARGET_NEW_TWEETS new tweets are expected at the
+rate seen in the trailing quarter-hours, within [XT_POLL_MIN_SECONDS, XT_POLL_MAX_SECONDS].
+In the XT_POLL_BOUNDARY_HOURS before a Tuesday/Friday noon ET market boundary the upper
+bound shrinks linearly towards the minimum, and no snapshot outlives the boundary itself:
+that cap wins over the minimum interval.
+"""
+import logging
+import os
+from typing import TYPE_CHECKING
+
+from src import metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MIN_ENV = 'XT_POLL_MIN_SECONDS'
+MAX_ENV = 'XT_POLL_MAX_SECONDS'
+BOUNDARY_ENV = 'XT_POLL_BOUNDARY_HOURS'
+DEFAULT_MIN_SECONDS = 60.0
+DEFAULT_MAX_SECONDS = 900.0
+DEFAULT_BOUNDARY_HOURS = 6.0
+TARGET_NEW_TWEETS = 1.0
+# Quarter-hour buckets (the current, partial one included) the arrival rate is measured over
+RATE_BUCKETS = 4
+BUCKET_MS = 15 * 60_000
+# Anchor weekdays of the markets (Tuesday and Friday at noon ET)
+MARKET_ANCHORS = (1, 4)
+POLL_INTERVAL = 'xt_poll_interval_seconds'
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    if raw:
+        try:
+            value = float(raw)
+            if value > 0:
+                return value
+        except ValueError:
+            pass
+        logger.warning("Ignoring invalid %s=%r", name, raw)
+    return default
+
+
+def limits() -> tuple[float, float]:
+    """Configured (min, max) polling interval in seconds; max never drops below min."""
+    lo = _env_float(MIN_ENV, DEFAULT_MIN_SECONDS)
+    return lo, max(_env_float(MAX_ENV, DEFAULT_MAX_SECONDS), lo)
+
+
+def recent_rate(epoch_ms: 'np.ndarray', as_of_ms: int) -> float:
+    """Tweets per second over the trailing RATE_BUCKETS quarter-hours up to as_of_ms."""
+    import numpy as np
+
+    start_ms = as_of_ms - as_of_ms % BUCKET_MS - (RATE_BUCKETS - 1) * BUCKET_MS
+    count = int(np.searchsorted(epoch_ms, as_of_ms, side='right') - np.searchsorted(epoch_ms, start_ms))
+    return count / max((as_of_ms - start_ms) / 1000.0, 1.0)
+
+
+def next_boundary_ms(as_of_ms: int) -> int:
+    """Epoch ms of the next Tuesday or Friday noon ET strictly after as_of_ms."""
+    from src import buckets
+
+    starts = []
+    for anchor in MARKET_ANCHORS:
+        week = int(buckets.bucket_index([as_of_ms], 'anchored_week', anchor_weekday=anchor)[0])
+        starts.append(int(buckets.bucket_starts([week + 1], 'anchored_week', anchor_weekday=anchor)[0]))
+    return min(starts)
+
+
+def poll_interval(epoch_ms: 'np.ndarray', as_of_ms: int) -> float:
+    """Seconds a snapshot taken at as_of_ms (holding the sorted instants epoch_ms) stays fresh."""
+    lo, hi = limits()
+    rate = recent_rate(epoch_ms, as_of_ms)
+    interval = TARGET_NEW_TWEETS / rate if rate > 0 else hi
+
+    until_boundary = (next_boundary_ms(as_of_ms) - as_of_ms) / 1000.0
+    window = _env_float(BOUNDARY_ENV, DEFAULT_BOUNDARY_HOURS) * 3600.0
+    if until_boundary < window:
+        interval = min(interval, lo + (hi - lo) * until_boundary / window)
+    # Expire at the boundary even inside the minimum interval, so the closing count is picked up promptly
+    return min(max(interval, lo), hi, until_boundary)
+
+
+metrics.describe(POLL_INTERVAL, "gauge", "Seconds the latest snapshot stays fresh before the upstream is polled again.")
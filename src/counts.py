@@ -0,0 +1,100 @@
+"""Tweet counts for arbitrary [start, end) windows, answered by binary search over a snapshot's sorted epoch array.
+
+The sorted array doubles as the cumulative-count index: the position of an instant
+is the number of tweets before it, so each window costs two O(log n) lookups.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from src import buckets, cadence
+from src.snapshot import ET_TZ, parse_instant_ms
+from src.tz import WEEKDAY_LABELS
+
+MAX_WINDOWS = 500
+NOW = 'now'
+
+Window = tuple[int, int]
+
+
+def parse_windows(pairs: Iterable[Sequence[str | None]], *, now_ms: int | None = None) -> list[Window]:
+    """Turn (start, end) ISO pairs into epoch-ms windows; a missing end or 'now' means the current time."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    windows: list[Window] = []
+    for pair in pairs:
+        if len(pair) != 2:
+            raise ValueError("each window must be a [start, end] pair")
+        start, end = pair
+        if start is None:
+            raise ValueError("each window needs a 'start'")
+        start_ms = parse_instant_ms(start, 'start')
+        end_ms = now_ms if end is None or end == NOW else parse_instant_ms(end, 'end')
+        if start_ms >= end_ms:
+            raise ValueError(f"window start {start!r} must be before its end")
+        windows.append((start_ms, end_ms))
+    if not windows:
+        raise ValueError("at least one window is required")
+    if len(windows) > MAX_WINDOWS:
+        raise ValueError(f"at most {MAX_WINDOWS} windows are allowed per call")
+    return windows
+
+
+def count_windows(epoch_ms: np.ndarray, windows: Sequence[Window]) -> np.ndarray:
+    """Count sorted epoch-ms instants in each half-open [start, end) window."""
+    bounds = np.asarray(windows, dtype=np.int64).reshape(-1, 2)
+    starts = np.searchsorted(epoch_ms, bounds[:, 0], side='left')
+    ends = np.searchsorted(epoch_ms, bounds[:, 1], side='left')
+    return ends - starts
+
+
+def _iso_et(epoch_ms: int) -> str:
+    seconds, millis = divmod(int(epoch_ms), 1000)
+    return (datetime.fromtimestamp(seconds, tz=ET_TZ) + timedelta(milliseconds=millis)).isoformat()
+
+
+def window_count_columns(epoch_ms: np.ndarray, windows: Sequence[Window]) -> dict[str, np.ndarray]:
+    """One entry per window, in request order: ET start and end labels plus the count."""
+    return {
+        'window_start_et': np.array([_iso_et(start_ms) for start_ms, _ in windows]),
+        'window_end_et': np.array([_iso_et(end_ms) for _, end_ms in windows]),
+        'total_count': count_windows(epoch_ms, windows).astype(np.int64),
+    }
+
+
+def _csv(columns: dict[str, np.ndarray]) -> str:
+    lines = [','.join(columns)]
+    lines.extend(','.join(str(value) for value in row) for row in zip(*(c.tolist() for c in columns.values())))
+    return '\n'.join(lines) + '\n'
+
+
+def window_counts_csv(epoch_ms: np.ndarray, windows: Sequence[Window]) -> str:
+    """CSV text with one row per window, in request order."""
+    return _csv(window_count_columns(epoch_ms, windows))
+
+
+def market_windows(epoch_ms: np.ndarray, as_of_ms: int) -> list[tuple[int, int, int]]:
+    """(anchor, window start ms, count) of each current Tue/Fri noon ET market window, through as_of_ms inclusive."""
+    out = []
+    for anchor in cadence.MARKET_ANCHORS:
+        week = buckets.bucket_index([as_of_ms], 'anchored_week', anchor_weekday=anchor)
+        start_ms = int(buckets.bucket_starts(week, 'anchored_week', anchor_weekday=anchor)[0])
+        count = int(np.searchsorted(epoch_ms, as_of_ms, side='right') - np.searchsorted(epoch_ms, start_ms))
+        out.append((anchor, start_ms, count))
+    return sorted(out, key=lambda row: row[1])
+
+
+def market_window_columns(epoch_ms: np.ndarray, as_of_ms: int) -> dict[str, np.ndarray]:
+    """Columns of the Polymarket latest-counts CSV, computed as of a fixed instant."""
+    rows = market_windows(epoch_ms, as_of_ms)
+    return {
+        'weekday': np.array([WEEKDAY_LABELS[anchor] for anchor, _, _ in rows]),
+        'window_start_et': np.array([_iso_et(start_ms) for _, start_ms, _ in rows]),
+        'total_count': np.array([count for _, _, count in rows], dtype=np.int64),
+    }
+
+
+def market_windows_csv(epoch_ms: np.ndarray, as_of_ms: int) -> str:
+    """Same columns as the Polymarket latest-counts CSV, computed as of a fixed instant."""
+    return _csv(market_window_columns(epoch_ms, as_of_ms))
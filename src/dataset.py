@@ -0,0 +1,170 @@
+"""Merged view of both sources, keyed by snowflake id with per-row source-presence flags.
+
+The two feeds overlap heavily, so instead of running a third pipeline the union is
+derived from the ids already held by each source's snapshot. Both id arrays are
+sorted, and a stable sort of their concatenation is a linear-time run merge.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+from src import metrics, snapshot
+from src.paths import DEFAULT_HANDLE
+
+logger = logging.getLogger(__name__)
+
+XTRACKER = 'xtracker'
+POLYMARKET = 'polymarket'
+UNION = 'union'
+SOURCE_FLAGS = {XTRACKER: 1, POLYMARKET: 2}
+SOURCES = (XTRACKER, POLYMARKET, UNION)
+TWITTER_EPOCH_MS = 1288834974657
+
+_cache_lock = threading.Lock()
+_cache: dict[tuple[str, int, int], 'MergedDataset'] = {}
+
+
+@dataclass(frozen=True)
+class MergedDataset:
+    """Unique snowflake ids (ascending), their source flags and creation times (epoch ms)."""
+    ids: np.ndarray
+    flags: np.ndarray
+    epoch_ms: np.ndarray
+    versions: dict[str, int]
+    fetched_at: float
+
+    def mask(self, source: str) -> np.ndarray | None:
+        """Rows present in source; None for the union (every row)."""
+        if source == UNION:
+            return None
+        if source not in SOURCE_FLAGS:
+            raise ValueError(f"source must be one of {', '.join(SOURCES)}")
+        return (self.flags & SOURCE_FLAGS[source]) != 0
+
+    def epoch_ms_for(self, source: str) -> np.ndarray:
+        mask = self.mask(source)
+        return self.epoch_ms if mask is None else self.epoch_ms[mask]
+
+    def overlap(self) -> dict[str, int]:
+        both = SOURCE_FLAGS[XTRACKER] | SOURCE_FLAGS[POLYMARKET]
+        return {
+            'union': int(self.ids.size),
+            'both': int(np.count_nonzero(self.flags == both)),
+            'xtracker_only': int(np.count_nonzero(self.flags == SOURCE_FLAGS[XTRACKER])),
+            'polymarket_only': int(np.count_nonzero(self.flags == SOURCE_FLAGS[POLYMARKET])),
+        }
+
+
+def merge_ids(xtracker_ids: np.ndarray, polymarket_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Merge two sorted unique id arrays into (ids, flags) with one flag bit per source present."""
+    ids = np.concatenate([xtracker_ids, polymarket_ids]).astype(np.int64, copy=False)
+    origin = np.concatenate([
+        np.full(len(xtracker_ids), SOURCE_FLAGS[XTRACKER], dtype=np.uint8),
+        np.full(len(polymarket_ids), SOURCE_FLAGS[POLYMARKET], dtype=np.uint8),
+    ])
+    # Stable sort (timsort) of two ascending runs is a single linear merge
+    order = np.argsort(ids, kind='stable')
+    ids, origin = ids[order], origin[order]
+    first = np.ones(ids.size, dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    flags = origin[first]
+    # Each id occurs at most once per source, so a repeat is the second source's copy
+    flags[np.cumsum(first)[~first] - 1] |= origin[~first]
+    return ids[first], flags
+
+
+def build(xtracker_snap: snapshot.Snapshot, polymarket_snap: snapshot.Snapshot) -> MergedDataset:
+    if xtracker_snap.ids is None or polymarket_snap.ids is None:
+        raise ValueError('both snapshots need snowflake ids to be merged')
+    ids, flags = merge_ids(xtracker_snap.ids, polymarket_snap.ids)
+    return MergedDataset(
+        ids=ids,
+        flags=flags,
+        epoch_ms=(ids >> 22) + TWITTER_EPOCH_MS,
+        versions={XTRACKER: xtracker_snap.version, POLYMARKET: polymarket_snap.version},
+        fetched_at=min(xtracker_snap.fetched_at, polymarket_snap.fetched_at),
+    )
+
+
+def _snapshot_loaders() -> dict[str, Callable[[bool, str], snapshot.Snapshot]]:
+    from src.download import _snapshot
+    from src.download_polymarket import _snapshot_pm
+
+    return {XTRACKER: _snapshot, POLYMARKET: _snapshot_pm}
+
+
+def _local_id_loaders() -> dict[str, Callable[[str], np.ndarray | None]]:
+    from src.db import load_ids
+    from src.download import local_ids
+
+    return {XTRACKER: local_ids, POLYMARKET: load_ids}
+
+
+def _snapshot_with_ids(
+    loader: Callable[[bool, str], snapshot.Snapshot],
+    local_ids: Callable[[str], np.ndarray | None],
+    force: bool,
+    handle: str,
+) -> snapshot.Snapshot:
+    snap = loader(force, handle)
+    if snap.ids is None:
+        # Loaded from CSVs persisted before ids were saved: read them back from the files the CSVs came from
+        ids = local_ids(handle)
+        if ids is not None and np.array_equal(np.sort((ids >> 22) + TWITTER_EPOCH_MS), snap.epoch_ms):
+            return snapshot.attach_ids(snap, ids)
+        # Those files are gone or have moved on since; only a refresh can recover the ids
+        logger.info('No local ids match the %s snapshot of %s, refreshing it', snap.source, handle)
+        snap = loader(True, handle)
+    return snap
+
+
+def merged(force: bool = False, handle: str = DEFAULT_HANDLE) -> MergedDataset:
+    """Return the merged dataset for the current snapshots of both sources, rebuilt only when either changes."""
+    loaders, local_ids = _snapshot_loaders(), _local_id_loaders()
+    xt = _snapshot_with_ids(loaders[XTRACKER], local_ids[XTRACKER], force, handle)
+    pm = _snapshot_with_ids(loaders[POLYMARKET], local_ids[POLYMARKET], force, handle)
+    key = (handle, xt.version, pm.version)
+    with _cache_lock:
+        cached = _cache.get(key)
+    metrics.record_cache(UNION, hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    with metrics.stage('merge', source=UNION) as st:
+        dataset = build(xt, pm)
+        st['rows'] = int(dataset.ids.size)
+    with _cache_lock:
+        # Only the latest pair of versions of a handle can be requested again
+        for stale in [k for k in _cache if k[0] == handle]:
+            del _cache[stale]
+        _cache[key] = dataset
+    return dataset
+
+
+def epoch_ms(source: str, force: bool = False, handle: str = DEFAULT_HANDLE) -> tuple[np.ndarray, dict[str, Any]]:
+    """Sorted epoch-ms array for a source (or the union) plus a description of the data behind it.
+
+    Single sources are served from their own snapshot so results match their
+    dedicated endpoints; the union comes from the merged dataset.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"source must be one of {', '.join(SOURCES)}")
+    started = time.perf_counter()
+    if source == UNION:
+        dataset = merged(force, handle)
+        info = {
+            'versions': dataset.versions,
+            'fetched_at': dataset.fetched_at,
+            'overlap': dataset.overlap(),
+        }
+        values = dataset.epoch_ms
+    else:
+        snap = _snapshot_loaders()[source](force, handle)
+        info = {'version': snap.version, 'fetched_at': snap.fetched_at}
+        values = snap.epoch_ms
+    info['load_ms'] = (time.perf_counter() - started) * 1000.0
+    return values, info
@@ -1,22 +1,41 @@
-"""Database management for Polymarket tweet storage with id and text columns."""
+"""Database management for Polymarket tweet storage with id and text columns.
+
+Tweet text lives only in the CSV; the ids are mirrored in a small .npz sidecar so
+id-only operations (latest id, stats, dedup) never parse or allocate text.
+"""
 import logging
 import os
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Sequence
 
+import numpy as np
 import pandas as pd
 
+from src import storage
+from src.paths import DEFAULT_HANDLE, HISTORIC_DIR, namespaced
+
 logger = logging.getLogger(__name__)
 
-ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-HISTORIC_DIR = os.path.join(ROOT_DIR, "historic")
 DB_PATH = os.path.join(HISTORIC_DIR, "elonmusk_db.csv")
+IDS_PATH = os.path.join(HISTORIC_DIR, "elonmusk_db_ids.npz")
+COLUMNS = ['id', 'text']
 ENCODING = "utf-8"
 
 # Twitter snowflake epoch
 TWITTER_EPOCH_MS = 1288834974657
 
-os.makedirs(HISTORIC_DIR, exist_ok=True)
+
+def db_path(handle: str = DEFAULT_HANDLE) -> str:
+    """CSV database of a handle; the default handle keeps historic/elonmusk_db.csv."""
+    if handle == DEFAULT_HANDLE:
+        return DB_PATH
+    return namespaced(os.path.join(HISTORIC_DIR, f"{handle}_db.csv"), handle)
+
+
+def _ids_path(handle: str) -> str:
+    if handle == DEFAULT_HANDLE:
+        return IDS_PATH
+    return f"{os.path.splitext(db_path(handle))[0]}_ids.npz"
 
 
 def _snowflake_to_datetime(snowflake_id: int) -> datetime:
@@ -26,56 +45,129 @@ def _snowflake_to_datetime(snowflake_id: int) -> datetime:
     return datetime.fromtimestamp(ts_s, tz=timezone.utc)
 
 
-def load_database() -> pd.DataFrame:
+def load_database(columns: Optional[Sequence[str]] = None, handle: str = DEFAULT_HANDLE) -> pd.DataFrame:
     """Load the existing database from CSV.
 
+    Args:
+        columns: Optional subset of ['id', 'text'] to parse; other columns are skipped while reading
+        handle: Account whose database is read
+
     Returns:
-        DataFrame with columns ['id', 'text']. Returns empty DataFrame if file doesn't exist.
+        DataFrame with the requested columns (default ['id', 'text']). Returns empty DataFrame if file doesn't exist.
     """
-    if not os.path.exists(DB_PATH):
-        logger.warning(f"Database file not found at {DB_PATH}, returning empty DataFrame")
-        return pd.DataFrame(columns=['id', 'text'])
+    columns = list(columns) if columns is not None else COLUMNS
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown database columns: {sorted(unknown)}")
+
+    path = db_path(handle)
+    if not storage.exists(path):
+        logger.warning(f"Database file not found at {path}, returning empty DataFrame")
+        return pd.DataFrame(columns=columns)
 
     try:
-        df = pd.read_csv(DB_PATH, dtype={'id': str}, encoding=ENCODING)
+        with storage.open_binary(path) as f:
+            df = pd.read_csv(f, usecols=columns, dtype={'id': str}, encoding=ENCODING)[columns]
         logger.info(f"Loaded {len(df)} tweets from database")
         return df
     except Exception as e:
         logger.error(f"Error loading database: {e}")
-        return pd.DataFrame(columns=['id', 'text'])
+        return pd.DataFrame(columns=columns)
+
+
+def _ids_to_int(id_column: pd.Series) -> np.ndarray:
+    """Numeric snowflake ids in file order; ids that do not parse are dropped."""
+    return pd.to_numeric(id_column, errors='coerce').dropna().astype('int64').to_numpy()
+
+
+def _db_signature(handle: str) -> np.ndarray:
+    path = db_path(handle)
+    st = os.stat(storage.locate(path) or path)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _write_ids(ids: np.ndarray, handle: str) -> None:
+    """Store ids next to the CSV, tagged with the CSV's size and mtime so stale sidecars are detected."""
+    ids_path = _ids_path(handle)
+    tmp_path = ids_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=np.asarray(ids, dtype=np.int64), db=_db_signature(handle))
+        os.replace(tmp_path, ids_path)
+    except OSError as e:
+        logger.warning(f"Could not write id sidecar {ids_path}: {e}")
 
 
-def save_database(df: pd.DataFrame) -> None:
-    """Save the database DataFrame to CSV.
+def load_ids(handle: str = DEFAULT_HANDLE) -> np.ndarray:
+    """Load the tweet ids (int64, file order) without reading the text column.
+
+    Served from the id sidecar when it matches the CSV; otherwise only the id column
+    is parsed and the sidecar is rebuilt.
+
+    Returns:
+        int64 array of snowflake ids; empty if the database doesn't exist
+    """
+    if not storage.exists(db_path(handle)):
+        return np.empty(0, dtype=np.int64)
+
+    try:
+        with np.load(_ids_path(handle)) as sidecar:
+            if np.array_equal(sidecar['db'], _db_signature(handle)):
+                return sidecar['ids']
+    except (OSError, KeyError, ValueError):
+        pass
+
+    ids = _ids_to_int(load_database(['id'], handle)['id'])
+    _write_ids(ids, handle)
+    return ids
+
+
+def load_ids_with_timestamps(handle: str = DEFAULT_HANDLE) -> tuple[np.ndarray, np.ndarray]:
+    """Load tweet ids and their creation times (UTC epoch milliseconds, from the snowflake) without any text.
+
+    Returns:
+        Tuple of (ids, epoch_ms) int64 arrays in file order
+    """
+    ids = load_ids(handle)
+    return ids, (ids >> 22) + TWITTER_EPOCH_MS
+
+
+def save_database(df: pd.DataFrame, handle: str = DEFAULT_HANDLE) -> None:
+    """Save the database DataFrame to CSV (compressed when storage compression is configured).
 
     Args:
         df: DataFrame with columns ['id', 'text']
+        handle: Account whose database is written
     """
+    path = db_path(handle)
     try:
-        df.to_csv(DB_PATH, index=False, encoding=ENCODING)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        storage.write_bytes(path, df.to_csv(index=False).encode(ENCODING))
         logger.info(f"Saved {len(df)} tweets to database")
+        _write_ids(_ids_to_int(df['id']), handle)
     except Exception as e:
         logger.error(f"Error saving database: {e}")
         raise
 
 
-def append_tweets(new_tweets: list[dict[str, str]]) -> tuple[int, int]:
+def append_tweets(new_tweets: list[dict[str, str]], handle: str = DEFAULT_HANDLE) -> tuple[int, int]:
     """Append new tweets to the database with deduplication.
 
+    Only the existing ids are loaded; new rows are appended to the CSV in place.
+
     Args:
         new_tweets: List of dicts with 'id' and 'text' keys
+        handle: Account whose database is updated
 
     Returns:
         Tuple of (total_tweets, new_tweets_added)
     """
+    existing = load_ids(handle)
     if not new_tweets:
         logger.info("No new tweets to append")
-        df = load_database()
-        return len(df), 0
+        return len(existing), 0
 
-    # Load existing database
-    existing_df = load_database()
-    existing_ids = set(existing_df['id'].astype(str)) if not existing_df.empty else set()
+    existing_ids = set(map(str, existing.tolist()))
 
     # Filter out duplicates
     unique_new_tweets = []
@@ -91,50 +183,46 @@ def append_tweets(new_tweets: list[dict[str, str]]) -> tuple[int, int]:
 
     if not unique_new_tweets:
         logger.info(f"All {len(new_tweets)} tweets already exist in database")
-        return len(existing_df), 0
+        return len(existing), 0
 
     # Create DataFrame from new tweets
-    new_df = pd.DataFrame(unique_new_tweets)
+    new_df = pd.DataFrame(unique_new_tweets, columns=COLUMNS)
 
-    # Append to existing
-    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-
-    # Save back to disk
-    save_database(combined_df)
+    # Append to the CSV on disk instead of rewriting it
+    path = db_path(handle)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        exists = storage.exists(path)
+        storage.append_bytes(path, new_df.to_csv(header=not exists, index=False).encode(ENCODING))
+    except Exception as e:
+        logger.error(f"Error appending to database: {e}")
+        raise
+    combined = np.concatenate([existing, _ids_to_int(new_df['id'])])
+    _write_ids(combined, handle)
 
     logger.info(f"Added {len(unique_new_tweets)} new tweets (out of {len(new_tweets)} fetched)")
-    return len(combined_df), len(unique_new_tweets)
+    return len(combined), len(unique_new_tweets)
 
 
-def get_most_recent_tweet_id() -> Optional[str]:
+def get_most_recent_tweet_id(handle: str = DEFAULT_HANDLE) -> Optional[str]:
     """Get the most recent tweet ID from the database.
 
     Returns:
         The highest snowflake ID as a string, or None if database is empty
     """
-    df = load_database()
-    if df.empty:
-        return None
-
-    # Convert to numeric, find max
-    try:
-        ids = pd.to_numeric(df['id'], errors='coerce').dropna()
-        if ids.empty:
-            return None
-        max_id = int(ids.max())
-        return str(max_id)
-    except Exception as e:
-        logger.error(f"Error finding most recent tweet: {e}")
+    ids = load_ids(handle)
+    if ids.size == 0:
         return None
+    return str(int(ids.max()))
 
 
-def get_most_recent_timestamp() -> Optional[datetime]:
+def get_most_recent_timestamp(handle: str = DEFAULT_HANDLE) -> Optional[datetime]:
     """Get the timestamp of the most recent tweet in the database.
 
     Returns:
         UTC datetime of the most recent tweet, or None if database is empty
     """
-    most_recent_id = get_most_recent_tweet_id()
+    most_recent_id = get_most_recent_tweet_id(handle)
     if most_recent_id is None:
         return None
 
@@ -145,13 +233,13 @@ def get_most_recent_timestamp() -> Optional[datetime]:
         return None
 
 
-def database_to_csv_with_timestamps() -> bytes:
+def database_to_csv_with_timestamps(handle: str = DEFAULT_HANDLE) -> bytes:
     """Convert the database to 3-column CSV format (id, text, created_at).
 
     Returns:
         CSV bytes with columns: id, text, created_at
     """
-    df = load_database()
+    df = load_database(handle=handle)
 
     if df.empty:
         # Return empty CSV with headers
@@ -179,46 +267,26 @@ def database_to_csv_with_timestamps() -> bytes:
     return csv_str.encode(ENCODING)
 
 
-def get_database_stats() -> dict:
+def get_database_stats(handle: str = DEFAULT_HANDLE) -> dict:
     """Get statistics about the database.
 
     Returns:
         Dict with keys: total_tweets, oldest_date, newest_date
     """
-    df = load_database()
+    ids = load_ids(handle)
 
-    if df.empty:
+    if ids.size == 0:
         return {
             'total_tweets': 0,
             'oldest_date': None,
             'newest_date': None
         }
 
-    try:
-        ids = pd.to_numeric(df['id'], errors='coerce').dropna().astype('int64')
-
-        if ids.empty:
-            return {
-                'total_tweets': len(df),
-                'oldest_date': None,
-                'newest_date': None
-            }
+    oldest_date = _snowflake_to_datetime(int(ids.min()))
+    newest_date = _snowflake_to_datetime(int(ids.max()))
 
-        oldest_id = int(ids.min())
-        newest_id = int(ids.max())
-
-        oldest_date = _snowflake_to_datetime(oldest_id)
-        newest_date = _snowflake_to_datetime(newest_id)
-
-        return {
-            'total_tweets': len(df),
-            'oldest_date': oldest_date.isoformat(),
-            'newest_date': newest_date.isoformat()
-        }
-    except Exception as e:
-        logger.error(f"Error calculating database stats: {e}")
-        return {
-            'total_tweets': len(df),
-            'oldest_date': None,
-            'newest_date': None
-        }
+    return {
+        'total_tweets': int(ids.size),
+        'oldest_date': oldest_date.isoformat(),
+        'newest_date': newest_date.isoformat()
+    }
@@ -0,0 +1,168 @@
+"""Incremental bucket responses: only the rows that changed since a client's cursor.
+
+Every publish records which instants were added or removed relative to the snapshot
+it replaced, so the buckets touched since any recent version are known without
+keeping old snapshots. A cursor is either `<boot token>:<version>` (as returned in
+the previous response) or an ISO timestamp, meaning "every bucket from there on".
+The history lives in this process only, and versions restart when a snapshot is
+rebuilt from files, so a cursor issued by another process (or a bare version) gets
+a full response instead of an empty delta for different data.
+
+numpy and the pandas-backed bucketing engine load lazily, so importing this module
+from main registers its listener before the first snapshot is published.
+"""
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from src import snapshot
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Versions of change history kept per (source, handle); older cursors get a full response
+HISTORY_VERSIONS = 256
+# Identifies the history of this process in the cursors it issues
+BOOT_TOKEN = secrets.token_hex(4)
+_CURSOR = re.compile(r'^([0-9a-f]{8}):(\d+)$')
+# kind -> (bucketing resolution, label column, dense through today)
+KINDS = {
+    '15min': ('15m', '15m_bucket_start_et', False),
+    'date': ('day', 'date_start_et', True),
+}
+
+
+@dataclass(frozen=True)
+class _Change:
+    version: int
+    fetched_at: float
+    # Sorted instants (epoch ms) added or removed by this version; None when unknown (no predecessor)
+    changed_ms: 'np.ndarray | None'
+
+
+_lock = threading.Lock()
+_history: dict[tuple[str, str], deque[_Change]] = {}
+
+
+def _changed_ms(snap: snapshot.Snapshot, previous: snapshot.Snapshot | None) -> 'np.ndarray | None':
+    import numpy as np
+
+    from src.dataset import TWITTER_EPOCH_MS
+
+    if previous is None:
+        return None
+    if snap.ids is not None and previous.ids is not None:
+        ids = np.setxor1d(snap.ids, previous.ids, assume_unique=True)
+        return (ids >> 22) + TWITTER_EPOCH_MS
+    # Without ids, instants sharing a millisecond collapse; bucket granularity makes that harmless
+    return np.setxor1d(snap.epoch_ms, previous.epoch_ms)
+
+
+def record(snap: snapshot.Snapshot, previous: snapshot.Snapshot | None) -> None:
+    """Snapshot listener: remember what this version changed."""
+    change = _Change(snap.version, snap.fetched_at, _changed_ms(snap, previous))
+    with _lock:
+        _history.setdefault((snap.source, snap.handle), deque(maxlen=HISTORY_VERSIONS)).append(change)
+
+
+def _changes_since(snap: snapshot.Snapshot, version: int) -> 'tuple[np.ndarray, float] | None':
+    """Instants changed after version up to snap, plus that version's fetch time; None if not covered."""
+    import numpy as np
+
+    if version == snap.version:
+        return np.empty(0, dtype=np.int64), snap.fetched_at
+    with _lock:
+        history = list(_history.get((snap.source, snap.handle), ()))
+    newer = [c for c in history if version < c.version <= snap.version]
+    known = {c.version for c in history}
+    if version not in known or len(newer) != snap.version - version or any(c.changed_ms is None for c in newer):
+        return None
+    base = next(c for c in history if c.version == version)
+    return np.concatenate([c.changed_ms for c in newer]), base.fetched_at
+
+
+def parse_cursor(since: str) -> tuple[str | None, int | None, int | None]:
+    """(boot token, version, timestamp ms) from a cursor: `<token>:<version>`, a bare version or an ISO timestamp.
+
+    A bare version has no token; naive timestamps are ET.
+    """
+    since = str(since).strip()
+    m = _CURSOR.match(since)
+    if m:
+        return m.group(1), int(m.group(2)), None
+    if since.isdigit():
+        return None, int(since), None
+    return None, None, snapshot.parse_instant_ms(since, 'since')
+
+
+def _rows(epoch_ms: 'np.ndarray', resolution: str, keys: 'np.ndarray') -> 'tuple[np.ndarray, np.ndarray]':
+    """Bucket starts and counts of the given bucket numbers, straight from the sorted epoch array."""
+    import numpy as np
+
+    from src import buckets
+
+    keys = np.unique(keys)
+    starts = buckets.bucket_starts(keys, resolution)
+    ends = buckets.bucket_starts(keys + 1, resolution)
+    counts = np.searchsorted(epoch_ms, ends, side='left') - np.searchsorted(epoch_ms, starts, side='left')
+    return starts, counts
+
+
+def bucket_delta(snap: snapshot.Snapshot, kind: str, since: str, now_ms: int | None = None) -> dict[str, Any]:
+    """Rows of the `kind` aggregate that changed since the cursor, with the cursor for the next call.
+
+    `full` is true when the cursor is unknown, too old or from another process and every row is returned. Rows
+    with a zero count in sparse kinds mark buckets whose tweets were all removed.
+    """
+    import numpy as np
+
+    from src import buckets
+
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    resolution, column, dense = KINDS[kind]
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    epoch_ms = snap.epoch_ms
+    token, version, since_ms = parse_cursor(since)
+
+    full = False
+    if version is not None:
+        changes = _changes_since(snap, version) if token == BOOT_TOKEN and version <= snap.version else None
+        if changes is None:
+            full, since_ms = True, None
+        else:
+            changed_ms, base_fetched_at = changes
+            keys = buckets.bucket_index(changed_ms, resolution)
+            if dense:
+                # Days that started since the client's version appear even when empty
+                first = buckets.bucket_index([int(base_fetched_at * 1000)], resolution)[0]
+                last = buckets.bucket_index([now_ms], resolution)[0]
+                keys = np.concatenate([keys, np.arange(first, last + 1, dtype=np.int64)])
+            starts, counts = _rows(epoch_ms, resolution, keys)
+
+    if version is None or full:
+        if epoch_ms.size == 0:
+            starts = counts = np.empty(0, dtype=np.int64)
+        else:
+            counted = buckets.bucketize(
+                epoch_ms, resolution, start_ms=since_ms, end_ms=now_ms if dense else None, dense=dense,
+            )
+            starts, counts = counted.start_ms, counted.counts
+
+    return {
+        'source': snap.source,
+        'handle': snap.handle,
+        'kind': kind,
+        'since': since,
+        'cursor': f"{BOOT_TOKEN}:{snap.version}",
+        'full': full,
+        'columns': [column, 'total_count'],
+        'rows': [[str(label), int(c)] for label, c in zip(buckets.iso_labels(starts), counts)],
+    }
+
+
+snapshot.add_listener(record)
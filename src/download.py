@@ -2,15 +2,18 @@ import logging
 import os
 import time
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, NamedTuple
 
-import pytz
-import requests
+from src import cadence, ingest, metrics, paths, snapshot, storage, upstream
+from src.paths import DEFAULT_HANDLE, DOWNLOAD_DIR_MAIN
+from src.tz import ET_TZ
 
-from src.sanitize import (
-    DOWNLOAD_DIR_MAIN, count_tweets, create_clean_timestamps_csv, get_average_tweets_per_day,
-    get_first_tweet_timestamp, process_by_15min, process_by_date, process_by_hour, process_by_week, process_by_weekday,
-    sanitize_csv_to_file, save_tweets_to_csv,
-)
+if TYPE_CHECKING:
+    import httpx
+    import numpy as np
+    import requests
+
+# requests and the pandas-backed src.sanitize are imported where they are used to keep cold starts light.
 
 logger = logging.getLogger(__name__)
 
@@ -25,76 +28,261 @@ UTC_PREFIX = os.path.join(DOWNLOAD_DIR_MAIN, 'utc_elonmusk')
 UTC_PATH = f"{UTC_PREFIX}.csv"
 
 ENCODING = 'utf-8'
+SOURCE = 'xtracker'
+XTRACKER_API_URL = 'https://www.xtracker.io/api/download'
+# Points the download at another host, such as the stand-in upstream of src.loadtest
+BASE_URL_ENV = 'XT_XTRACKER_BASE_URL'
+
+
+class _Paths(NamedTuple):
+    raw: str
+    pre_prefix: str
+    pre: str
+    clean_prefix: str
+    clean: str
+    utc_prefix: str
+    utc: str
+    cc_prefix: str
+    cc: str
+
+
+def _paths_for(handle: str) -> _Paths:
+    """Pipeline files of a handle; the default handle resolves to the module-level paths above."""
+    base = paths.namespaced(DOWNLOAD_DIR_MAIN, handle)
+    prefixes = [os.path.join(base, f'{kind}_{handle}') for kind in ('pre', 'clean', 'utc', 'cc')]
+    pre, clean, utc, cc = prefixes
+    return _Paths(
+        os.path.join(base, f'raw_{handle}.csv'),
+        pre, f"{pre}.csv", clean, f"{clean}.csv", utc, f"{utc}.csv", cc, f"{cc}.csv",
+    )
 
 
 def _check_modify_date(path: str, modify_date: float = 300) -> bool:
     return (
-        os.path.exists(path)
-        and time.time() - os.path.getmtime(path) < modify_date
+        storage.exists(path)
+        and time.time() - storage.getmtime(path) < modify_date
     )
 
 
-def _download_all(force: bool = False) -> tuple[bytes, bytes, bytes]:
+def _download_all(force: bool = False, handle: str = DEFAULT_HANDLE) -> tuple[bytes, bytes, bytes]:
     """
-    Download the full Elon Musk tweet CSV if local files are fresh; otherwise fetch from API.
-    Sanitizes, processes, and saves aggregated results to disk.
+    Timestamp CSVs of handle's tweets (default: elonmusk) from its current snapshot.
+    A stale snapshot is refreshed first: the handle's full CSV is downloaded from the XTracker API,
+    then sanitized, processed and saved under the handle's download directory.
     Set force=True to bypass cache freshness checks.
 
     Returns:
         tuple of (clean_csv_bytes, utc_csv_bytes, cc_csv_bytes)
     """
-    # Check cache freshness (5 minutes) unless force refresh requested
-    if not force and all(_check_modify_date(p) for p in (RAW_PATH, PRE_PATH, CLEAN_PATH, UTC_PATH, CC_PATH)):
-        logger.info('Using cached files')
-        with open(CLEAN_PATH, 'rb') as f:
-            clean_bytes = f.read()
-        with open(UTC_PATH, 'rb') as f:
-            utc_bytes = f.read()
-        with open(CC_PATH, 'rb') as f:
-            cc_bytes = f.read()
-        return clean_bytes, utc_bytes, cc_bytes
-    else:
-        logger.info('Downloading fresh data from XTracker API')
-        resp = requests.post(
-            'https://www.xtracker.io/api/download',
-            json={'handle': 'elonmusk', 'platform': 'X'},
-            headers={'Content-Type': 'application/json', 'media-type': 'text/event-stream'},
-            timeout=30,
-        )
+    return _snapshot(force, handle).csv_triple()
+
+
+def _snapshot(force: bool = False, handle: str = DEFAULT_HANDLE) -> snapshot.Snapshot:
+    """Return the handle's current snapshot, refreshing it first when stale (or when force=True)."""
+    paths.validate_handle(handle)
+    with metrics.bind_source(SOURCE), paths.bind_handle(handle):
+        return _refresh_snapshot(force, handle)
+
+
+def _refresh_snapshot(force: bool, handle: str) -> snapshot.Snapshot:
+    # Serve the in-memory snapshot until its adaptive polling interval runs out unless force refresh requested
+    if not force:
+        # Already refreshed on the event loop for this request (see src.ingest)
+        prefetched = ingest.resolved(SOURCE, handle)
+        if prefetched is not None:
+            return prefetched
+    snap = snapshot.current(SOURCE, handle)
+    if not force and snapshot.is_fresh(snap):
+        metrics.record_cache(SOURCE, hit=True)
+        return snap
+    if force or snap is None:
+        return _refresh_locked(force, handle)
+    # A slow or failing upstream must not hold the request past its deadline while older data exists
+    return upstream.refresh_within_deadline(snap, lambda: _refresh_locked(force, handle))
+
+
+def _refresh_locked(force: bool, handle: str) -> snapshot.Snapshot:
+    with snapshot.refresh_lock(SOURCE, handle):
+        snap, fresh = _restore(force, handle)
+        if fresh:
+            return snap
+        metrics.record_cache(SOURCE, hit=False)
+        try:
+            resp = _fetch(handle, snap)
+        except upstream.UpstreamError as e:
+            if force or snap is None:
+                raise
+            return upstream.serve_after_failure(snap, e)
+        return _apply(handle, snap, resp)
+
+
+def _restore(force: bool, handle: str) -> tuple[snapshot.Snapshot | None, bool]:
+    """The handle's latest snapshot (from memory, else its checkpoint or files) and whether it is still fresh.
+
+    Call with the refresh lock held.
+    """
+    # Another request may have refreshed while we waited for the lock
+    snap = snapshot.current(SOURCE, handle)
+    if not force and snapshot.is_fresh(snap):
+        metrics.record_cache(SOURCE, hit=True)
+        return snap, True
+
+    files = _paths_for(handle)
+    if not force and snap is None:
+        # After a restart or an eviction resume from the checkpoint, fresh by its recorded fetch time
+        snap = snapshot.load_checkpoint(SOURCE, files.clean, handle)
+        # Files from before checkpoints existed only have their mtime to go by
+        if snap is None and all(
+            _check_modify_date(p, cadence.limits()[1])
+            for p in (files.raw, files.pre, files.clean, files.utc, files.cc)
+        ):
+            snap = snapshot.load_from_files(SOURCE, files.clean, files.utc, files.cc, handle=handle)
+        if snapshot.is_fresh(snap):
+            metrics.record_cache(SOURCE, hit=True)
+            logger.info('Using cached files for %s', handle)
+            return snap, True
+    return snap, False
+
+
+def _download_request(handle: str, snap: snapshot.Snapshot | None) -> dict:
+    return {
+        'url': upstream.with_origin(XTRACKER_API_URL, BASE_URL_ENV),
+        'json': {'handle': handle, 'platform': 'X'},
+        'headers': {
+            'Content-Type': 'application/json',
+            'media-type': 'text/event-stream',
+            **snapshot.conditional_headers(snap),
+        },
+    }
+
+
+def _fetch(handle: str, snap: snapshot.Snapshot | None) -> 'requests.Response':
+    """POST the download request through the XTracker circuit breaker; failures raise UpstreamError."""
+    import requests
+
+    with upstream.breaker(SOURCE).guard(), metrics.stage('download') as st:
+        logger.info('Downloading fresh data for %s from XTracker API', handle)
+        resp = requests.post(**_download_request(handle, snap), timeout=upstream.TIMEOUT)
         resp.raise_for_status()
-        logger.info('Download status code: %s', resp.status_code)
-        save_tweets_to_csv(resp.content, RAW_PATH)
-        pre_bytes = sanitize_csv_to_file(resp.content, PRE_PREFIX)
-        clean_bytes, utc_bytes, cc_bytes = create_clean_timestamps_csv(
-            pre_bytes,
-            CLEAN_PREFIX,
-            UTC_PREFIX,
-            CC_PREFIX,
-        )
-        return clean_bytes, utc_bytes, cc_bytes
-
-
-def _download(force: bool = False) -> bytes:
+        st['bytes'] = len(resp.content)
+    logger.info('Download status code: %s', resp.status_code)
+    return resp
+
+
+async def fetch_async(client: 'httpx.AsyncClient', handle: str, snap: snapshot.Snapshot | None) -> 'httpx.Response':
+    """_fetch on the event loop, for src.ingest."""
+    with upstream.breaker(SOURCE).guard(), metrics.stage('download') as st:
+        logger.info('Downloading fresh data for %s from XTracker API', handle)
+        resp = await client.post(**_download_request(handle, snap))
+        # httpx treats every non-2xx answer as an error, including the 304 of a conditional request
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        st['bytes'] = len(resp.content)
+    logger.info('Download status code: %s', resp.status_code)
+    return resp
+
+
+def _apply(handle: str, snap: snapshot.Snapshot | None, resp: Any) -> snapshot.Snapshot:
+    """Process a download response (requests or httpx) into the next snapshot; call with the refresh lock held."""
+    files = _paths_for(handle)
+    if resp.status_code == 304 and snap is not None:
+        # Unchanged upstream: the current data is simply fresh again
+        renewed = snapshot.renew(snap)
+        if renewed is not None:
+            return renewed
+        snap = snapshot.publish(
+            SOURCE, *snap.csv_triple(), ids=snap.ids, handle=handle, validators=snap.validators,
+        )
+        snapshot.save_checkpoint(snap, files.clean)
+        return snap
+
+    from src.sanitize import (
+        create_clean_timestamps_from_ids, ids_from_csv_bytes, sanitize_csv_to_file, save_tweets_to_csv,
+    )
+
+    save_tweets_to_csv(resp.content, files.raw)
+    pre_bytes = sanitize_csv_to_file(resp.content, files.pre_prefix)
+    ids = ids_from_csv_bytes(pre_bytes)
+    clean_bytes, utc_bytes, cc_bytes = create_clean_timestamps_from_ids(
+        ids,
+        files.clean_prefix,
+        files.utc_prefix,
+        files.cc_prefix,
+    )
+    snapshot.save_ids(files.clean, ids)
+    validators = snapshot.validators_from(resp.headers)
+    snap = snapshot.publish(SOURCE, clean_bytes, utc_bytes, cc_bytes, ids=ids, handle=handle, validators=validators)
+    snapshot.save_checkpoint(snap, files.clean)
+    return snap
+
+
+def restore(handle: str) -> tuple[snapshot.Snapshot | None, bool]:
+    """_restore under the refresh lock, for src.ingest."""
+    with snapshot.refresh_lock(SOURCE, handle):
+        return _restore(False, handle)
+
+
+def apply(handle: str, snap: snapshot.Snapshot | None, resp: Any) -> snapshot.Snapshot:
+    """_apply under the refresh lock, for src.ingest; a snapshot refreshed meanwhile by another path wins."""
+    with snapshot.refresh_lock(SOURCE, handle):
+        latest = snapshot.current(SOURCE, handle)
+        if latest is not snap and snapshot.is_fresh(latest):
+            return latest
+        return _apply(handle, snap, resp)
+
+
+def local_ids(handle: str = DEFAULT_HANDLE) -> 'np.ndarray | None':
+    """Snowflake ids of the handle's sanitized download, read back from disk; None when it is missing."""
+    from src.sanitize import ids_from_csv_bytes
+
+    pre = _paths_for(handle).pre
+    if not storage.exists(pre):
+        return None
+    return ids_from_csv_bytes(storage.read_bytes(pre))
+
+
+def warm_up() -> bool:
+    """Restore the last checkpoint (or persisted CSVs) into memory; return True when it is still fresh."""
+    snap = (
+        snapshot.load_checkpoint(SOURCE, CLEAN_PATH)
+        or snapshot.load_from_files(SOURCE, CLEAN_PATH, UTC_PATH, CC_PATH)
+    )
+    return snapshot.is_fresh(snap)
+
+
+def _download(force: bool = False, handle: str = DEFAULT_HANDLE) -> bytes:
     """
-    Download the full Elon Musk tweet CSV if local files are fresh; otherwise fetch from API.
-    Sanitizes, processes, and saves aggregated results to disk.
+    Clean timestamp CSV of handle's tweets (default: elonmusk), refreshed from the XTracker API when stale.
+    See _download_all.
 
     Returns the processed clean CSV content as bytes.
     """
-    clean_bytes, _, _ = _download_all(force)
+    clean_bytes, _, _ = _download_all(force, handle)
     return clean_bytes
 
 
-def get_tweets_by_hour(force: bool = False) -> str:
-    return process_by_hour(_download(force)).decode(ENCODING)
+def get_tweets_by_hour(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    from src.sanitize import process_by_hour
+
+    clean_bytes = _download(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_hour(clean_bytes).decode(ENCODING)
 
 
-def get_tweets_by_date(force: bool = False) -> str:
-    return process_by_date(_download(force)).decode(ENCODING)
+def get_tweets_by_date(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    from src.sanitize import process_by_date
 
+    clean_bytes = _download(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_date(clean_bytes).decode(ENCODING)
 
-def get_tweets_by_weekday(force: bool = False) -> str:
-    return process_by_weekday(_download(force)).decode(ENCODING)
+
+def get_tweets_by_weekday(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    from src.sanitize import process_by_weekday
+
+    clean_bytes = _download(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_weekday(clean_bytes).decode(ENCODING)
 
 
 def _anchor_from_param(anchor: int) -> int:
@@ -103,46 +291,132 @@ def _anchor_from_param(anchor: int) -> int:
     return anchor
 
 
-def get_tweets_by_week(anchor: int = 4, use_utc: bool = False, force: bool = False) -> str:
+def get_tweets_by_week(
+    anchor: int = 4,
+    use_utc: bool = False,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> str:
+    from src.sanitize import process_by_week
+
     anchor = _anchor_from_param(anchor)
-    return process_by_week(_download(force), anchor_weekday=anchor, use_utc=use_utc).decode(ENCODING)
+    clean_bytes = _download(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_week(clean_bytes, anchor_weekday=anchor, use_utc=use_utc).decode(ENCODING)
+
+
+def get_tweets_by_15min(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    from src.sanitize import process_by_15min
+
+    clean_bytes = _download(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_15min(clean_bytes).decode(ENCODING)
+
+
+def get_aggregate_columns(
+    kind: str,
+    anchor: int = 4,
+    use_utc: bool = False,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> dict:
+    """Return the columns of one hour/date/weekday/week/15min aggregate, for the JSON and binary output formats."""
+    from src.sanitize import aggregate_columns
+
+    anchor = _anchor_from_param(anchor)
+    return aggregate_columns(_snapshot(force, handle).epoch_ms, kind, anchor_weekday=anchor, use_utc=use_utc)
+
 
+def get_bucket_delta(kind: str, since: str, force: bool = False, handle: str = DEFAULT_HANDLE) -> dict:
+    """Return the rows of the '15min' or 'date' aggregate changed since a cursor (snapshot version or ISO time)."""
+    from src.deltas import bucket_delta
 
-def get_tweets_by_15min(force: bool = False) -> str:
-    return process_by_15min(_download(force)).decode(ENCODING)
+    return bucket_delta(_snapshot(force, handle), kind, since)
 
 
-def get_total_tweets(force: bool = False) -> int:
-    return count_tweets(_download(force))
+def get_total_tweets(force: bool = False, handle: str = DEFAULT_HANDLE) -> int:
+    return _snapshot(force, handle).stats.count
 
 
-def get_avg_per_day(force: bool = False) -> float:
-    return get_average_tweets_per_day(_download(force))
+def get_avg_per_day(force: bool = False, handle: str = DEFAULT_HANDLE) -> float:
+    return _snapshot(force, handle).stats.avg_per_day()
 
 
-def get_first_tweet_date(force: bool = False) -> str:
-    dt = get_first_tweet_timestamp(_download(force)).astimezone(pytz.timezone('America/New_York'))
-    return dt.isoformat()
+def get_first_tweet_date(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    return _snapshot(force, handle).stats.first_tweet_iso()
 
 
 def get_time_now() -> str:
     # Current time in Eastern Time (ET)
-    return datetime.now(pytz.timezone('America/New_York')).isoformat()
+    return datetime.now(ET_TZ).isoformat()
 
 
-def get_data_range(force: bool = False) -> int:
-    first_tweet = get_first_tweet_timestamp(_download(force)).astimezone(pytz.timezone('America/New_York'))
-    now_et = datetime.now(pytz.timezone('America/New_York'))
-    return int((now_et - first_tweet).total_seconds())
+def get_data_range(force: bool = False, handle: str = DEFAULT_HANDLE) -> int:
+    return int(_snapshot(force, handle).stats.seconds_since_first())
 
 
-def get_utc_csv(force: bool = False) -> str:
-    """Return the utc_elonmusk.csv file as bytes."""
-    _, utc_bytes, _ = _download_all(force)
+def get_window_counts(
+    windows: list[tuple[str, str | None]],
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> str:
+    from src.counts import parse_windows, window_counts_csv
+
+    parsed = parse_windows(windows)
+    return window_counts_csv(_snapshot(force, handle).epoch_ms, parsed)
+
+
+def get_window_count_columns(
+    windows: list[tuple[str, str | None]],
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> dict:
+    """Return the columns of the window counts CSV (JSON and binary output formats)."""
+    from src.counts import parse_windows, window_count_columns
+
+    parsed = parse_windows(windows)
+    return window_count_columns(_snapshot(force, handle).epoch_ms, parsed)
+
+
+def get_week_stats(
+    anchor: int | None = None,
+    window: str | None = None,
+    bracket_width: int = 20,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> list[dict]:
+    """Return precomputed weekly-count distributions per anchor and window ('all' or trailing weeks)."""
+    from src.weekstats import select
+
+    return select(_snapshot(force, handle).week_stats, anchor, window, bracket_width)
+
+
+def get_utc_csv(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    """Return the utc_<handle>.csv file as bytes."""
+    _, utc_bytes, _ = _download_all(force, handle)
     return utc_bytes.decode(ENCODING)
 
 
-def get_cc_csv(force: bool = False) -> str:
-    """Return the cc_elonmusk.csv file as bytes (recent 6 months)."""
-    _, _, cc_bytes = _download_all(force)
+def get_cc_csv(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    """Return the cc_<handle>.csv file as bytes (recent 6 months)."""
+    _, _, cc_bytes = _download_all(force, handle)
     return cc_bytes.decode(ENCODING)
+
+
+def get_csv_artifact(
+    kind: str,
+    accept_encoding: str | None = None,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> tuple[bytes, str | None]:
+    """
+    Return the 'utc' or 'cc' CSV as (body, content-coding). When the file is stored compressed, matches
+    the snapshot and the client accepts its coding, the stored bytes are returned as is; else plain CSV bytes.
+    """
+    snap = _snapshot(force, handle)
+    files = _paths_for(handle)
+    artifacts = {'utc': (files.utc, snap.utc_bytes), 'cc': (files.cc, snap.cc_bytes)}
+    if kind not in artifacts:
+        raise ValueError("kind must be 'utc' or 'cc'")
+    path, data = artifacts[kind]
+    return storage.precompressed(path, data, accept_encoding) or (data, None)
@@ -1,46 +1,28 @@
 """Download and process tweets from the Polymarket XTracker API endpoint."""
+import asyncio
 import json
 import logging
 import os
 import time
 from datetime import datetime, timedelta
-from typing import Optional
-
-import pytz
-import requests
-
-from src.db import (
-    append_tweets,
-    database_to_csv_with_timestamps,
-    get_most_recent_timestamp,
-)
-from src.sanitize import (
-    DOWNLOAD_DIR,
-    count_tweets,
-    create_clean_timestamps_csv,
-    get_average_tweets_per_day,
-    get_first_tweet_timestamp,
-    process_by_15min,
-    process_by_date,
-    process_by_hour,
-    process_by_week,
-    process_by_weekday,
-    process_last_tue_fri_counts_with_weekly_refresh,
-    sanitize_csv_to_file,
-    save_tweets_to_csv,
-)
+from typing import TYPE_CHECKING, NamedTuple, Optional
 
-logger = logging.getLogger(__name__)
+from src import cadence, ingest, metrics, paths, snapshot, storage, upstream
+from src.paths import DEFAULT_HANDLE, DOWNLOAD_DIR_PM, DOWNLOAD_DIR_PM_RAW
+from src.tz import ET_TZ
 
-# Polymarket API endpoint
-POLYMARKET_API_URL = "https://xtracker.polymarket.com/api/users/elonmusk/posts"
+if TYPE_CHECKING:
+    import httpx
 
-# Output directories
-DOWNLOAD_DIR_PM = os.path.join(DOWNLOAD_DIR, "polymarket_main")
-DOWNLOAD_DIR_PM_RAW = os.path.join(DOWNLOAD_DIR, "polymarket_raw")
+# requests, src.db and src.sanitize (pandas) are imported where they are used to keep cold starts light.
+
+logger = logging.getLogger(__name__)
 
-os.makedirs(DOWNLOAD_DIR_PM, exist_ok=True)
-os.makedirs(DOWNLOAD_DIR_PM_RAW, exist_ok=True)
+# Polymarket API endpoint
+POLYMARKET_API_URL_TEMPLATE = "https://xtracker.polymarket.com/api/users/{handle}/posts"
+POLYMARKET_API_URL = POLYMARKET_API_URL_TEMPLATE.format(handle=DEFAULT_HANDLE)
+# Points the API calls at another host, such as the stand-in upstream of src.loadtest
+BASE_URL_ENV = 'XT_POLYMARKET_BASE_URL'
 
 # Output paths
 RAW_PM_PATH = os.path.join(DOWNLOAD_DIR_PM, 'raw_elonmusk_pm.csv')
@@ -54,25 +36,54 @@ UTC_PM_PREFIX = os.path.join(DOWNLOAD_DIR_PM, 'utc_elonmusk_pm')
 UTC_PM_PATH = f"{UTC_PM_PREFIX}.csv"
 
 ENCODING = 'utf-8'
+SOURCE = 'polymarket'
+# When set, also write the raw (id, text, created_at) and sanitized text CSVs for inspection
+DEBUG_ARTIFACTS_ENV = "XT_DEBUG_ARTIFACTS"
+
+
+class _Paths(NamedTuple):
+    raw: str
+    pre_prefix: str
+    clean_prefix: str
+    clean: str
+    utc_prefix: str
+    utc: str
+    cc_prefix: str
+    cc: str
+
+
+def _paths_for(handle: str) -> _Paths:
+    """Pipeline files of a handle; the default handle resolves to the module-level paths above."""
+    base = paths.namespaced(DOWNLOAD_DIR_PM, handle)
+    pre, clean, utc, cc = (os.path.join(base, f'{kind}_{handle}_pm') for kind in ('pre', 'clean', 'utc', 'cc'))
+    return _Paths(
+        os.path.join(base, f'raw_{handle}_pm.csv'),
+        pre, clean, f"{clean}.csv", utc, f"{utc}.csv", cc, f"{cc}.csv",
+    )
 
 
 def _check_modify_date(path: str, modify_date: float = 300) -> bool:
     """Check if file exists and was modified within the specified time window."""
     return (
-        os.path.exists(path)
-        and time.time() - os.path.getmtime(path) < modify_date
+        storage.exists(path)
+        and time.time() - storage.getmtime(path) < modify_date
     )
 
 
+def _debug_artifacts_enabled() -> bool:
+    return os.environ.get(DEBUG_ARTIFACTS_ENV, "").lower() in {"1", "true", "yes", "on"}
+
+
 def _save_raw_json_response(response_data: dict, filename_prefix: str = "fetch") -> None:
     """Save raw JSON response to timestamped file for debugging."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
     # Save pretty JSON
-    json_path = os.path.join(DOWNLOAD_DIR_PM_RAW, f"{filename_prefix}_{timestamp}.json")
+    raw_dir = paths.namespaced(DOWNLOAD_DIR_PM_RAW)
+    json_path = os.path.join(raw_dir, f"{filename_prefix}_{timestamp}.json")
     try:
-        with open(json_path, 'w', encoding=ENCODING) as f:
-            json.dump(response_data, f, indent=2)
+        os.makedirs(raw_dir, exist_ok=True)
+        json_path = storage.write_bytes(json_path, json.dumps(response_data, indent=2).encode(ENCODING))
         logger.info(f"Saved raw JSON response to {json_path}")
     except Exception as e:
         logger.warning(f"Failed to save raw JSON response: {e}")
@@ -86,68 +97,113 @@ def _sanitize_text(text: str) -> str:
 def fetch_tweets_from_api(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    handle: str = DEFAULT_HANDLE,
 ) -> list[dict[str, str]]:
     """Fetch tweets from Polymarket API.
 
     Args:
         start_date: Optional ISO datetime string (e.g., "2025-11-25T17:00:00.000Z")
         end_date: Optional ISO datetime string (e.g., "2025-12-02T17:00:59.000Z")
+        handle: Account whose posts are fetched
 
     Returns:
-        List of dicts with 'id' and 'text' keys
+        List of dicts with 'id' and 'text' keys (empty when there are no posts in the range)
+
+    Raises:
+        UpstreamError: the request failed, the API reported success=false or the
+            Polymarket circuit breaker is open
     """
+    import requests
+
+    url, params = _posts_request(start_date, end_date, handle)
+    with upstream.breaker(SOURCE).guard():
+        with metrics.stage('download') as st:
+            response = requests.get(url, params=params, timeout=upstream.TIMEOUT)
+            response.raise_for_status()
+            st['bytes'] = len(response.content)
+        data = _payload(response.json())
+    return _extract_tweets(data)
+
+
+async def fetch_async(client: 'httpx.AsyncClient', handle: str, snap: snapshot.Snapshot | None) -> list[dict[str, str]]:
+    """fetch_tweets_from_api from the database's most recent tweet on, on the event loop, for src.ingest."""
+    start_date = await asyncio.to_thread(_detect_start_date, handle)
+    url, params = _posts_request(start_date, None, handle)
+    with upstream.breaker(SOURCE).guard():
+        with metrics.stage('download') as st:
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            st['bytes'] = len(response.content)
+        data = await asyncio.to_thread(lambda: _payload(response.json()))
+    return _extract_tweets(data)
+
+
+def _posts_request(start_date: Optional[str], end_date: Optional[str], handle: str) -> tuple[str, dict[str, str]]:
     params = {}
     if start_date:
         params['startDate'] = start_date
     if end_date:
         params['endDate'] = end_date
 
-    try:
-        logger.info(f"Fetching from Polymarket API: {POLYMARKET_API_URL}")
-        if params:
-            logger.info(f"Query parameters: {params}")
+    url = upstream.with_origin(POLYMARKET_API_URL_TEMPLATE.format(handle=handle), BASE_URL_ENV)
+    logger.info(f"Fetching from Polymarket API: {url}")
+    if params:
+        logger.info(f"Query parameters: {params}")
+    return url, params
 
-        response = requests.get(POLYMARKET_API_URL, params=params, timeout=30)
-        response.raise_for_status()
 
-        data = response.json()
+def _payload(data: dict) -> dict:
+    """Keep the raw response for debugging and reject unsuccessful ones."""
+    _save_raw_json_response(data, "fetch")
 
-        # Save raw response for debugging
-        _save_raw_json_response(data, "fetch")
+    if not data.get('success', False):
+        logger.error(f"API returned success=false: {data}")
+        raise upstream.UpstreamError(SOURCE, "API returned success=false")
+    return data
 
-        if not data.get('success', False):
-            logger.error(f"API returned success=false: {data}")
-            return []
 
-        posts = data.get('data', [])
-        logger.info(f"Received {len(posts)} posts from API")
+def _extract_tweets(data: dict) -> list[dict[str, str]]:
+    posts = data.get('data', [])
+    logger.info(f"Received {len(posts)} posts from API")
 
-        # Extract id (platformId) and text (content)
-        tweets = []
-        for post in posts:
-            platform_id = post.get('platformId')
-            content = post.get('content')
+    # Extract id (platformId) and text (content)
+    tweets = []
+    for post in posts:
+        platform_id = post.get('platformId')
+        content = post.get('content')
 
-            if platform_id and content:
-                tweets.append(
-                    {
-                        'id': str(platform_id),
-                        'text': _sanitize_text(content)
-                    },
-                )
+        if platform_id and content:
+            tweets.append(
+                {
+                    'id': str(platform_id),
+                    'text': _sanitize_text(content)
+                },
+            )
 
-        logger.info(f"Extracted {len(tweets)} valid tweets")
-        return tweets
+    logger.info(f"Extracted {len(tweets)} valid tweets")
+    return tweets
 
-    except Exception as e:
-        logger.error(f"Error fetching from Polymarket API: {e}")
-        return []
+
+def _detect_start_date(handle: str) -> Optional[str]:
+    """Start of the next fetch: an hour before the database's most recent tweet, or None when it is empty."""
+    from src.db import get_most_recent_timestamp
+
+    most_recent = get_most_recent_timestamp(handle)
+    if most_recent:
+        # Fetch from 1 hour before the last tweet (buffer for reliability)
+        buffered_start = most_recent - timedelta(hours=1)
+        start_date = buffered_start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        logger.info(f"Auto-detected start date from database: {start_date}")
+        return start_date
+    logger.info("Database empty, fetching without start date (last 1 month)")
+    return None
 
 
 def fetch_and_update_database(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     auto_detect_start: bool = True,
+    handle: str = DEFAULT_HANDLE,
 ) -> tuple[int, int]:
     """Fetch new tweets from API and update the database.
 
@@ -155,31 +211,27 @@ def fetch_and_update_database(
         start_date: Optional start date (ISO format)
         end_date: Optional end date (ISO format)
         auto_detect_start: If True and no start_date provided, auto-detect from database
+        handle: Account whose posts and database are used
 
     Returns:
         Tuple of (total_tweets_in_db, new_tweets_added)
     """
+    from src.db import append_tweets
+
     # Auto-detect start date from most recent tweet in database
     if auto_detect_start and start_date is None:
-        most_recent = get_most_recent_timestamp()
-        if most_recent:
-            # Fetch from 1 hour before the last tweet (buffer for reliability)
-            buffered_start = most_recent - timedelta(hours=1)
-            start_date = buffered_start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-            logger.info(f"Auto-detected start date from database: {start_date}")
-        else:
-            logger.info("Database empty, fetching without start date (last 1 month)")
+        start_date = _detect_start_date(handle)
 
     # Fetch from API
-    tweets = fetch_tweets_from_api(start_date, end_date)
+    tweets = fetch_tweets_from_api(start_date, end_date, handle)
 
     # Append to database with deduplication
-    total, added = append_tweets(tweets)
+    total, added = append_tweets(tweets, handle)
 
     return total, added
 
 
-def _download_all_pm(force: bool = False) -> tuple[bytes, bytes, bytes]:
+def _download_all_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> tuple[bytes, bytes, bytes]:
     """Download and process Polymarket tweets with 5-minute caching.
 
     Set force=True to bypass the cache freshness check and fetch new data.
@@ -187,65 +239,187 @@ def _download_all_pm(force: bool = False) -> tuple[bytes, bytes, bytes]:
     Returns:
         tuple of (clean_csv_bytes, utc_csv_bytes, cc_csv_bytes)
     """
-    # Check cache freshness (5 minutes)
-    if not force and all(
-        _check_modify_date(p)
-        for p in (RAW_PM_PATH, PRE_PM_PATH, CLEAN_PM_PATH, UTC_PM_PATH, CC_PM_PATH)
-    ):
-        logger.info('Using cached Polymarket files')
-        with open(CLEAN_PM_PATH, 'rb') as f:
-            clean_bytes = f.read()
-        with open(UTC_PM_PATH, 'rb') as f:
-            utc_bytes = f.read()
-        with open(CC_PM_PATH, 'rb') as f:
-            cc_bytes = f.read()
-        return clean_bytes, utc_bytes, cc_bytes
-    else:
-        logger.info('Fetching fresh Polymarket data')
-
-        # Fetch and update database
-        total, added = fetch_and_update_database(auto_detect_start=True)
-        logger.info(f"Database updated: {total} total tweets, {added} new tweets added")
-
-        # Convert database to 3-column CSV format
-        raw_csv_bytes = database_to_csv_with_timestamps()
-        save_tweets_to_csv(raw_csv_bytes, RAW_PM_PATH)
-
-        # Sanitize
-        pre_bytes = sanitize_csv_to_file(raw_csv_bytes, PRE_PM_PREFIX)
-
-        # Create clean timestamps
-        clean_bytes, utc_bytes, cc_bytes = create_clean_timestamps_csv(
-            pre_bytes,
-            CLEAN_PM_PREFIX,
-            UTC_PM_PREFIX,
-            CC_PM_PREFIX,
-        )
-
-        return clean_bytes, utc_bytes, cc_bytes
-
-
-def _download_pm(force: bool = False) -> bytes:
+    return _snapshot_pm(force, handle).csv_triple()
+
+
+def _snapshot_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> snapshot.Snapshot:
+    """Return the handle's current snapshot, refreshing it first when stale (or when force=True)."""
+    paths.validate_handle(handle)
+    with metrics.bind_source(SOURCE), paths.bind_handle(handle):
+        return _refresh_snapshot_pm(force, handle)
+
+
+def _refresh_snapshot_pm(force: bool, handle: str) -> snapshot.Snapshot:
+    # Serve the in-memory snapshot until its adaptive polling interval runs out
+    if not force:
+        # Already refreshed on the event loop for this request (see src.ingest)
+        prefetched = ingest.resolved(SOURCE, handle)
+        if prefetched is not None:
+            return prefetched
+    snap = snapshot.current(SOURCE, handle)
+    if not force and snapshot.is_fresh(snap):
+        metrics.record_cache(SOURCE, hit=True)
+        return snap
+    if force or snap is None:
+        return _refresh_locked_pm(force, handle)
+    # A slow or failing upstream must not hold the request past its deadline while older data exists
+    return upstream.refresh_within_deadline(snap, lambda: _refresh_locked_pm(force, handle))
+
+
+def _refresh_locked_pm(force: bool, handle: str) -> snapshot.Snapshot:
+    with snapshot.refresh_lock(SOURCE, handle):
+        snap, fresh = _restore_pm(force, handle)
+        if fresh:
+            return snap
+        metrics.record_cache(SOURCE, hit=False)
+        logger.info('Fetching fresh Polymarket data for %s', handle)
+        try:
+            tweets = fetch_tweets_from_api(_detect_start_date(handle), None, handle)
+        except upstream.UpstreamError as e:
+            if force or snap is None:
+                raise
+            return upstream.serve_after_failure(snap, e)
+        return _apply_pm(handle, snap, tweets)
+
+
+def _restore_pm(force: bool, handle: str) -> tuple[snapshot.Snapshot | None, bool]:
+    """The handle's latest snapshot (from memory, else its checkpoint or files) and whether it is still fresh.
+
+    Call with the refresh lock held.
+    """
+    # Another request may have refreshed while we waited for the lock
+    snap = snapshot.current(SOURCE, handle)
+    if not force and snapshot.is_fresh(snap):
+        metrics.record_cache(SOURCE, hit=True)
+        return snap, True
+
+    files = _paths_for(handle)
+    if not force and snap is None:
+        # After a restart or an eviction resume from the checkpoint, fresh by its recorded fetch time
+        snap = snapshot.load_checkpoint(SOURCE, files.clean, handle)
+        # Files from before checkpoints existed only have their mtime to go by
+        if snap is None and all(
+            _check_modify_date(p, cadence.limits()[1])
+            for p in (files.clean, files.utc, files.cc)
+        ):
+            snap = snapshot.load_from_files(SOURCE, files.clean, files.utc, files.cc, handle=handle)
+        if snapshot.is_fresh(snap):
+            metrics.record_cache(SOURCE, hit=True)
+            logger.info('Using cached Polymarket files for %s', handle)
+            return snap, True
+    return snap, False
+
+
+def _apply_pm(handle: str, snap: snapshot.Snapshot | None, tweets: list[dict[str, str]]) -> snapshot.Snapshot:
+    """Append fetched tweets to the database and publish the next snapshot; call with the refresh lock held."""
+    from src.db import append_tweets, load_ids
+    from src.sanitize import create_clean_timestamps_from_ids
+
+    files = _paths_for(handle)
+    # Append to database with deduplication
+    with metrics.stage('db_update') as st:
+        total, added = append_tweets(tweets, handle)
+        st['rows'] = added
+    logger.info(f"Database updated: {total} total tweets, {added} new tweets added")
+    if added == 0 and snap is not None and snap.ids is not None and snap.ids.size == total:
+        # Nothing new upstream: the current data is simply fresh again
+        renewed = snapshot.renew(snap)
+        if renewed is not None:
+            return renewed
+        snap = snapshot.publish(SOURCE, *snap.csv_triple(), ids=snap.ids, handle=handle)
+        snapshot.save_checkpoint(snap, files.clean)
+        return snap
+
+    # Timestamps come straight from the snowflake ids; tweet text is never loaded
+    with metrics.stage('db_ids') as st:
+        ids = load_ids(handle)
+        st['rows'] = len(ids)
+
+    if _debug_artifacts_enabled():
+        _write_debug_artifacts(handle, files)
+
+    # Create clean timestamps
+    clean_bytes, utc_bytes, cc_bytes = create_clean_timestamps_from_ids(
+        ids,
+        files.clean_prefix,
+        files.utc_prefix,
+        files.cc_prefix,
+    )
+    snapshot.save_ids(files.clean, ids)
+    snap = snapshot.publish(SOURCE, clean_bytes, utc_bytes, cc_bytes, ids=ids, handle=handle)
+    snapshot.save_checkpoint(snap, files.clean)
+    return snap
+
+
+def restore(handle: str) -> tuple[snapshot.Snapshot | None, bool]:
+    """_restore_pm under the refresh lock, for src.ingest."""
+    with snapshot.refresh_lock(SOURCE, handle):
+        return _restore_pm(False, handle)
+
+
+def apply(handle: str, snap: snapshot.Snapshot | None, tweets: list[dict[str, str]]) -> snapshot.Snapshot:
+    """_apply_pm under the refresh lock, for src.ingest; a snapshot refreshed meanwhile by another path wins."""
+    with snapshot.refresh_lock(SOURCE, handle):
+        latest = snapshot.current(SOURCE, handle)
+        if latest is not snap and snapshot.is_fresh(latest):
+            return latest
+        return _apply_pm(handle, snap, tweets)
+
+
+def _write_debug_artifacts(handle: str, files: _Paths) -> None:
+    """Write the raw and sanitized text CSVs the pipeline used to round-trip through (debug only)."""
+    from src.db import database_to_csv_with_timestamps
+    from src.sanitize import sanitize_csv_to_file, save_tweets_to_csv
+
+    with metrics.stage('db_export') as st:
+        raw_csv_bytes = database_to_csv_with_timestamps(handle)
+        st['bytes'] = len(raw_csv_bytes)
+    save_tweets_to_csv(raw_csv_bytes, files.raw)
+    sanitize_csv_to_file(raw_csv_bytes, files.pre_prefix)
+
+
+def warm_up_pm() -> bool:
+    """Restore the last Polymarket checkpoint (or persisted CSVs) into memory; return True when it is still fresh."""
+    snap = (
+        snapshot.load_checkpoint(SOURCE, CLEAN_PM_PATH)
+        or snapshot.load_from_files(SOURCE, CLEAN_PM_PATH, UTC_PM_PATH, CC_PM_PATH)
+    )
+    return snapshot.is_fresh(snap)
+
+
+def _download_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> bytes:
     """Download and process Polymarket tweets, return clean CSV bytes."""
-    clean_bytes, _, _ = _download_all_pm(force)
+    clean_bytes, _, _ = _download_all_pm(force, handle)
     return clean_bytes
 
 
 # Mirror all the endpoint functions from download.py
 
-def get_tweets_by_hour_pm(force: bool = False) -> str:
+def get_tweets_by_hour_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
     """Return normalized tweet counts grouped by hour (ET) as CSV text."""
-    return process_by_hour(_download_pm(force)).decode(ENCODING)
+    from src.sanitize import process_by_hour
+
+    clean_bytes = _download_pm(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_hour(clean_bytes).decode(ENCODING)
 
 
-def get_tweets_by_date_pm(force: bool = False) -> str:
+def get_tweets_by_date_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
     """Return tweet counts grouped by date (ET) as CSV text."""
-    return process_by_date(_download_pm(force)).decode(ENCODING)
+    from src.sanitize import process_by_date
 
+    clean_bytes = _download_pm(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_date(clean_bytes).decode(ENCODING)
 
-def get_tweets_by_weekday_pm(force: bool = False) -> str:
+
+def get_tweets_by_weekday_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
     """Return tweet counts grouped by weekday (ET) as CSV text."""
-    return process_by_weekday(_download_pm(force)).decode(ENCODING)
+    from src.sanitize import process_by_weekday
+
+    clean_bytes = _download_pm(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_weekday(clean_bytes).decode(ENCODING)
 
 
 def _anchor_from_param(anchor: int) -> int:
@@ -254,57 +428,170 @@ def _anchor_from_param(anchor: int) -> int:
     return anchor
 
 
-def get_tweets_by_week_pm(anchor: int = 4, use_utc: bool = False, force: bool = False) -> str:
+def get_tweets_by_week_pm(
+    anchor: int = 4,
+    use_utc: bool = False,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> str:
     """Return tweet counts grouped by week (starts on Friday 12:00 ET) as CSV text."""
+    from src.sanitize import process_by_week
+
     anchor = _anchor_from_param(anchor)
-    return process_by_week(_download_pm(force), anchor_weekday=anchor, use_utc=use_utc).decode(ENCODING)
+    clean_bytes = _download_pm(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_week(clean_bytes, anchor_weekday=anchor, use_utc=use_utc).decode(ENCODING)
 
 
-def get_latest_counts_pm(force: bool = False) -> str:
+def get_latest_counts_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
     """Return Tue/Fri counts as CSV text while refreshing weekly UTC CSVs for Polymarket data."""
-    return process_last_tue_fri_counts_with_weekly_refresh(_download_pm(force)).decode(ENCODING)
+    from src.sanitize import process_last_tue_fri_counts_with_weekly_refresh
+
+    clean_bytes = _download_pm(force, handle)
+    with paths.bind_handle(handle):
+        return process_last_tue_fri_counts_with_weekly_refresh(clean_bytes).decode(ENCODING)
 
 
-def get_tweets_by_15min_pm(force: bool = False) -> str:
+def get_latest_count_columns_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> dict:
+    """Return the columns of the Tue/Fri latest counts CSV as of now (JSON and binary output formats)."""
+    from src.counts import market_window_columns
+
+    return market_window_columns(_snapshot_pm(force, handle).epoch_ms, int(time.time() * 1000))
+
+
+def get_tweets_by_15min_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
     """Return tweet counts grouped into 15-minute buckets (ET) as CSV text."""
-    return process_by_15min(_download_pm(force)).decode(ENCODING)
+    from src.sanitize import process_by_15min
+
+    clean_bytes = _download_pm(force, handle)
+    with paths.bind_handle(handle):
+        return process_by_15min(clean_bytes).decode(ENCODING)
+
+
+def get_aggregate_columns_pm(
+    kind: str,
+    anchor: int = 4,
+    use_utc: bool = False,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> dict:
+    """Return the columns of one hour/date/weekday/week/15min aggregate, for the JSON and binary output formats."""
+    from src.sanitize import aggregate_columns
+
+    anchor = _anchor_from_param(anchor)
+    return aggregate_columns(_snapshot_pm(force, handle).epoch_ms, kind, anchor_weekday=anchor, use_utc=use_utc)
+
+
+def get_bucket_delta_pm(kind: str, since: str, force: bool = False, handle: str = DEFAULT_HANDLE) -> dict:
+    """Return the rows of the '15min' or 'date' aggregate changed since a cursor (snapshot version or ISO time)."""
+    from src.deltas import bucket_delta
+
+    return bucket_delta(_snapshot_pm(force, handle), kind, since)
 
 
-def get_total_tweets_pm(force: bool = False) -> int:
+def get_total_tweets_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> int:
     """Return the total number of tweets from Polymarket data."""
-    return count_tweets(_download_pm(force))
+    return _snapshot_pm(force, handle).stats.count
 
 
-def get_avg_per_day_pm(force: bool = False) -> float:
+def get_avg_per_day_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> float:
     """Return the average tweets per day from Polymarket data."""
-    return get_average_tweets_per_day(_download_pm(force))
+    return _snapshot_pm(force, handle).stats.avg_per_day()
 
 
-def get_first_tweet_date_pm(force: bool = False) -> str:
+def get_first_tweet_date_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
     """Return the ISO timestamp of the first tweet (ET) from Polymarket data."""
-    dt = get_first_tweet_timestamp(_download_pm(force)).astimezone(pytz.timezone('America/New_York'))
-    return dt.isoformat()
+    return _snapshot_pm(force, handle).stats.first_tweet_iso()
 
 
 def get_time_now_pm() -> str:
     """Return the current ET ISO timestamp."""
-    return datetime.now(pytz.timezone('America/New_York')).isoformat()
+    return datetime.now(ET_TZ).isoformat()
 
 
-def get_data_range_pm(force: bool = False) -> int:
+def get_data_range_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> int:
     """Return the elapsed seconds between the first tweet and now (ET)."""
-    first_tweet = get_first_tweet_timestamp(_download_pm(force)).astimezone(pytz.timezone('America/New_York'))
-    now_et = datetime.now(pytz.timezone('America/New_York'))
-    return int((now_et - first_tweet).total_seconds())
+    return int(_snapshot_pm(force, handle).stats.seconds_since_first())
 
 
-def get_utc_csv_pm(force: bool = False) -> str:
-    """Return the utc_elonmusk_pm.csv file as bytes."""
-    _, utc_bytes, _ = _download_all_pm(force)
+def get_window_counts_pm(
+    windows: list[tuple[str, str | None]],
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> str:
+    """Return tweet counts for each [start, end) window as CSV text (end defaults to now)."""
+    from src.counts import parse_windows, window_counts_csv
+
+    parsed = parse_windows(windows)
+    return window_counts_csv(_snapshot_pm(force, handle).epoch_ms, parsed)
+
+
+def get_window_count_columns_pm(
+    windows: list[tuple[str, str | None]],
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> dict:
+    """Return the columns of the window counts CSV (JSON and binary output formats)."""
+    from src.counts import parse_windows, window_count_columns
+
+    parsed = parse_windows(windows)
+    return window_count_columns(_snapshot_pm(force, handle).epoch_ms, parsed)
+
+
+def get_projection_pm(
+    anchor: int = 4,
+    simulations: int = 10_000,
+    bracket_width: int = 20,
+    history_weeks: int = 12,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> dict:
+    """Return the Monte Carlo projection of the current anchored week's final count."""
+    from src.projection import cached_projection
+
+    anchor = _anchor_from_param(anchor)
+    return cached_projection(_snapshot_pm(force, handle), anchor, simulations, bracket_width, history_weeks)
+
+
+def get_week_stats_pm(
+    anchor: int | None = None,
+    window: str | None = None,
+    bracket_width: int = 20,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> list[dict]:
+    """Return precomputed weekly-count distributions per anchor and window ('all' or trailing weeks)."""
+    from src.weekstats import select
+
+    return select(_snapshot_pm(force, handle).week_stats, anchor, window, bracket_width)
+
+
+def get_utc_csv_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    """Return the utc_<handle>_pm.csv file as bytes."""
+    _, utc_bytes, _ = _download_all_pm(force, handle)
     return utc_bytes.decode(ENCODING)
 
 
-def get_cc_csv_pm(force: bool = False) -> str:
-    """Return the cc_elonmusk_pm.csv file as bytes (recent 6 months)."""
-    _, _, cc_bytes = _download_all_pm(force)
+def get_cc_csv_pm(force: bool = False, handle: str = DEFAULT_HANDLE) -> str:
+    """Return the cc_<handle>_pm.csv file as bytes (recent 6 months)."""
+    _, _, cc_bytes = _download_all_pm(force, handle)
     return cc_bytes.decode(ENCODING)
+
+
+def get_csv_artifact_pm(
+    kind: str,
+    accept_encoding: str | None = None,
+    force: bool = False,
+    handle: str = DEFAULT_HANDLE,
+) -> tuple[bytes, str | None]:
+    """
+    Return the 'utc' or 'cc' CSV as (body, content-coding). When the file is stored compressed, matches
+    the snapshot and the client accepts its coding, the stored bytes are returned as is; else plain CSV bytes.
+    """
+    snap = _snapshot_pm(force, handle)
+    files = _paths_for(handle)
+    artifacts = {'utc': (files.utc, snap.utc_bytes), 'cc': (files.cc, snap.cc_bytes)}
+    if kind not in artifacts:
+        raise ValueError("kind must be 'utc' or 'cc'")
+    path, data = artifacts[kind]
+    return storage.precompressed(path, data, accept_encoding) or (data, None)
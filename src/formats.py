@@ -0,0 +1,117 @@
+"""Output formats for aggregate columns, negotiated per request.
+
+CSV stays the default and is rendered by the existing pipeline. The other formats are
+serialized straight from the in-memory columns: compact column-oriented JSON, an Arrow
+IPC stream (needs the optional pyarrow dependency) or a NumPy .npy structured array.
+"""
+import base64
+import io
+import json
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CSV = 'csv'
+JSON = 'json'
+ARROW = 'arrow'
+NPY = 'npy'
+FORMATS = (CSV, JSON, ARROW, NPY)
+MEDIA_TYPES = {
+    CSV: 'text/csv',
+    JSON: 'application/json',
+    ARROW: 'application/vnd.apache.arrow.stream',
+    NPY: 'application/x-npy',
+}
+_ACCEPTED = {media: fmt for fmt, media in MEDIA_TYPES.items()}
+# Accept values that keep today's CSV responses (the event-stream type is what they are served as)
+_CSV_WILDCARDS = ('*/*', 'text/*', 'text/event-stream', 'text/plain')
+
+Columns = dict[str, 'np.ndarray']
+
+
+def parse_format(value: str) -> str:
+    fmt = str(value).strip().lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def _accept_entries(accept: str) -> list[tuple[float, int, str]]:
+    entries = []
+    for order, part in enumerate(accept.split(',')):
+        media, *params = [p.strip() for p in part.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media and q > 0:
+            entries.append((-q, order, media.lower()))
+    return sorted(entries)
+
+
+def negotiate(fmt: str | None, accept: str | None) -> str:
+    """The response format: an explicit `format=` wins, then the best supported Accept entry, else CSV."""
+    if fmt:
+        return parse_format(fmt)
+    for _, _, media in _accept_entries(accept or ''):
+        if media in _ACCEPTED:
+            return _ACCEPTED[media]
+        if media in _CSV_WILDCARDS:
+            return CSV
+    return CSV
+
+
+def json_columns(columns: Columns) -> dict[str, list[Any]]:
+    return {name: values.tolist() for name, values in columns.items()}
+
+
+def _npy(columns: Columns) -> bytes:
+    import numpy as np
+
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    # .npy cannot hold Python objects without pickle; labels become fixed-width unicode
+    arrays = {name: values.astype(str) if values.dtype == object else values for name, values in arrays.items()}
+    size = len(next(iter(arrays.values()))) if arrays else 0
+    table = np.empty(size, dtype=[(name, values.dtype) for name, values in arrays.items()])
+    for name, values in arrays.items():
+        table[name] = values
+    buf = io.BytesIO()
+    np.save(buf, table, allow_pickle=False)
+    return buf.getvalue()
+
+
+def _arrow(columns: Columns) -> bytes:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("format 'arrow' requires the optional pyarrow dependency (pip install 'xt[arrow]')")
+
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(columns: Columns, fmt: str) -> bytes:
+    """Serialize columns as JSON, Arrow IPC or .npy bytes (CSV is rendered by the aggregate functions)."""
+    if fmt == JSON:
+        return json.dumps(json_columns(columns), separators=(',', ':')).encode('utf-8')
+    if fmt == ARROW:
+        return _arrow(columns)
+    if fmt == NPY:
+        return _npy(columns)
+    raise ValueError(f"cannot encode columns as {fmt!r}")
+
+
+def tool_output(columns: Columns, fmt: str) -> dict[str, list[Any]] | str:
+    """MCP tool result: JSON columns as an object, binary formats as base64 text."""
+    fmt = parse_format(fmt)
+    if fmt == JSON:
+        return json_columns(columns)
+    return base64.b64encode(encode(columns, fmt)).decode('ascii')
@@ -0,0 +1,157 @@
+"""Asyncio ingestion: refresh snapshots on the event loop instead of in blocking worker threads.
+
+Upstream requests go through one shared httpx.AsyncClient per event loop, so waiting on
+XTracker or Polymarket holds no thread. Only the CPU and disk stages (checkpoint
+restore, sanitizing, database appends, publishing) run in the default executor,
+under the same refresh locks as the synchronous pipeline in src.download and
+src.download_polymarket. Concurrent requests for one (source, handle) share a single
+refresh task, and the sources a request needs are refreshed side by side.
+
+HTTP routes call ensure_fresh() before their synchronous handler runs. What it
+resolved (a snapshot, possibly stale, or the upstream failure) is bound to the
+request's context, and the synchronous pipeline answers from that instead of
+refreshing again in its worker thread.
+"""
+import asyncio
+import contextvars
+import logging
+import weakref
+from typing import TYPE_CHECKING, Any, Iterable
+
+from src import metrics, paths, snapshot, upstream
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+Key = tuple[str, str]
+UNION = 'union'
+
+
+class _LoopState:
+    def __init__(self) -> None:
+        self.client: 'httpx.AsyncClient | None' = None
+        self.tasks: dict[Key, asyncio.Task] = {}
+
+
+_states: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]' = weakref.WeakKeyDictionary()
+# (source, handle) -> snapshot or UpstreamError resolved for the current request by ensure_fresh()
+_resolved: contextvars.ContextVar[dict[Key, Any] | None] = contextvars.ContextVar('xt_ingest_resolved', default=None)
+
+
+def _state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState()
+    return state
+
+
+def _client() -> 'httpx.AsyncClient':
+    state = _state()
+    if state.client is None:
+        import httpx
+
+        connect, read = upstream.TIMEOUT
+        state.client = httpx.AsyncClient(timeout=httpx.Timeout(read, connect=connect))
+    return state.client
+
+
+def _pipelines() -> dict[str, Any]:
+    from src import download, download_polymarket
+
+    return {download.SOURCE: download, download_polymarket.SOURCE: download_polymarket}
+
+
+def feeds(source: str) -> tuple[str, ...]:
+    """The upstream sources behind a data source name ('union' reads both; unknown names none)."""
+    pipelines = _pipelines()
+    if source == UNION:
+        return tuple(pipelines)
+    return (source,) if source in pipelines else ()
+
+
+async def _refresh(source: str, handle: str) -> snapshot.Snapshot:
+    pipeline = _pipelines()[source]
+    with metrics.bind_source(source), paths.bind_handle(handle):
+        snap, fresh = await asyncio.to_thread(pipeline.restore, handle)
+        if fresh:
+            return snap
+        metrics.record_cache(source, hit=False)
+        fetched = await pipeline.fetch_async(_client(), handle, snap)
+        return await asyncio.to_thread(pipeline.apply, handle, snap, fetched)
+
+
+async def refresh(source: str, handle: str) -> snapshot.Snapshot:
+    """The (source, handle) snapshot, refreshed on the event loop when stale.
+
+    Like the synchronous pipeline, a request that has older data waits at most the
+    upstream deadline and falls back to that data when the upstream fails; without
+    any data the UpstreamError propagates.
+    """
+    paths.validate_handle(handle)
+    snap = snapshot.current(source, handle)
+    if snapshot.is_fresh(snap):
+        metrics.record_cache(source, hit=True)
+        return snap
+    state = _state()
+    key = (source, handle)
+    task = state.tasks.get(key)
+    if task is None:
+        task = state.tasks[key] = asyncio.create_task(_refresh(source, handle))
+        task.add_done_callback(lambda done: state.tasks.pop(key, None) if state.tasks.get(key) is done else None)
+    try:
+        if snap is None:
+            return await asyncio.shield(task)
+        return await asyncio.wait_for(asyncio.shield(task), upstream.deadline() or None)
+    except asyncio.TimeoutError:
+        logger.warning('Refresh of %s/%s exceeded %.1fs; serving the last snapshot', source, handle, upstream.deadline())
+        return upstream.serve_stale(snap, 'deadline')
+    except upstream.UpstreamError as e:
+        # A checkpoint restored by the failed refresh is still better than nothing
+        stale = snap or snapshot.current(source, handle)
+        if stale is None:
+            raise
+        return upstream.serve_after_failure(stale, e)
+
+
+async def ensure_fresh(keys: Iterable[Key]) -> dict[Key, Any]:
+    """Refresh every (source, handle) concurrently and bind the outcomes to the current request's context."""
+    keys = list(dict.fromkeys(keys))
+    outcomes = await asyncio.gather(*(refresh(*key) for key in keys), return_exceptions=True)
+    resolved: dict[Key, Any] = {}
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, (snapshot.Snapshot, upstream.UpstreamError)):
+            resolved[key] = outcome
+        elif isinstance(outcome, BaseException):
+            # Anything else is left to the synchronous pipeline, which reports it as before
+            logger.warning('Async refresh of %s/%s failed: %r', *key, outcome)
+    _resolved.set({**(_resolved.get() or {}), **resolved})
+    return resolved
+
+
+def resolved(source: str, handle: str) -> snapshot.Snapshot | None:
+    """The snapshot ensure_fresh() resolved for this request, if any; re-raises the upstream failure it met."""
+    outcomes = _resolved.get()
+    outcome = outcomes.get((source, handle)) if outcomes else None
+    if isinstance(outcome, upstream.UpstreamError):
+        raise outcome
+    return outcome
+
+
+async def refresh_all(handle: str) -> None:
+    """Refresh every source for handle concurrently (boot-time warm-up), logging failures."""
+    sources = list(_pipelines())
+    outcomes = await asyncio.gather(*(refresh(source, handle) for source in sources), return_exceptions=True)
+    for source, outcome in zip(sources, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error('Background refresh failed for %s: %r', source, outcome)
+
+
+async def aclose() -> None:
+    """Close this loop's HTTP client; pending refresh tasks are left to finish."""
+    state = _states.get(asyncio.get_running_loop())
+    if state is not None and state.client is not None:
+        client, state.client = state.client, None
+        await client.aclose()
@@ -0,0 +1,277 @@
+"""Server-Sent Events feed of snapshot refreshes.
+
+Each publish is turned into one encoded event, built once in the publishing thread
+and handed to every subscriber's queue as the same bytes object, so fan-out costs a
+queue put per client and nothing else. While a (source, handle) pair has
+subscribers, a poller refreshes it on its adaptive cadence (see src.cadence), so
+events keep flowing without any other traffic.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator
+
+from src import cadence, ingest, metrics, snapshot
+from src.paths import DEFAULT_HANDLE
+from src.tz import WEEKDAY_LABELS
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15.0
+# Events a client may fall behind by before it is disconnected
+QUEUE_SIZE = 32
+MAX_NEW_TWEETS = 1000
+SLOT_MS = 15 * 60_000
+RETRY_MS = 5000
+SUBSCRIBERS = 'xt_live_subscribers'
+EVENTS = 'xt_live_events_total'
+DROPPED = 'xt_live_dropped_total'
+
+Key = tuple[str, str]
+
+# An empty message tells a subscriber's stream to end (server shutdown or a client too slow to keep up)
+_CLOSE = b''
+
+
+class _Subscriber:
+    __slots__ = ('loop', 'queue')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+
+class _Hub:
+    """Subscribers of one (source, handle) pair plus the poller keeping it fresh."""
+
+    def __init__(self) -> None:
+        self.subscribers: set[_Subscriber] = set()
+        self.poller: asyncio.Task | None = None
+        # Streams and other consumers (e.g. MCP resource subscriptions) keeping the poller alive
+        self.holders = 0
+        # (version, encoded 'snapshot' event) sent to clients as they connect
+        self.initial: tuple[int, bytes] | None = None
+
+
+_lock = threading.Lock()
+_hubs: dict[Key, _Hub] = {}
+
+
+def encode(event: str, data: dict[str, Any], event_id: int | None = None) -> bytes:
+    """One SSE message; the JSON payload is compact so it fits on a single data line."""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def build_payload(snap: snapshot.Snapshot, previous: snapshot.Snapshot | None) -> dict[str, Any]:
+    """Tweets new since previous, the running Tue/Fri window counts and the newest 15-minute bucket."""
+    import numpy as np
+
+    from src import buckets
+    from src.counts import market_windows
+    from src.dataset import TWITTER_EPOCH_MS
+
+    epoch_ms = snap.epoch_ms
+    as_of_ms = int(snap.fetched_at * 1000)
+
+    if previous is None:
+        new_ids = np.empty(0, dtype=np.int64)
+        new_ms = epoch_ms[:0]
+    elif snap.ids is not None and previous.ids is not None:
+        new_ids = np.setdiff1d(snap.ids, previous.ids, assume_unique=True)
+        new_ms = (new_ids >> 22) + TWITTER_EPOCH_MS
+    else:
+        # Ids unavailable: everything after the previous newest instant is new
+        last = previous.stats.last_ms
+        new_ms = epoch_ms if last is None else epoch_ms[np.searchsorted(epoch_ms, last, side='right'):]
+        new_ids = None
+    shown_ms = new_ms[-MAX_NEW_TWEETS:]
+    shown_ids = new_ids[-MAX_NEW_TWEETS:].tolist() if new_ids is not None else [None] * shown_ms.size
+    new_tweets = [
+        # Ids as strings: they exceed the integer precision of JSON clients
+        {'id': None if i is None else str(i), 'created_at': str(label)}
+        for i, label in zip(shown_ids, buckets.iso_labels(shown_ms, utc=True, zulu=True))
+    ]
+
+    windows = [
+        {
+            'anchor': anchor,
+            'weekday': WEEKDAY_LABELS[anchor],
+            'window_start_et': str(buckets.iso_labels([start_ms])[0]),
+            'count': count,
+        }
+        for anchor, start_ms, count in market_windows(epoch_ms, as_of_ms)
+    ]
+
+    latest_bucket = None
+    if epoch_ms.size:
+        newest = int(epoch_ms[-1])
+        start_ms = newest - newest % SLOT_MS
+        latest_bucket = {
+            'start_et': str(buckets.iso_labels([start_ms])[0]),
+            'count': int(epoch_ms.size - np.searchsorted(epoch_ms, start_ms)),
+        }
+
+    return {
+        'source': snap.source,
+        'handle': snap.handle,
+        'version': snap.version,
+        'fetched_at': snap.fetched_at,
+        'total': snap.stats.count,
+        'new_tweet_count': int(new_ms.size),
+        'new_tweets': new_tweets,
+        'windows': windows,
+        'latest_bucket': latest_bucket,
+    }
+
+
+def _deliver(subscribers: list[_Subscriber], message: bytes) -> None:
+    """Runs on the subscribers' event loop."""
+    for sub in subscribers:
+        try:
+            sub.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: drop its backlog and end the stream; the client reconnects and resyncs
+            if message:
+                metrics.inc(DROPPED)
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+            sub.queue.put_nowait(_CLOSE)
+
+
+def _broadcast(subscribers: list[_Subscriber], message: bytes) -> None:
+    by_loop: dict[asyncio.AbstractEventLoop, list[_Subscriber]] = defaultdict(list)
+    for sub in subscribers:
+        by_loop[sub.loop].append(sub)
+    for loop, subs in by_loop.items():
+        try:
+            loop.call_soon_threadsafe(_deliver, subs, message)
+        except RuntimeError:
+            # Loop already closed (shutdown in progress)
+            pass
+
+
+def _on_publish(snap: snapshot.Snapshot, previous: snapshot.Snapshot | None) -> None:
+    key = (snap.source, snap.handle)
+    with _lock:
+        hub = _hubs.get(key)
+        subscribers = list(hub.subscribers) if hub is not None else []
+    if not subscribers:
+        return
+    message = encode('update', build_payload(snap, previous), snap.version)
+    metrics.inc(EVENTS, source=snap.source)
+    _broadcast(subscribers, message)
+
+
+def _initial_event(hub: _Hub, snap: snapshot.Snapshot) -> bytes:
+    with _lock:
+        cached = hub.initial
+    if cached is not None and cached[0] == snap.version:
+        return cached[1]
+    message = encode('snapshot', build_payload(snap, None), snap.version)
+    with _lock:
+        hub.initial = (snap.version, message)
+    return message
+
+
+async def _poll(source: str, handle: str) -> None:
+    """Refresh the pair whenever its snapshot's polling interval runs out (publishes trigger the events)."""
+    while True:
+        try:
+            snap = await ingest.refresh(source, handle)
+            delay = snap.fetched_at + snap.max_age - time.time()
+            if delay <= 0:
+                # Served stale while the upstream is degraded; retry at the fastest polling cadence
+                delay = cadence.limits()[0]
+        except Exception:
+            logger.exception('Live refresh failed for %s/%s', source, handle)
+            delay = cadence.limits()[0]
+        await asyncio.sleep(max(delay, 1.0))
+
+
+def _event_version(message: bytes) -> int:
+    for line in message.split(b'\n', 3)[:2]:
+        if line.startswith(b'id: '):
+            return int(line[4:])
+    return 0
+
+
+def _subscriber_count() -> int:
+    return sum(len(hub.subscribers) for hub in _hubs.values())
+
+
+def retain(source: str, handle: str = DEFAULT_HANDLE) -> None:
+    """Keep (source, handle) refreshed on its polling interval until the matching release(); call on the event loop."""
+    with _lock:
+        hub = _hubs.setdefault((source, handle), _Hub())
+        hub.holders += 1
+        if hub.poller is None or hub.poller.done():
+            hub.poller = asyncio.create_task(_poll(source, handle))
+
+
+def release(source: str, handle: str = DEFAULT_HANDLE) -> None:
+    with _lock:
+        hub = _hubs.get((source, handle))
+        if hub is None:
+            return
+        hub.holders = max(hub.holders - 1, 0)
+        if not hub.holders and hub.poller is not None:
+            hub.poller.cancel()
+            hub.poller = None
+
+
+async def stream(source: str, handle: str = DEFAULT_HANDLE) -> AsyncIterator[bytes]:
+    """SSE byte stream for one (source, handle): a 'snapshot' event, then an 'update' per refresh."""
+    key = (source, handle)
+    sub = _Subscriber(asyncio.get_running_loop())
+    retain(source, handle)
+    with _lock:
+        hub = _hubs[key]
+        hub.subscribers.add(sub)
+        metrics.set_gauge(SUBSCRIBERS, _subscriber_count())
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode('utf-8')
+        snap = await ingest.refresh(source, handle)
+        yield _initial_event(hub, snap)
+        sent_version = snap.version
+        while True:
+            try:
+                message = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if not message:
+                break
+            # A refresh racing the initial load may already be part of the snapshot event
+            if _event_version(message) <= sent_version:
+                continue
+            sent_version = _event_version(message)
+            yield message
+    finally:
+        with _lock:
+            hub.subscribers.discard(sub)
+            metrics.set_gauge(SUBSCRIBERS, _subscriber_count())
+        release(source, handle)
+
+
+def close_all() -> None:
+    """End every open stream (called on shutdown so servers do not wait on idle clients)."""
+    with _lock:
+        hubs = list(_hubs.values())
+    for hub in hubs:
+        with _lock:
+            subscribers = list(hub.subscribers)
+        _broadcast(subscribers, _CLOSE)
+
+
+snapshot.add_listener(_on_publish)
+
+metrics.describe(SUBSCRIBERS, "gauge", "Open Server-Sent Events connections across all sources and handles.")
+metrics.describe(EVENTS, "counter", "Live update events built (once per refresh, shared by every subscriber).")
+metrics.describe(DROPPED, "counter", "Live subscribers disconnected for falling too far behind.")
@@ -0,0 +1,701 @@
+"""Load testing: replay a weighted mix of HTTP routes and MCP tool calls and report latency per route.
+
+`python -m src.loadtest` starts a stand-in upstream on a local port (a synthetic
+XTracker export and Polymarket posts API whose tweets keep arriving while the run
+lasts), launches the app under uvicorn against it with its data in a scratch
+directory, and runs closed-loop async workers that each pick the next request from
+the mix at random by weight. Every mix entry is sent once before the clock starts so
+the first refresh does not skew the numbers. The report gives requests, errors,
+throughput and mean/p50/p95/p99/max latency per entry (errors included), printed as a
+table and written as JSON with --json; --compare prints the change against an
+earlier JSON report.
+
+--url targets an app that is already running instead, and --upstream-only serves the
+stand-in upstream alone (point XT_XTRACKER_BASE_URL and XT_POLYMARKET_BASE_URL at it).
+A custom mix is a JSON list of entries such as
+{"name": "hour", "path": "/hour", "params": {"utc": 1}, "weight": 5},
+{"name": "batch", "method": "POST", "path": "/batch", "json": [...]},
+{"name": "live", "path": "/live", "stream": true} (timed to the first event) or
+{"name": "mcp total", "tool": "total_tweet_count", "arguments": {}}.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Iterator
+from urllib.parse import parse_qs, urlsplit
+
+from src.paths import DEFAULT_HANDLE, ROOT_DIR
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+TWITTER_EPOCH_MS = 1288834974657
+DAY_MS = 86_400_000
+PM_DEFAULT_DAYS = 30
+MCP_PATH = '/mcp'
+MCP_PROTOCOL_VERSION = '2025-03-26'
+REPORT_VERSION = 1
+PERCENTILES = (50, 95, 99)
+STARTUP_TIMEOUT = 60.0
+REQUEST_TIMEOUT = 120.0
+
+
+# ---------- Stand-in upstream ----------
+
+def _iso(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f'{ms % 1000:03d}Z'
+
+
+def _parse_iso_ms(value: str) -> int:
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+class StandInUpstream:
+    """Synthetic XTracker and Polymarket APIs serving one deterministic stream of tweets.
+
+    `tweets` tweets are spread over the `days` before start-up and new ones keep arriving
+    at the same average rate, so the app sees fresh data whenever its snapshots expire.
+    Optional latency and error rate model a slow or flaky upstream.
+    """
+
+    def __init__(
+        self, tweets: int = 6000, days: int = 150, seed: int = 7, latency: float = 0.0, error_rate: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        now = int(time.time() * 1000)
+        start = now - days * DAY_MS
+        # Pre-generate a day of future tweets at the historical rate; requests only see those already "posted"
+        future = tweets // days + 1
+        moments = sorted(self._random.randint(start, now) for _ in range(tweets))
+        moments += sorted(self._random.randint(now, now + DAY_MS) for _ in range(future))
+        self._ms = moments
+        self._ids = [((ms - TWITTER_EPOCH_MS) << 22) | self._random.randrange(1 << 22) for ms in moments]
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self.calls = {'xtracker': 0, 'polymarket': 0, 'errors': 0}
+
+    def _posted(self, since_ms: int | None = None, until_ms: int | None = None) -> list[tuple[int, int]]:
+        now = int(time.time() * 1000)
+        until = now if until_ms is None else min(until_ms, now)
+        return [(ms, i) for ms, i in zip(self._ms, self._ids) if ms <= until and (since_ms is None or ms >= since_ms)]
+
+    def xtracker_export(self, if_none_match: str | None) -> tuple[int, dict[str, str], bytes]:
+        posted = self._posted()
+        etag = f'"{hashlib.sha1(str(len(posted)).encode()).hexdigest()[:16]}"'
+        if if_none_match == etag:
+            return 304, {'ETag': etag}, b''
+        lines = ['id,text,created_at']
+        lines += [f'{sid},"stand-in tweet {n}, posted",{_iso(ms)}' for n, (ms, sid) in enumerate(posted)]
+        return 200, {'ETag': etag, 'Content-Type': 'text/csv'}, ('\n'.join(lines) + '\n').encode()
+
+    def polymarket_posts(self, query: dict[str, list[str]]) -> bytes:
+        start = query.get('startDate', [None])[0]
+        end = query.get('endDate', [None])[0]
+        since = _parse_iso_ms(start) if start else int(time.time() * 1000) - PM_DEFAULT_DAYS * DAY_MS
+        posted = self._posted(since, _parse_iso_ms(end) if end else None)
+        data = [
+            {'platformId': str(sid), 'content': f'stand-in tweet {sid % 100000}', 'createdAt': _iso(ms)}
+            for ms, sid in posted
+        ]
+        return json.dumps({'success': True, 'data': data}).encode()
+
+    def _fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, headers: dict[str, str], body: bytes) -> None:
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _answer(self, source: str, respond: Any) -> None:
+                with upstream._lock:
+                    upstream.calls[source] += 1
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                if upstream._fail():
+                    with upstream._lock:
+                        upstream.calls['errors'] += 1
+                    self._send(503, {'Content-Type': 'text/plain'}, b'stand-in upstream error')
+                    return
+                self._send(*respond())
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if urlsplit(self.path).path != '/api/download':
+                    self._send(404, {}, b'')
+                    return
+                self._answer('xtracker', lambda: upstream.xtracker_export(self.headers.get('If-None-Match')))
+
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                parts = url.path.strip('/').split('/')
+                if len(parts) != 4 or parts[:2] != ['api', 'users'] or parts[3] != 'posts':
+                    self._send(404, {}, b'')
+                    return
+                body = lambda: (200, {'Content-Type': 'application/json'}, upstream.polymarket_posts(parse_qs(url.query)))
+                self._answer('polymarket', body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug('stand-in upstream: ' + format, *args)
+
+        return Handler
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve on a background thread; returns the base URL."""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='xt-standin', daemon=True).start()
+        return f'http://{host}:{self._server.server_address[1]}'
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# ---------- App under test ----------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = STARTUP_TIMEOUT) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'app exited with status {process.returncode} during start-up')
+        try:
+            if httpx.get(url + '/', timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'app did not answer on {url} within {timeout:.0f}s')
+
+
+@contextlib.contextmanager
+def launch_app(upstream_url: str, env: dict[str, str], keep_data: bool = False) -> Iterator[str]:
+    """Run `uvicorn main:app` on a free local port against the stand-in upstream, with its data in a scratch dir."""
+    data_dir = tempfile.mkdtemp(prefix='xt-loadtest-')
+    port = _free_port()
+    child_env = {
+        **os.environ,
+        'XT_DATA_DIR': data_dir,
+        'XT_XTRACKER_BASE_URL': upstream_url,
+        'XT_POLYMARKET_BASE_URL': upstream_url,
+        **env,
+    }
+    log_path = os.path.join(data_dir, 'app.log')
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+             '--log-level', 'warning'],
+            cwd=ROOT_DIR, env=child_env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        try:
+            _wait_until_up(url, process)
+        except RuntimeError:
+            with open(log_path, 'rb') as f:
+                sys.stderr.write(f.read()[-4000:].decode('utf-8', 'replace'))
+            raise
+        logger.info('App under test at %s (data in %s)', url, data_dir)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        if keep_data:
+            logger.info('Kept app data and log in %s', data_dir)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+# ---------- Mix ----------
+
+@dataclass(frozen=True)
+class MixEntry:
+    """One kind of request in the mix: an HTTP call (optionally an SSE stream) or an MCP tool call."""
+    name: str
+    path: str = ''
+    method: str = 'GET'
+    params: dict[str, Any] = field(default_factory=dict)
+    json: Any = None
+    stream: bool = False
+    tool: str | None = None
+    arguments: dict[str, Any] = field(default_factory=dict)
+    weight: float = 1.0
+
+    @classmethod
+    def from_dict(cls, raw: Any) -> 'MixEntry':
+        if not isinstance(raw, dict):
+            raise ValueError('each mix entry must be an object')
+        unknown = set(raw) - {'name', 'path', 'method', 'params', 'json', 'stream', 'tool', 'arguments', 'weight'}
+        if unknown:
+            raise ValueError(f"unknown mix field(s): {', '.join(sorted(unknown))}")
+        tool = raw.get('tool')
+        path = raw.get('path', '')
+        if bool(tool) == bool(path):
+            raise ValueError("each mix entry needs exactly one of 'path' or 'tool'")
+        weight = raw.get('weight', 1.0)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+            raise ValueError("mix 'weight' must be a positive number")
+        name = raw.get('name') or (f'mcp:{tool}' if tool else f"{raw.get('method', 'GET').upper()} {path}")
+        return cls(
+            name=str(name), path=path, method=str(raw.get('method', 'GET')).upper(), params=dict(raw.get('params') or {}),
+            json=raw.get('json'), stream=bool(raw.get('stream', False)), tool=tool,
+            arguments=dict(raw.get('arguments') or {}), weight=float(weight),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        if self.tool:
+            return {'name': self.name, 'tool': self.tool, 'arguments': self.arguments, 'weight': self.weight}
+        out: dict[str, Any] = {'name': self.name, 'method': self.method, 'path': self.path, 'weight': self.weight}
+        if self.params:
+            out['params'] = self.params
+        if self.json is not None:
+            out['json'] = self.json
+        if self.stream:
+            out['stream'] = True
+        return out
+
+
+def default_mix(handle: str = DEFAULT_HANDLE) -> list[MixEntry]:
+    """Every route and a representative set of MCP tools, weighted towards the polled aggregates."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    week_ago = (now - timedelta(days=7)).isoformat()
+    windows = [f'{week_ago}/', f'{(now - timedelta(days=14)).isoformat()}/{week_ago}']
+    h = {'handle': handle}
+    raw: list[dict[str, Any]] = [
+        {'path': '/', 'weight': 1},
+        {'path': '/metrics', 'weight': 1},
+        {'path': '/time_now', 'weight': 1},
+        {'path': '/pm/time_now', 'weight': 1},
+        {'path': '/live', 'params': h, 'stream': True, 'weight': 1},
+        {'path': '/pm/live', 'params': h, 'stream': True, 'weight': 1},
+        {'method': 'POST', 'path': '/batch', 'weight': 3, 'json': [
+            {'kind': kind, 'source': source, 'handle': handle}
+            for kind in ('hour', 'weekday', 'total') for source in ('xtracker', 'polymarket')
+        ]},
+        {'path': '/aggregate', 'params': {**h, 'kind': 'buckets', 'resolution': '1h', 'source': 'union'}, 'weight': 3},
+        {'name': 'GET /aggregate?format=json', 'path': '/aggregate',
+         'params': {**h, 'kind': 'hour', 'source': 'union', 'format': 'json'}, 'weight': 2},
+    ]
+    for prefix, weight in (('', 3), ('/pm', 5)):
+        raw += [
+            {'path': f'{prefix}/hour', 'params': h, 'weight': weight},
+            {'path': f'{prefix}/date', 'params': h, 'weight': weight},
+            {'path': f'{prefix}/weekday', 'params': h, 'weight': weight},
+            {'path': f'{prefix}/week', 'params': h, 'weight': weight},
+            {'path': f'{prefix}/week/stats', 'params': h, 'weight': 1},
+            {'path': f'{prefix}/15min', 'params': h, 'weight': weight},
+            {'path': f'{prefix}/total', 'params': h, 'weight': weight},
+            {'path': f'{prefix}/avg_per_day', 'params': h, 'weight': 1},
+            {'path': f'{prefix}/first_tweet_date', 'params': h, 'weight': 1},
+            {'path': f'{prefix}/data_span', 'params': h, 'weight': 1},
+            {'path': f'{prefix}/utc_csv', 'params': h, 'weight': 1},
+            {'path': f'{prefix}/cc_csv', 'params': h, 'weight': 1},
+            {'path': f'{prefix}/count', 'params': {**h, 'window': windows}, 'weight': weight},
+        ]
+    raw += [
+        {'path': '/pm/latest', 'params': h, 'weight': 2},
+        {'path': '/pm/projection', 'params': h, 'weight': 2},
+        {'tool': 'tweets_by_hour_grouped_pm', 'arguments': h, 'weight': 2},
+        {'tool': 'total_tweet_count', 'arguments': h, 'weight': 2},
+        {'tool': 'tweet_count_windows_pm', 'arguments': {**h, 'windows': [[week_ago, None]]}, 'weight': 1},
+        {'tool': 'aggregate', 'arguments': {**h, 'kind': 'weekday', 'source': 'union', 'format': 'json'}, 'weight': 1},
+        {'tool': 'iso_time_now', 'weight': 1},
+    ]
+    return [MixEntry.from_dict(entry) for entry in raw]
+
+
+def load_mix(path: str) -> list[MixEntry]:
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+    if not isinstance(raw, list) or not raw:
+        raise ValueError('a mix file must hold a non-empty JSON list of entries')
+    return [MixEntry.from_dict(entry) for entry in raw]
+
+
+# ---------- Clients ----------
+
+class ProbeError(Exception):
+    """A request completed with an error (non-2xx status, MCP error or protocol problem)."""
+
+    def __init__(self, status: str, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _sse_messages(body: str) -> Iterator[dict[str, Any]]:
+    for line in body.splitlines():
+        if line.startswith('data:'):
+            yield json.loads(line[5:].strip())
+
+
+class McpSession:
+    """Minimal streamable-HTTP MCP client: one session per worker, JSON-RPC requests over POST."""
+
+    def __init__(self, client: 'httpx.AsyncClient', url: str) -> None:
+        self.client = client
+        self.url = url + MCP_PATH
+        self.session_id: str | None = None
+        self._next_id = 0
+
+    def _headers(self) -> dict[str, str]:
+        headers = {'Accept': 'application/json, text/event-stream', 'Content-Type': 'application/json'}
+        if self.session_id:
+            headers['Mcp-Session-Id'] = self.session_id
+            headers['Mcp-Protocol-Version'] = MCP_PROTOCOL_VERSION
+        return headers
+
+    async def _rpc(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        self._next_id += 1
+        message = {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+        resp = await self.client.post(self.url, json=message, headers=self._headers())
+        if resp.status_code >= 400:
+            raise ProbeError(str(resp.status_code), resp.text[:200])
+        if resp.headers.get('content-type', '').startswith('text/event-stream'):
+            replies = [m for m in _sse_messages(resp.text) if m.get('id') == self._next_id]
+            if not replies:
+                raise ProbeError('protocol', f'no reply to {method}')
+            reply = replies[-1]
+        else:
+            try:
+                reply = resp.json()
+            except ValueError:
+                raise ProbeError('protocol', f'{method} answered with {resp.status_code} and no JSON-RPC reply')
+        if 'error' in reply:
+            raise ProbeError('rpc_error', str(reply['error'].get('message')))
+        if method == 'initialize':
+            self.session_id = resp.headers.get('mcp-session-id')
+        return reply['result']
+
+    async def initialize(self) -> None:
+        self.session_id = None
+        await self._rpc('initialize', {
+            'protocolVersion': MCP_PROTOCOL_VERSION,
+            'capabilities': {},
+            'clientInfo': {'name': 'xt-loadtest', 'version': str(REPORT_VERSION)},
+        })
+        notification = {'jsonrpc': '2.0', 'method': 'notifications/initialized'}
+        resp = await self.client.post(self.url, json=notification, headers=self._headers())
+        if resp.status_code >= 400:
+            raise ProbeError(str(resp.status_code), 'initialized notification rejected')
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> None:
+        if self.session_id is None:
+            await self.initialize()
+        result = await self._rpc('tools/call', {'name': name, 'arguments': arguments})
+        if result.get('isError'):
+            text = ' '.join(part.get('text', '') for part in result.get('content', []))
+            raise ProbeError('tool_error', text[:200])
+
+
+async def _send(client: 'httpx.AsyncClient', url: str, entry: MixEntry, mcp: McpSession) -> str:
+    """Issue one request of the mix and return its status label; failures raise ProbeError."""
+    if entry.tool:
+        await mcp.call_tool(entry.tool, entry.arguments)
+        return 'ok'
+    request = client.build_request(entry.method, url + entry.path, params=entry.params, json=entry.json)
+    resp = await client.send(request, stream=True)
+    try:
+        if resp.status_code >= 400:
+            await resp.aread()
+            raise ProbeError(str(resp.status_code), resp.text[:200])
+        if entry.stream:
+            # A live feed never ends: time it to its first event
+            async for line in resp.aiter_lines():
+                if line.startswith('event:'):
+                    break
+            else:
+                raise ProbeError('protocol', 'stream ended before its first event')
+        else:
+            await resp.aread()
+        return str(resp.status_code)
+    finally:
+        await resp.aclose()
+
+
+# ---------- Run ----------
+
+class RouteStats:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.statuses: dict[str, int] = {}
+
+    def add(self, seconds: float, status: str, error: bool) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error:
+            self.errors += 1
+
+
+async def _probe(client: 'httpx.AsyncClient', url: str, entry: MixEntry, mcp: McpSession) -> tuple[float, str, bool]:
+    import httpx
+
+    started = time.perf_counter()
+    try:
+        status, error = await _send(client, url, entry, mcp), False
+    except ProbeError as exc:
+        status, error = exc.status, True
+        logger.debug('%s failed: %s', entry.name, exc)
+        if exc.status == '404' and entry.tool:
+            mcp.session_id = None  # session expired on the server; start a new one next time
+    except httpx.HTTPError as exc:
+        status, error = type(exc).__name__, True
+        logger.debug('%s failed: %r', entry.name, exc)
+    return time.perf_counter() - started, status, error
+
+
+async def run_load(
+    url: str, mix: list[MixEntry], concurrency: int, duration: float | None, requests: int | None, seed: int,
+) -> tuple[dict[str, RouteStats], float]:
+    """Warm every entry up once, then run closed-loop workers until the duration or request budget is spent."""
+    import httpx
+
+    stats = {entry.name: RouteStats() for entry in mix}
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        warm = McpSession(client, url)
+        for entry in mix:
+            _, status, error = await _probe(client, url, entry, warm)
+            if error:
+                logger.warning('Warm-up request %s failed (%s)', entry.name, status)
+
+        weights = [entry.weight for entry in mix]
+        budget = [requests]
+        stop_at = time.perf_counter() + duration if duration else None
+
+        async def worker(index: int) -> None:
+            rng = random.Random(seed * 1000 + index)
+            mcp = McpSession(client, url)
+            while True:
+                if stop_at is not None and time.perf_counter() >= stop_at:
+                    return
+                if budget[0] is not None:
+                    if budget[0] <= 0:
+                        return
+                    budget[0] -= 1
+                entry = rng.choices(mix, weights)[0]
+                stats[entry.name].add(*await _probe(client, url, entry, mcp))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return stats, elapsed
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """q-th percentile of sorted values, interpolating linearly between the closest ranks."""
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _summary(latencies: list[float], errors: int, statuses: dict[str, int], elapsed: float) -> dict[str, Any]:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    out: dict[str, Any] = {
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(ordered) / count * 1000, 2) if count else 0.0,
+    }
+    for q in PERCENTILES:
+        out[f'p{q}_ms'] = round(percentile(ordered, q) * 1000, 2)
+    out['max_ms'] = round(ordered[-1] * 1000, 2) if count else 0.0
+    out['statuses'] = dict(sorted(statuses.items()))
+    return out
+
+
+def build_report(
+    stats: dict[str, RouteStats], elapsed: float, mix: list[MixEntry], config: dict[str, Any],
+) -> dict[str, Any]:
+    everything = [latency for route in stats.values() for latency in route.latencies]
+    statuses: dict[str, int] = {}
+    for route in stats.values():
+        for status, n in route.statuses.items():
+            statuses[status] = statuses.get(status, 0) + n
+    return {
+        'version': REPORT_VERSION,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'elapsed_s': round(elapsed, 3),
+        'config': config,
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'mix': [entry.to_dict() for entry in mix],
+        'total': _summary(everything, sum(route.errors for route in stats.values()), statuses, elapsed),
+        'routes': {
+            name: _summary(route.latencies, route.errors, route.statuses, elapsed) for name, route in stats.items()
+        },
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    columns = ('requests', 'errors', 'rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+    rows = [(name, summary) for name, summary in report['routes'].items() if summary['requests']]
+    rows.append(('TOTAL', report['total']))
+    width = max(len(name) for name, _ in rows)
+    lines = [f"{'route':<{width}}  " + '  '.join(f'{c:>9}' for c in columns)]
+    for name, summary in rows:
+        lines.append(f'{name:<{width}}  ' + '  '.join(f'{summary[c]:>9}' for c in columns))
+    return '\n'.join(lines)
+
+
+def format_comparison(baseline: dict[str, Any], report: dict[str, Any]) -> str:
+    """Per-route throughput and latency percentiles of this run, with their change against an earlier report."""
+    columns = ('rps',) + tuple(f'p{q}_ms' for q in PERCENTILES)
+    pairs = [
+        (name, baseline['routes'][name], summary) for name, summary in report['routes'].items()
+        if name in baseline.get('routes', {})
+    ]
+    pairs.append(('TOTAL', baseline['total'], report['total']))
+    pairs = [(name, old, new) for name, old, new in pairs if old.get('requests') and new.get('requests')]
+    width = max(len(name) for name, _, _ in pairs)
+    lines = [f"{'route (vs baseline)':<{width}}  " + '  '.join(f'{c:>18}' for c in columns)]
+    for name, old, new in pairs:
+        cells = []
+        for c in columns:
+            change = f'{(new[c] - old[c]) / old[c] * 100:+.1f}%' if old[c] else 'n/a'
+            cells.append(f'{new[c]:>9} {change:>8}')
+        lines.append(f'{name:<{width}}  ' + '  '.join(cells))
+    return '\n'.join(lines)
+
+
+def _parse_env(pairs: list[str]) -> dict[str, str]:
+    env = {}
+    for pair in pairs:
+        name, sep, value = pair.partition('=')
+        if not sep or not name:
+            raise ValueError(f'--env expects NAME=VALUE, got {pair!r}')
+        env[name] = value
+    return env
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m src.loadtest',
+        description='Replay a weighted request mix against the app and report latency percentiles per route.',
+    )
+    parser.add_argument('--url', help='target an already running app instead of launching one')
+    parser.add_argument('--mix', help='JSON file with the request mix (default: every route plus MCP tools)')
+    parser.add_argument('--handle', default=DEFAULT_HANDLE, help='handle used by the default mix')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent closed-loop workers (default 8)')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of measured load (default 30)')
+    parser.add_argument('--requests', type=int, help='stop after this many measured requests instead')
+    parser.add_argument('--seed', type=int, default=7, help='seed for the mix choices and the synthetic tweets')
+    parser.add_argument('--json', dest='json_path', help='write the report as JSON to this file')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    parser.add_argument('--tweets', type=int, default=6000, help='historical tweets in the stand-in upstream')
+    parser.add_argument('--days', type=int, default=150, help='days the historical tweets span')
+    parser.add_argument('--upstream-latency', type=float, default=0.0, help='seconds the stand-in waits per call')
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0, help='share of stand-in calls answered 503')
+    parser.add_argument('--upstream-only', action='store_true', help='only serve the stand-in upstream until interrupted')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help='extra app environment')
+    parser.add_argument('--keep-data', action='store_true', help="keep the launched app's data directory and log")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    try:
+        if args.concurrency < 1:
+            raise ValueError('--concurrency must be at least 1')
+        if args.requests is not None and args.requests < 1:
+            raise ValueError('--requests must be at least 1')
+        if not 0 <= args.upstream_error_rate <= 1:
+            raise ValueError('--upstream-error-rate must be between 0 and 1')
+        env = _parse_env(args.env)
+        mix = load_mix(args.mix) if args.mix else default_mix(args.handle)
+        baseline = None
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+
+    standin = StandInUpstream(args.tweets, args.days, args.seed, args.upstream_latency, args.upstream_error_rate)
+    with contextlib.ExitStack() as stack:
+        if args.upstream_only or not args.url:
+            upstream_url = standin.start()
+            stack.callback(standin.stop)
+            logger.info('Stand-in upstream at %s', upstream_url)
+        if args.upstream_only:
+            print(f'XT_XTRACKER_BASE_URL={upstream_url} XT_POLYMARKET_BASE_URL={upstream_url}')
+            with contextlib.suppress(KeyboardInterrupt):
+                threading.Event().wait()
+            return 0
+        url = args.url.rstrip('/') if args.url else stack.enter_context(launch_app(upstream_url, env, args.keep_data))
+        duration = None if args.requests else args.duration
+        logger.info('Running %s with %d workers', f'{args.requests} requests' if args.requests else f'{duration:.0f}s', args.concurrency)
+        stats, elapsed = asyncio.run(run_load(url, mix, args.concurrency, duration, args.requests, args.seed))
+
+    config = {
+        'url': args.url, 'concurrency': args.concurrency, 'duration_s': duration, 'requests': args.requests,
+        'seed': args.seed, 'handle': args.handle, 'mix_file': args.mix, 'env': env,
+        'upstream': None if args.url else {
+            'tweets': args.tweets, 'days': args.days, 'latency_s': args.upstream_latency,
+            'error_rate': args.upstream_error_rate, 'calls': standin.calls,
+        },
+    }
+    report = build_report(stats, elapsed, mix, config)
+    print(format_report(report))
+    if baseline is not None:
+        if baseline.get('config', {}).get('concurrency') != args.concurrency:
+            logger.warning('Baseline ran with %s workers, this run with %d', baseline.get('config', {}).get('concurrency'), args.concurrency)
+        print()
+        print(format_comparison(baseline, report))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info('Report written to %s', args.json_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""In-process pipeline and route metrics rendered in the Prometheus text format."""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_DURATION = "xt_stage_duration_seconds"
+STAGE_BYTES = "xt_stage_bytes_total"
+STAGE_ROWS = "xt_stage_rows_total"
+CACHE_REQUESTS = "xt_cache_requests_total"
+HTTP_DURATION = "xt_http_request_duration_seconds"
+
+LabelKey = tuple[tuple[str, str], ...]
+
+_lock = threading.Lock()
+_types: dict[str, tuple[str, str]] = {}
+_counters: dict[str, dict[LabelKey, float]] = {}
+_gauges: dict[str, dict[LabelKey, float]] = {}
+_histograms: dict[str, dict[LabelKey, list[float]]] = {}
+_buckets: dict[str, tuple[float, ...]] = {}
+_current_source: ContextVar[str] = ContextVar("xt_metrics_source", default="unknown")
+
+
+def describe(name: str, kind: str, help_text: str) -> None:
+    """Register the TYPE/HELP metadata emitted for a metric family."""
+    if kind not in {"counter", "gauge", "histogram"}:
+        raise ValueError("kind must be one of counter, gauge, histogram")
+    with _lock:
+        _types[name] = (kind, help_text)
+
+
+def _label_key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    """Increase a counter by value (default 1)."""
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    """Set a gauge to an absolute value."""
+    key = _label_key(labels)
+    with _lock:
+        _gauges.setdefault(name, {})[key] = value
+
+
+def observe(name: str, value: float, buckets: tuple[float, ...] = DURATION_BUCKETS, **labels: Any) -> None:
+    """Record one observation in a cumulative histogram."""
+    key = _label_key(labels)
+    with _lock:
+        bounds = _buckets.setdefault(name, buckets)
+        series = _histograms.setdefault(name, {})
+        # Layout: one slot per finite bucket, then +Inf, sum
+        slots = series.get(key)
+        if slots is None:
+            slots = [0.0] * (len(bounds) + 2)
+            series[key] = slots
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                slots[i] += 1
+        slots[-2] += 1
+        slots[-1] += value
+
+
+def current_source() -> str:
+    return _current_source.get()
+
+
+@contextmanager
+def bind_source(source: str) -> Iterator[None]:
+    """Label every stage recorded inside the block with the given data source."""
+    token = _current_source.set(source)
+    try:
+        yield
+    finally:
+        _current_source.reset(token)
+
+
+@contextmanager
+def stage(name: str, source: str | None = None) -> Iterator[dict[str, int]]:
+    """Time a pipeline stage; callers may set 'bytes' and 'rows' on the yielded dict.
+
+    Stages nest, so a stage's duration includes any stages recorded inside it.
+    """
+    src = source or _current_source.get()
+    sizes: dict[str, int] = {}
+    start = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        observe(STAGE_DURATION, time.perf_counter() - start, stage=name, source=src)
+        if 'bytes' in sizes:
+            inc(STAGE_BYTES, sizes['bytes'], stage=name, source=src)
+        if 'rows' in sizes:
+            inc(STAGE_ROWS, sizes['rows'], stage=name, source=src)
+
+
+def record_cache(source: str, hit: bool) -> None:
+    inc(CACHE_REQUESTS, source=source, result="hit" if hit else "miss")
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _header(lines: list[str], name: str, default_kind: str) -> None:
+    kind, help_text = _types.get(name, (default_kind, ""))
+    if help_text:
+        lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render_prometheus() -> str:
+    """Render every recorded series in the Prometheus text exposition format (0.0.4)."""
+    lines: list[str] = []
+    with _lock:
+        for name in sorted(_counters):
+            _header(lines, name, "counter")
+            for key, value in sorted(_counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(_gauges):
+            _header(lines, name, "gauge")
+            for key, value in sorted(_gauges[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(_histograms):
+            _header(lines, name, "histogram")
+            bounds = _buckets[name]
+            for key, slots in sorted(_histograms[name].items()):
+                for bound, cumulative in zip(bounds, slots):
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {_format_value(cumulative)}")
+                lines.append(f'{name}_bucket{_format_labels(key, (("le", "+Inf"),))} {_format_value(slots[-2])}')
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(slots[-1])}")
+                lines.append(f"{name}_count{_format_labels(key)} {_format_value(slots[-2])}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Drop every recorded series (metadata registered via describe() is kept)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware recording per-route latency histograms for HTTP requests.
+
+    Series are labelled with the matched route template rather than the raw path
+    so unknown URLs cannot blow up label cardinality.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        status: dict[str, int] = {"code": 500}
+
+        async def send_wrapper(message: dict) -> None:
+            if message.get("type") == "http.response.start":
+                status["code"] = int(message.get("status", 500))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            observe(
+                HTTP_DURATION,
+                time.perf_counter() - start,
+                route=path,
+                method=scope.get("method", ""),
+                status=status["code"],
+            )
+
+
+describe(STAGE_DURATION, "histogram", "Wall-clock duration of refresh pipeline stages.")
+describe(STAGE_BYTES, "counter", "Bytes produced by refresh pipeline stages.")
+describe(STAGE_ROWS, "counter", "Rows produced by refresh pipeline stages.")
+describe(CACHE_REQUESTS, "counter", "Freshness-check outcomes for cached downloads.")
+describe(HTTP_DURATION, "histogram", "HTTP request latency per route.")
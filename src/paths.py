@@ -0,0 +1,81 @@
+"""Filesystem layout shared by the download pipelines (kept import-light on purpose)."""
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# XT_DATA_DIR moves downloads/ and historic/ out of the checkout (e.g. a scratch tree for load tests)
+DATA_DIR = os.path.abspath(os.environ.get("XT_DATA_DIR") or ROOT_DIR)
+DOWNLOAD_DIR = os.path.join(DATA_DIR, "downloads")
+DOWNLOAD_OUTPUT_DIR = os.path.join(DOWNLOAD_DIR, "output")
+DOWNLOAD_DIR_MAIN = os.path.join(DOWNLOAD_DIR, "main")
+DOWNLOAD_DIR_15 = os.path.join(DOWNLOAD_DIR, "15m")
+DOWNLOAD_DIR_15_ET = os.path.join(DOWNLOAD_DIR_15, "et")
+DOWNLOAD_DIR_15_UTC = os.path.join(DOWNLOAD_DIR_15, "utc")
+DOWNLOAD_DIR_PM = os.path.join(DOWNLOAD_DIR, "polymarket_main")
+DOWNLOAD_DIR_PM_RAW = os.path.join(DOWNLOAD_DIR, "polymarket_raw")
+PROFILE_DIR = os.path.join(DOWNLOAD_DIR, "profiles")
+HISTORIC_DIR = os.path.join(DATA_DIR, "historic")
+HANDLES_DIR = os.path.join(DOWNLOAD_DIR, "handles")
+
+# The default handle keeps the original layout; every other handle gets its own tree
+DEFAULT_HANDLE = "elonmusk"
+_HANDLE_RE = re.compile(r"^[A-Za-z0-9_]{1,15}$")
+_current_handle: ContextVar[str] = ContextVar("xt_paths_handle", default=DEFAULT_HANDLE)
+
+REQUIRED_DIRS = (
+    DOWNLOAD_DIR,
+    DOWNLOAD_OUTPUT_DIR,
+    DOWNLOAD_DIR_MAIN,
+    DOWNLOAD_DIR_15,
+    DOWNLOAD_DIR_15_ET,
+    DOWNLOAD_DIR_15_UTC,
+    DOWNLOAD_DIR_PM,
+    DOWNLOAD_DIR_PM_RAW,
+    HISTORIC_DIR,
+)
+
+
+def ensure_dirs() -> None:
+    """Create every directory the pipelines write into (called from the app lifespan)."""
+    for path in REQUIRED_DIRS:
+        os.makedirs(path, exist_ok=True)
+
+
+def validate_handle(handle: str) -> str:
+    """Return handle if it is a valid X account name (1-15 letters, digits or underscores)."""
+    if not isinstance(handle, str) or not _HANDLE_RE.match(handle):
+        raise ValueError("handle must be 1-15 letters, digits or underscores")
+    return handle
+
+
+def namespaced(path: str, handle: str | None = None) -> str:
+    """Map a path under downloads/ or historic/ into the storage namespace of handle (default: the bound one).
+
+    downloads/<rel> becomes downloads/handles/<handle>/<rel> and historic/<rel> becomes
+    historic/<handle>/<rel>; the default handle and paths elsewhere are returned unchanged.
+    """
+    handle = _current_handle.get() if handle is None else handle
+    if handle == DEFAULT_HANDLE:
+        return path
+    roots = ((DOWNLOAD_DIR, os.path.join(HANDLES_DIR, handle)), (HISTORIC_DIR, os.path.join(HISTORIC_DIR, handle)))
+    for base, root in roots:
+        rel = os.path.relpath(path, base)
+        if rel.startswith(os.pardir):
+            continue
+        if path == root or path.startswith(root + os.sep):
+            return path
+        return root if rel == os.curdir else os.path.join(root, rel)
+    return path
+
+
+@contextmanager
+def bind_handle(handle: str) -> Iterator[None]:
+    """Route every namespaced() write inside the block to handle's storage namespace."""
+    token = _current_handle.set(handle)
+    try:
+        yield
+    finally:
+        _current_handle.reset(token)
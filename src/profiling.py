@@ -0,0 +1,203 @@
+"""Opt-in cProfile hooks for HTTP routes and MCP tools.
+
+Profiling is enabled either for sampled calls via the XT_PROFILE environment
+variable, or per request via ``?profile=1`` (HTTP) / the ``profile_tool`` MCP
+tool, both authenticated against XT_PROFILE_TOKEN.
+
+The environment mode is meant for production: it profiles one call in
+XT_PROFILE_SAMPLE_EVERY, never waits for a profile already in progress (that call
+simply runs unprofiled), and keeps only the newest XT_PROFILE_KEEP reports.
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from src.paths import PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "XT_PROFILE"
+PROFILE_TOKEN_ENV = "XT_PROFILE_TOKEN"
+SAMPLE_EVERY_ENV = "XT_PROFILE_SAMPLE_EVERY"
+KEEP_ENV = "XT_PROFILE_KEEP"
+DEFAULT_SAMPLE_EVERY = 1
+DEFAULT_KEEP = 200
+TOKEN_HEADER = "X-Profile-Token"
+DEFAULT_TOP_N = 25
+ENCODING = "utf-8"
+
+# cProfile cannot run two profilers at once on newer interpreters; serialize profiled calls.
+_profile_lock = threading.Lock()
+_sample_lock = threading.Lock()
+_sample_count = 0
+_persist_lock = threading.Lock()
+
+
+@dataclass
+class ProfileReport:
+    name: str
+    wall_s: float
+    cpu_s: float
+    stats: pstats.Stats
+    top_n: int = DEFAULT_TOP_N
+    sort_by: str = "tottime"
+    started_at: datetime = field(default_factory=datetime.now)
+
+    def hot_functions(self) -> list[tuple[str, int, float, float]]:
+        """Return (function, ncalls, tottime, cumtime) rows for the hottest functions."""
+        key = 2 if self.sort_by == "tottime" else 3
+        rows = []
+        for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in self.stats.stats.items():
+            rows.append((f"{filename}:{lineno}({func})", ncalls, tottime, cumtime))
+        rows.sort(key=lambda r: r[key], reverse=True)
+        return rows[: self.top_n]
+
+    def to_text(self) -> str:
+        ratio = (self.cpu_s / self.wall_s * 100.0) if self.wall_s > 0 else 0.0
+        lines = [
+            f"# profile {self.name} at {self.started_at.isoformat(timespec='seconds')}",
+            f"wall_s={self.wall_s:.6f} cpu_s={self.cpu_s:.6f} cpu_pct={ratio:.1f} "
+            f"wait_s={max(self.wall_s - self.cpu_s, 0.0):.6f}",
+            "ncalls,tottime_s,cumtime_s,function",
+        ]
+        for func, ncalls, tottime, cumtime in self.hot_functions():
+            lines.append(f"{ncalls},{tottime:.6f},{cumtime:.6f},{func}")
+        return "\n".join(lines) + "\n"
+
+
+def env_enabled() -> bool:
+    """Return True when XT_PROFILE asks for every call to be profiled."""
+    return os.environ.get(PROFILE_ENV, "").lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name)
+    if raw:
+        try:
+            return max(int(raw), 1)
+        except ValueError:
+            logger.warning("Ignoring invalid %s=%r", name, raw)
+    return default
+
+
+def env_sampled() -> bool:
+    """Return True when XT_PROFILE is on and this call is the one in XT_PROFILE_SAMPLE_EVERY to profile."""
+    global _sample_count
+    if not env_enabled():
+        return False
+    every = _env_int(SAMPLE_EVERY_ENV, DEFAULT_SAMPLE_EVERY)
+    with _sample_lock:
+        _sample_count += 1
+        return _sample_count % every == 0
+
+
+def token_matches(token: str | None) -> bool:
+    """Check a caller-supplied token against XT_PROFILE_TOKEN (disabled when unset)."""
+    expected = os.environ.get(PROFILE_TOKEN_ENV)
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(ENCODING), expected.encode(ENCODING))
+
+
+def _profiled(name: str, func: Callable[..., Any], args: tuple, kwargs: dict) -> tuple[Any, ProfileReport]:
+    """Run func under cProfile; call with _profile_lock held."""
+    profiler = cProfile.Profile()
+    started_at = datetime.now()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        wall_s = time.perf_counter() - wall_start
+        cpu_s = time.process_time() - cpu_start
+    return result, ProfileReport(
+        name, wall_s, cpu_s, pstats.Stats(profiler, stream=io.StringIO()), started_at=started_at,
+    )
+
+
+def profile_call(name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, ProfileReport]:
+    """Run func under cProfile and return (result, report), waiting for any profile in progress."""
+    with _profile_lock:
+        return _profiled(name, func, args, kwargs)
+
+
+def try_profile_call(
+    name: str, func: Callable[..., Any], *args: Any, **kwargs: Any,
+) -> tuple[Any, ProfileReport | None]:
+    """Like profile_call, but while another profile runs func runs unprofiled and the report is None."""
+    if not _profile_lock.acquire(blocking=False):
+        return func(*args, **kwargs), None
+    try:
+        return _profiled(name, func, args, kwargs)
+    finally:
+        _profile_lock.release()
+
+
+async def profile_awaitable(name: str, awaitable: Awaitable[Any]) -> tuple[Any, ProfileReport]:
+    """Await a coroutine under cProfile; other tasks scheduled meanwhile are included in the profile."""
+    profiler = cProfile.Profile()
+    # Non-blocking acquire keeps the event loop responsive while another profile runs.
+    while not _profile_lock.acquire(blocking=False):
+        await asyncio.sleep(0.01)
+    try:
+        started_at = datetime.now()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        profiler.enable()
+        try:
+            result = await awaitable
+        finally:
+            profiler.disable()
+            wall_s = time.perf_counter() - wall_start
+            cpu_s = time.process_time() - cpu_start
+    finally:
+        _profile_lock.release()
+    return result, ProfileReport(
+        name, wall_s, cpu_s, pstats.Stats(profiler, stream=io.StringIO()), started_at=started_at,
+    )
+
+
+def _prune(directory: str, keep: int) -> None:
+    """Delete the oldest reports (and their pstats dumps) beyond the newest keep."""
+    # Names start with the report's timestamp, so they sort oldest first
+    reports = sorted(name for name in os.listdir(directory) if name.endswith(".txt"))
+    for name in reports[: max(len(reports) - keep, 0)]:
+        stem = os.path.join(directory, name[: -len(".txt")])
+        for path in (f"{stem}.txt", f"{stem}.prof"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def persist(report: ProfileReport, directory: str = PROFILE_DIR) -> str:
+    """Write the text report and raw pstats dump beneath downloads/profiles/; return the text path.
+
+    Only the newest XT_PROFILE_KEEP reports are kept.
+    """
+    os.makedirs(directory, exist_ok=True)
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", report.name).strip("_") or "call"
+    stem = os.path.join(directory, f"{report.started_at.strftime('%Y%m%d_%H%M%S_%f')}_{safe_name}")
+    text_path = f"{stem}.txt"
+    try:
+        with open(text_path, "w", encoding=ENCODING) as f:
+            f.write(report.to_text())
+        report.stats.dump_stats(f"{stem}.prof")
+        logger.info("Saved profile for %s to %s", report.name, text_path)
+        with _persist_lock:
+            _prune(directory, _env_int(KEEP_ENV, DEFAULT_KEEP))
+    except OSError as exc:
+        logger.warning("Failed to persist profile for %s: %s", report.name, exc)
+    return text_path
@@ -0,0 +1,179 @@
+"""Monte Carlo projection of the current anchored week's final tweet count.
+
+Model: a 15-minute intensity profile by position in the anchored week (trailing
+full weeks) gives the expected count of each remaining slot. Every simulated day
+scales its expectation by a multiplier resampled from historical day-level
+actual/expected ratios, so bursty and quiet days are reproduced, and the
+remaining count is drawn as Poisson around the scaled expectation.
+"""
+import logging
+import threading
+from typing import Any
+
+import numpy as np
+
+from src import buckets, metrics
+from src.snapshot import Snapshot
+
+logger = logging.getLogger(__name__)
+
+SLOT_MS = 15 * buckets.MINUTE_MS
+SLOTS_PER_WEEK = 7 * 24 * 4
+QUANTILES = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95)
+DEFAULT_SIMULATIONS = 10_000
+DEFAULT_BRACKET_WIDTH = 20
+DEFAULT_HISTORY_WEEKS = 12
+MAX_SIMULATIONS = 200_000
+MAX_HISTORY_WEEKS = 104
+
+_cache_lock = threading.Lock()
+_cache: dict[tuple, dict[str, Any]] = {}
+
+
+def _week_wall_start(week: np.ndarray, anchor_weekday: int) -> np.ndarray:
+    """ET wall-clock start (anchor weekday at noon) of anchored week numbers."""
+    return (week * 7 - buckets.EPOCH_WEEKDAY + anchor_weekday) * buckets.DAY_MS + buckets.NOON_MS
+
+
+def _week_positions(slot_ms: np.ndarray, anchor_weekday: int) -> np.ndarray:
+    """Quarter-hour position of each slot inside its anchored week, measured on the ET wall clock."""
+    week = buckets.bucket_index(slot_ms, 'anchored_week', anchor_weekday=anchor_weekday)
+    offset = buckets.local_ms(slot_ms) - _week_wall_start(week, anchor_weekday)
+    return np.clip(offset // SLOT_MS, 0, SLOTS_PER_WEEK - 1)
+
+
+def _validate(anchor_weekday: int, simulations: int, bracket_width: int, history_weeks: int) -> None:
+    if anchor_weekday not in range(7):
+        raise ValueError("anchor must be in range 0..6 (0=Mon .. 6=Sun).")
+    if not 100 <= simulations <= MAX_SIMULATIONS:
+        raise ValueError(f"simulations must be between 100 and {MAX_SIMULATIONS}")
+    if not 1 <= bracket_width <= 1000:
+        raise ValueError("bracket width must be between 1 and 1000")
+    if not 1 <= history_weeks <= MAX_HISTORY_WEEKS:
+        raise ValueError(f"history weeks must be between 1 and {MAX_HISTORY_WEEKS}")
+
+
+def project_week(
+    epoch_ms: np.ndarray,
+    *,
+    as_of_ms: int,
+    anchor_weekday: int = 4,
+    simulations: int = DEFAULT_SIMULATIONS,
+    bracket_width: int = DEFAULT_BRACKET_WIDTH,
+    history_weeks: int = DEFAULT_HISTORY_WEEKS,
+    seed: Any = None,
+) -> dict[str, Any]:
+    """Simulate the final count of the anchored week containing as_of_ms.
+
+    Returns:
+        dict with the window bounds, current count, quantiles, mean/stdev and
+        bracket probabilities of the simulated final count
+    """
+    _validate(anchor_weekday, simulations, bracket_width, history_weeks)
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    week = int(buckets.bucket_index([as_of_ms], 'anchored_week', anchor_weekday=anchor_weekday)[0])
+    week_keys = np.arange(week - history_weeks, week + 2, dtype=np.int64)
+    week_starts = buckets.bucket_starts(week_keys, 'anchored_week', anchor_weekday=anchor_weekday)
+    start_ms, end_ms = int(week_starts[-2]), int(week_starts[-1])
+
+    # Only history weeks fully covered by the data feed the profile
+    first_ms = int(epoch_ms[0]) if epoch_ms.size else as_of_ms
+    covered = week_starts[:-2][week_starts[:-2] >= first_ms]
+    if covered.size == 0:
+        raise ValueError("not enough history: at least one full week before the current one is required")
+    history_start = int(covered[0])
+    n_weeks = int(covered.size)
+
+    current = int(np.searchsorted(epoch_ms, as_of_ms, side='right') - np.searchsorted(epoch_ms, start_ms))
+
+    history = buckets.bucketize(epoch_ms, '15m', start_ms=history_start, end_ms=start_ms - 1)
+    positions = _week_positions(history.start_ms, anchor_weekday)
+    profile = np.bincount(positions, weights=history.counts, minlength=SLOTS_PER_WEEK) / n_weeks
+
+    # Day-level burstiness: actual / expected for every historical ET day with a non-zero expectation
+    expected_hist = profile[positions]
+    _, day_idx = np.unique(buckets.local_ms(history.start_ms) // buckets.DAY_MS, return_inverse=True)
+    day_actual = np.bincount(day_idx, weights=history.counts)
+    day_expected = np.bincount(day_idx, weights=expected_hist)
+    ratios = day_actual[day_expected > 0] / day_expected[day_expected > 0]
+    if ratios.size == 0:
+        ratios = np.ones(1)
+
+    # Remaining quarter-hours; the slot containing as_of only contributes its unelapsed part
+    first_slot = as_of_ms - as_of_ms % SLOT_MS
+    slots = np.arange(first_slot, end_ms, SLOT_MS, dtype=np.int64)
+    lam = profile[_week_positions(slots, anchor_weekday)] if slots.size else np.zeros(0)
+    if slots.size:
+        lam[0] *= (min(first_slot + SLOT_MS, end_ms) - as_of_ms) / SLOT_MS
+    _, slot_day = np.unique(buckets.local_ms(slots) // buckets.DAY_MS, return_inverse=True)
+    lam_by_day = np.bincount(slot_day, weights=lam) if slots.size else np.zeros(0)
+
+    rng = np.random.default_rng(seed)
+    multipliers = rng.choice(ratios, size=(simulations, lam_by_day.size))
+    remaining = rng.poisson(multipliers @ lam_by_day)
+    final = current + remaining
+
+    lower = (final // bracket_width) * bracket_width
+    values, freq = np.unique(lower, return_counts=True)
+    start_et, end_et, as_of_et = buckets.iso_labels(np.array([start_ms, end_ms, as_of_ms]))
+    return {
+        'anchor': anchor_weekday,
+        'window_start_et': str(start_et),
+        'window_end_et': str(end_et),
+        'as_of_et': str(as_of_et),
+        'current_count': current,
+        'expected_remaining': float(remaining.mean()),
+        'history_weeks': n_weeks,
+        'simulations': simulations,
+        'mean': float(final.mean()),
+        'stdev': float(final.std(ddof=1)),
+        'quantiles': {
+            f"p{round(q * 100)}": int(v)
+            for q, v in zip(QUANTILES, np.quantile(final, QUANTILES, method='inverted_cdf'))
+        },
+        'brackets': [
+            {'lower': int(v), 'upper': int(v) + bracket_width - 1, 'probability': float(f) / simulations}
+            for v, f in zip(values, freq)
+        ],
+    }
+
+
+def cached_projection(
+    snap: Snapshot,
+    anchor_weekday: int = 4,
+    simulations: int = DEFAULT_SIMULATIONS,
+    bracket_width: int = DEFAULT_BRACKET_WIDTH,
+    history_weeks: int = DEFAULT_HISTORY_WEEKS,
+) -> dict[str, Any]:
+    """Project as of the snapshot's fetch time, memoized per (handle, anchor, snapshot version, parameters).
+
+    The fetch time is part of the key: a renewed snapshot (see snapshot.renew) keeps its
+    version but moves its fetch time, and the projection has to move with it.
+    """
+    key = (
+        snap.source, snap.handle, snap.version, snap.fetched_at,
+        anchor_weekday, simulations, bracket_width, history_weeks,
+    )
+    with _cache_lock:
+        cached = _cache.get(key)
+    metrics.record_cache(f"{snap.source}_projection", hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    result = project_week(
+        snap.epoch_ms,
+        as_of_ms=int(snap.fetched_at * 1000),
+        anchor_weekday=anchor_weekday,
+        simulations=simulations,
+        bracket_width=bracket_width,
+        history_weeks=history_weeks,
+        # Seeded by the cache key so a given snapshot always yields the same projection
+        seed=[snap.version, anchor_weekday, simulations, history_weeks],
+    )
+    result['snapshot_version'] = snap.version
+    with _cache_lock:
+        # Projections for older (or since renewed) snapshots of this source can never be requested again
+        for stale in [k for k in _cache if k[:2] == (snap.source, snap.handle) and k[2:4] != key[2:4]]:
+            del _cache[stale]
+        _cache[key] = result
+    return result
@@ -0,0 +1,140 @@
+"""Record reconstruction for raw tweet exports, optionally fanned out over a process pool.
+
+Kept free of pandas so spawned pool workers start quickly.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+logger = logging.getLogger(__name__)
+
+WORKERS_ENV = "XT_SANITIZE_WORKERS"
+MAX_DEFAULT_WORKERS = 8
+# Below this size the pool round-trip costs more than it saves
+PARALLEL_MIN_CHARS = 4 * 1024 * 1024
+
+_ID_LINE = re.compile(r'^\d{19},')
+_RECORD = re.compile(r'^(\d{19}),(.*),(".*")$')
+# A line break (any str.splitlines separator) followed by a line that starts a new record
+_RECORD_BOUNDARY = re.compile('[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029](?=\\d{19},)')
+
+_pool_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pool_size = 0
+
+
+def sanitize_lines(text: str, has_header: bool = True) -> str:
+    """Rebuild logical records from raw lines and return them as CSV text (id, text, timestamp).
+
+    Continuation lines are joined with a space onto the record above. With has_header
+    the first line is the CSV header; otherwise text must start at a record boundary.
+    """
+    lines = text.splitlines()
+    if not lines:
+        return ''
+
+    # Reconstruct logical records by detecting lines starting with a 19-digit ID
+    records = []
+    buf = lines[0]
+    for line in lines[1:]:
+        if _ID_LINE.match(line):
+            records.append(buf)
+            buf = line
+        else:
+            buf += ' ' + line
+    records.append(buf)
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if has_header:
+        header = records.pop(0)
+        writer.writerow(next(csv.reader([header])))
+
+    for rec in records:
+        m = _RECORD.match(rec)
+        if m:
+            id_f, text_f, ts_quoted = m.group(1), m.group(2), m.group(3)
+            ts_f = ts_quoted[1:-1]  # strip outer quotes
+        else:
+            # fallback: normal CSV split, then rejoin middle columns
+            parts = next(csv.reader([rec]))
+            id_f = parts[0]
+            ts_f = parts[-1]
+            text_f = ','.join(parts[1:-1])
+        # final sanitize of stray newlines/carriage returns
+        text_f = text_f.replace('\n', ' ').replace('\r', ' ')
+        writer.writerow([id_f, text_f, ts_f])
+    return out.getvalue()
+
+
+def split_records(text: str, parts: int) -> list[str]:
+    """Split text into at most `parts` pieces, cutting only right before a line that starts a record.
+
+    The header stays in the first piece, so joining the pieces' sanitize_lines output
+    reproduces sanitizing the whole text.
+    """
+    cuts = [0]
+    step = max(len(text) // max(parts, 1), 1)
+    for target in range(step, len(text), step):
+        m = _RECORD_BOUNDARY.search(text, max(target, cuts[-1]))
+        if m is None:
+            break
+        if m.end() > cuts[-1]:
+            cuts.append(m.end())
+    cuts.append(len(text))
+    return [text[a:b] for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def configured_workers() -> int:
+    """Worker count from XT_SANITIZE_WORKERS (1 disables the pool); defaults to the CPU count, capped."""
+    raw = os.environ.get(WORKERS_ENV)
+    if raw:
+        try:
+            return max(int(raw), 1)
+        except ValueError:
+            logger.warning("Ignoring invalid %s=%r", WORKERS_ENV, raw)
+    return min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: forking a threaded server process is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+            _pool_size = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool, _pool_size = None, 0
+
+
+def sanitize_text(text: str, workers: int | None = None) -> str:
+    """Sanitize a full export, in parallel chunks when it is large enough and more than one worker is allowed."""
+    workers = configured_workers() if workers is None else workers
+    if workers <= 1 or len(text) < PARALLEL_MIN_CHARS:
+        return sanitize_lines(text)
+    chunks = split_records(text, workers * 2)
+    if len(chunks) == 1:
+        return sanitize_lines(text)
+    try:
+        pool = _get_pool(workers)
+        flags = [True] + [False] * (len(chunks) - 1)
+        return ''.join(pool.map(sanitize_lines, chunks, flags))
+    except Exception:
+        # A broken pool must not fail the refresh; the serial path yields the same output
+        logger.exception("Parallel sanitize failed; falling back to a single process")
+        shutdown_pool()
+        return sanitize_lines(text)
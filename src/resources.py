@@ -0,0 +1,248 @@
+"""Aggregates published as MCP resources, rendered from the cached snapshot and pushed on change.
+
+Each resource is rendered at most once per snapshot version. After a refresh only the
+resources someone subscribed to are re-rendered, and their subscribers are notified
+only when the rendered text differs from what was last seen, so idle agents cost
+nothing. While a source has subscriptions it is refreshed on its polling interval
+(see src.live). Resources cover the default handle.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from src import live, snapshot
+from src.paths import DEFAULT_HANDLE
+
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import FastMCP
+
+logger = logging.getLogger(__name__)
+
+XTRACKER = 'xtracker'
+POLYMARKET = 'polymarket'
+
+
+@dataclass(frozen=True)
+class Resource:
+    uri: str
+    source: str
+    name: str
+    description: str
+    render: Callable[[snapshot.Snapshot], str]
+    mime_type: str = 'text/csv'
+
+
+def _aggregate(kind: str) -> Callable[[snapshot.Snapshot], str]:
+    def render(snap: snapshot.Snapshot) -> str:
+        from src.batch import AggregateSpec, evaluate
+
+        return str(evaluate(AggregateSpec.from_dict({'kind': kind, 'source': snap.source}), snap.epoch_ms))
+
+    return render
+
+
+def _latest(snap: snapshot.Snapshot) -> str:
+    from src.counts import market_windows_csv
+
+    # As of the fetch time, so the text only changes when a refresh does
+    return market_windows_csv(snap.epoch_ms, int(snap.fetched_at * 1000))
+
+
+_AGGREGATES = (
+    ('hour', 'Normalized tweet counts by hour of day (ET).'),
+    ('date', 'Tweet counts per date (ET).'),
+    ('weekday', 'Tweet counts per weekday (ET).'),
+    ('week', 'Tweet counts per week starting Friday noon ET.'),
+    ('15min', 'Tweet counts per 15-minute bucket (ET).'),
+    ('total', 'Total number of tweets.'),
+)
+
+
+def _build() -> dict[str, Resource]:
+    out = {}
+    for source, prefix, label in ((XTRACKER, 'xtracker://', 'XTracker'), (POLYMARKET, 'xtracker://pm/', 'Polymarket')):
+        for kind, description in _AGGREGATES:
+            uri = f"{prefix}{kind}"
+            mime_type = 'text/plain' if kind == 'total' else 'text/csv'
+            out[uri] = Resource(uri, source, f"{label} {kind}", description, _aggregate(kind), mime_type)
+    uri = 'xtracker://pm/latest'
+    out[uri] = Resource(
+        uri, POLYMARKET, 'Polymarket latest', 'Tweet counts since the last Tuesday and Friday noon ET.', _latest,
+    )
+    return out
+
+
+RESOURCES = _build()
+
+_lock = threading.Lock()
+# uri -> (snapshot version, rendered text)
+_rendered: dict[str, tuple[int, str]] = {}
+# uri -> text subscribers were last told about (or saw when subscribing)
+_last_seen: dict[str, str] = {}
+# uri -> sessions subscribed to it
+_subscribers: dict[str, set[Any]] = {}
+_loop: asyncio.AbstractEventLoop | None = None
+# Keeps notification tasks referenced until they finish
+_tasks: set[asyncio.Task] = set()
+
+
+def get(uri: str) -> Resource:
+    resource = RESOURCES.get(str(uri))
+    if resource is None:
+        raise ValueError(f"unknown resource {uri!s}")
+    return resource
+
+
+def _snapshot_loaders() -> dict[str, Callable[[bool, str], snapshot.Snapshot]]:
+    from src.download import _snapshot
+    from src.download_polymarket import _snapshot_pm
+
+    return {XTRACKER: _snapshot, POLYMARKET: _snapshot_pm}
+
+
+def content(resource: Resource, snap: snapshot.Snapshot) -> str:
+    """Rendered text of resource for snap, computed once per snapshot version."""
+    with _lock:
+        cached = _rendered.get(resource.uri)
+    if cached is not None and cached[0] == snap.version:
+        return cached[1]
+    text = resource.render(snap)
+    with _lock:
+        current = _rendered.get(resource.uri)
+        if current is None or current[0] <= snap.version:
+            _rendered[resource.uri] = (snap.version, text)
+    return text
+
+
+def read_sync(uri: str) -> str:
+    resource = get(uri)
+    return content(resource, _snapshot_loaders()[resource.source](False, DEFAULT_HANDLE))
+
+
+async def read(uri: str) -> str:
+    return await asyncio.to_thread(read_sync, uri)
+
+
+async def subscribe(uri: str, session: Any) -> None:
+    global _loop
+    uri = str(uri)
+    text = await read(uri)
+    with _lock:
+        _loop = asyncio.get_running_loop()
+        sessions = _subscribers.setdefault(uri, set())
+        added = session not in sessions
+        sessions.add(session)
+        _last_seen.setdefault(uri, text)
+    if added:
+        live.retain(RESOURCES[uri].source)
+
+
+async def unsubscribe(uri: str, session: Any) -> None:
+    uri = str(uri)
+    with _lock:
+        sessions = _subscribers.get(uri)
+        removed = sessions is not None and session in sessions
+        if removed:
+            sessions.discard(session)
+    if removed:
+        live.release(RESOURCES[uri].source)
+
+
+def _changed(snap: snapshot.Snapshot, uris: list[str]) -> list[str]:
+    """Render the subscribed resources for snap and return those whose text changed."""
+    changed = []
+    for uri in uris:
+        text = content(RESOURCES[uri], snap)
+        with _lock:
+            if _last_seen.get(uri) != text:
+                _last_seen[uri] = text
+                changed.append(uri)
+    return changed
+
+
+async def _notify(snap: snapshot.Snapshot, uris: list[str]) -> None:
+    from pydantic import AnyUrl
+
+    for uri in await asyncio.to_thread(_changed, snap, uris):
+        with _lock:
+            sessions = list(_subscribers.get(uri, ()))
+        for session in sessions:
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+            except Exception:
+                # The session is gone; forget it
+                logger.debug('Dropping subscriber of %s', uri, exc_info=True)
+                await unsubscribe(uri, session)
+
+
+def _spawn(snap: snapshot.Snapshot, uris: list[str]) -> None:
+    task = asyncio.get_running_loop().create_task(_notify(snap, uris))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _on_publish(snap: snapshot.Snapshot, previous: snapshot.Snapshot | None) -> None:
+    if snap.handle != DEFAULT_HANDLE:
+        return
+    with _lock:
+        loop = _loop
+        uris = [uri for uri, sessions in _subscribers.items() if sessions and RESOURCES[uri].source == snap.source]
+    if not uris or loop is None:
+        return
+    try:
+        loop.call_soon_threadsafe(_spawn, snap, uris)
+    except RuntimeError:
+        # Loop already closed (shutdown in progress)
+        pass
+
+
+snapshot.add_listener(_on_publish)
+
+
+def _reader(uri: str) -> Callable[[], Any]:
+    async def read_resource() -> str:
+        return await read(uri)
+
+    return read_resource
+
+
+def install(server: 'FastMCP') -> None:
+    """Register every resource on server, with subscriptions and change notifications.
+
+    FastMCP has no public API for resource subscriptions. The subscribe/unsubscribe
+    handlers therefore go on its low-level server (FastMCP._mcp_server), whose
+    get_capabilities is wrapped to advertise `resources.subscribe`: the low-level server
+    never sets it, even with the handlers registered. Both depend on mcp internals, which
+    is why pyproject.toml pins mcp below 2. A missing hook raises here instead of
+    leaving subscriptions silently broken.
+    """
+    for resource in RESOURCES.values():
+        server.resource(
+            resource.uri, name=resource.name, description=resource.description, mime_type=resource.mime_type,
+        )(_reader(resource.uri))
+
+    lowlevel = getattr(server, '_mcp_server', None)
+    hooks = ('subscribe_resource', 'unsubscribe_resource', 'get_capabilities')
+    if lowlevel is None or not all(callable(getattr(lowlevel, hook, None)) for hook in hooks):
+        raise RuntimeError('this mcp version has no low-level resource subscription hooks; see src/resources.py')
+
+    @lowlevel.subscribe_resource()
+    async def _subscribe(uri: Any) -> None:
+        get(uri)
+        await subscribe(uri, server.get_context().session)
+
+    @lowlevel.unsubscribe_resource()
+    async def _unsubscribe(uri: Any) -> None:
+        await unsubscribe(uri, server.get_context().session)
+
+    base_capabilities = lowlevel.get_capabilities
+
+    def capabilities(*args: Any, **kwargs: Any) -> Any:
+        found = base_capabilities(*args, **kwargs)
+        if found.resources is not None:
+            found.resources.subscribe = True
+        return found
+
+    lowlevel.get_capabilities = capabilities
@@ -1,43 +1,29 @@
-import csv
 import io
 import os
-import re
 from datetime import datetime, timezone
 from typing import Iterable, Union
 
+import numpy as np
 import pandas as pd
-import pytz
 from pandas import DataFrame
 
+from src import buckets, metrics, records, storage, tz
+from src.paths import (
+    DOWNLOAD_DIR, DOWNLOAD_DIR_15, DOWNLOAD_DIR_15_ET, DOWNLOAD_DIR_15_UTC, DOWNLOAD_DIR_MAIN, DOWNLOAD_OUTPUT_DIR, ROOT_DIR,
+    namespaced,
+)
+
 TWITTER_EPOCH_MS = 1288834974657
-ET_TZ = pytz.timezone('America/New_York')
-WEEKDAY_LABELS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-DOWNLOAD_DIR = os.path.join(ROOT_DIR, "downloads")
-DOWNLOAD_OUTPUT_DIR = os.path.join(DOWNLOAD_DIR, "output")
-DOWNLOAD_DIR_MAIN = os.path.join(DOWNLOAD_DIR, "main")
-DOWNLOAD_DIR_15 = os.path.join(DOWNLOAD_DIR, "15m")
-DOWNLOAD_DIR_15_ET = os.path.join(DOWNLOAD_DIR_15, "et")
-DOWNLOAD_DIR_15_UTC = os.path.join(DOWNLOAD_DIR_15, "utc")
+ET_TZ = tz.ET_TZ
+WEEKDAY_LABELS = tz.WEEKDAY_LABELS
 ENCODING = "utf-8"
 CSV_EXTENSION = ".csv"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-os.makedirs(DOWNLOAD_OUTPUT_DIR, exist_ok=True)
-os.makedirs(DOWNLOAD_DIR_MAIN, exist_ok=True)
-os.makedirs(DOWNLOAD_DIR_15, exist_ok=True)
-os.makedirs(DOWNLOAD_DIR_15_ET, exist_ok=True)
-os.makedirs(DOWNLOAD_DIR_15_UTC, exist_ok=True)
+# Output column name -> values, in output order
+Columns = dict[str, np.ndarray]
 
 
 # todo if bracket missing add date with 0
 
-def _snowflake_to_datetime(snowflake_id: int) -> datetime:
-    """Convert a Twitter Snowflake ID to an UTC timezone-aware datetime."""
-    ts_ms = (int(snowflake_id) >> 22) + TWITTER_EPOCH_MS
-    ts_s = ts_ms / 1000.0
-    return datetime.fromtimestamp(ts_s, tz=timezone.utc)
-
-
 def _timestamps_et_from_bytes(file_bytes: bytes) -> pd.Series:
     """Parse bytes -> tz-aware America/New_York timestamps (header is guaranteed)."""
     df = _read_csv_file(file_bytes)  # must expose a 'timestamp' column
@@ -45,20 +31,27 @@ def _timestamps_et_from_bytes(file_bytes: bytes) -> pd.Series:
     return ts_utc.dt.tz_convert(ET_TZ)
 
 
-def _span_days_and_weekday_occurrences(ts: pd.Series) -> tuple[int, pd.Series]:
-    if ts.empty:
-        return 0, pd.Series([0] * 7, index=range(7))
-    start_d = ts.min().floor('D')
-    end_d = pd.Timestamp.now(tz=ET_TZ).floor('D')
-    dr = pd.date_range(start=start_d, end=end_d, freq='D', tz=ET_TZ)
-    days_total = len(dr)
-    weekday_occ = (
-        pd.Series(dr.weekday, name='weekday')
-        .value_counts()
-        .reindex(range(7), fill_value=0)
-        .sort_index()
-    )
-    return days_total, weekday_occ
+def _epoch_ms_from_bytes(file_bytes: bytes) -> np.ndarray:
+    """Parse bytes -> epoch milliseconds for the bucketing engine (no ET conversion needed)."""
+    df = _read_csv_file(file_bytes)
+    ts_utc = pd.to_datetime(df['timestamp'], utc=True, errors='coerce').dropna()
+    return ts_utc.dt.tz_localize(None).values.astype('datetime64[ms]').astype(np.int64)
+
+
+def _epoch_ms_from_series(ts: pd.Series) -> np.ndarray:
+    return ts.dt.tz_convert('UTC').dt.tz_localize(None).values.astype('datetime64[ms]').astype(np.int64)
+
+
+def _span_days_and_weekday_occurrences(epoch_ms: np.ndarray) -> tuple[int, np.ndarray]:
+    if epoch_ms.size == 0:
+        return 0, np.zeros(7, dtype=np.int64)
+    first_day = buckets.local_day(int(epoch_ms.min()))
+    today = buckets.local_day(_now_ms())
+    return max(today - first_day + 1, 0), buckets.weekday_occurrences(first_day, today)
+
+
+def _now_ms() -> int:
+    return int(pd.Timestamp.now(tz='UTC').value // 1_000_000)
 
 
 def _read_csv_file(file_bytes: bytes) -> DataFrame:
@@ -78,7 +71,7 @@ def _resolve_csv_path(
     default_dir: str | None = None,
     suffix: str = "",
 ) -> str:
-    """Return an absolute CSV path derived from prefix + optional suffix."""
+    """Return an absolute CSV path derived from prefix + optional suffix, inside the bound handle's namespace."""
     if not prefix:
         raise ValueError("prefix must be a non-empty string")
     if default_dir and not os.path.isabs(prefix):
@@ -87,7 +80,7 @@ def _resolve_csv_path(
         base = prefix
     if base.endswith(CSV_EXTENSION):
         base = base[: -len(CSV_EXTENSION)]
-    return f"{base}{suffix}{CSV_EXTENSION}"
+    return namespaced(f"{base}{suffix}{CSV_EXTENSION}")
 
 
 def _dataframe_to_csv_bytes(
@@ -158,39 +151,6 @@ def _next_week_noon_et(start_noon: pd.Timestamp) -> pd.Timestamp:
     return (start_naive + pd.Timedelta(hours=12)).tz_localize(ET_TZ)
 
 
-def _anchors_noon_weekday_et(ts_et: pd.Series, anchor_weekday: int) -> pd.Series:
-    if not isinstance(anchor_weekday, int) or not (0 <= anchor_weekday <= 6):
-        raise ValueError("anchor_weekday must be an int in 0..6 (0=Mon .. 6=Sun).")
-    # Compute target anchor date as local date minus delta days
-    w = ts_et.dt.weekday
-    delta = (w - anchor_weekday) % 7
-    # Get the local dates
-    dates = ts_et.dt.tz_convert(ET_TZ).dt.date  # array of Python dates
-    # Subtract delta days on the date level
-    anchor_dates = pd.to_datetime(dates) - pd.to_timedelta(delta, unit='D')
-    # Build naive local noon for those dates, then tz-localize to ET (per-date DST aware)
-    anchor_noon_naive = anchor_dates + pd.Timedelta(hours=12)
-    anchor_noon = anchor_noon_naive.dt.tz_localize(ET_TZ)
-    # If the timestamp is earlier than local noon of that day, drop back one week and rebuild noon
-    mask = ts_et < anchor_noon
-    prev_week_dates = (anchor_dates - pd.Timedelta(days=7))
-    prev_noon = (prev_week_dates + pd.Timedelta(hours=12)).dt.tz_localize(ET_TZ)
-    return anchor_noon.where(~mask, prev_noon)
-
-
-def _floor_to_minutes(ts_et: pd.Series, minutes: int) -> pd.Series:
-    """Floor timestamps to ET wall-clock buckets of the given size (in minutes), DST-safe.
-
-    Implementation: convert to UTC, floor, convert back to ET so bucket labels
-    align with wall-clock quarter-hour boundaries even across DST switches.
-    """
-    if minutes <= 0:
-        raise ValueError("minutes must be a positive integer")
-    ts_utc = ts_et.dt.tz_convert('UTC')
-    floored_utc = ts_utc.dt.floor(f"{int(minutes)}min")
-    return floored_utc.dt.tz_convert(ET_TZ)
-
-
 def _align_now_to_minutes(now: pd.Timestamp, minutes: int) -> pd.Timestamp:
     # Align 'now' to the lower wall-clock bucket boundary in a DST-safe way via UTC
     now_utc = now.tz_convert('UTC')
@@ -213,49 +173,18 @@ def sanitize_csv_to_file(
     dir_name = os.path.dirname(output_path)
     if dir_name:
         os.makedirs(dir_name, exist_ok=True)
-    lines = text.splitlines()
-    if not lines:
-        open(output_path, 'wb').close()
-        return b''
-
-    # Reconstruct logical records by detecting lines starting with a 19-digit ID
-    pattern_id = re.compile(r'^\d{19},')
-    records = []
-    buf = lines[0]  # header
-    for line in lines[1:]:
-        if pattern_id.match(line):
-            records.append(buf)
-            buf = line
-        else:
-            buf += ' ' + line
-    records.append(buf)
-
-    header = records.pop(0)
-    # Prepare a regex to split each record into exactly 3 parts
-    rec_re = re.compile(r'^(\d{19}),(.*),(".*")$')
-
-    with open(output_path, 'w', newline='', encoding=ENCODING) as out:
-        writer = csv.writer(out)
-        # write header
-        writer.writerow(next(csv.reader([header])))
-
-        for rec in records:
-            m = rec_re.match(rec)
-            if m:
-                id_f, text_f, ts_quoted = m.group(1), m.group(2), m.group(3)
-                ts_f = ts_quoted[1:-1]  # strip outer quotes
-            else:
-                # fallback: normal CSV split, then rejoin middle columns
-                parts = next(csv.reader([rec]))
-                id_f = parts[0]
-                ts_f = parts[-1]
-                text_f = ','.join(parts[1:-1])
-            # final sanitize of stray newlines/carriage returns
-            text_f = text_f.replace('\n', ' ').replace('\r', ' ')
-            writer.writerow([id_f, text_f, ts_f])
-
-    with open(output_path, 'rb') as f:
-        return f.read()
+    with metrics.stage('sanitize') as st:
+        out_bytes = _sanitize_text_to_file(text, output_path)
+        st['bytes'] = len(out_bytes)
+        st['rows'] = max(out_bytes.count(b'\n') - 1, 0)
+    return out_bytes
+
+
+def _sanitize_text_to_file(text: str, output_path: str) -> bytes:
+    # Record reconstruction fans out over a process pool for large exports (see src.records)
+    csv_bytes = records.sanitize_text(text).encode(ENCODING)
+    storage.write_bytes(output_path, csv_bytes)
+    return csv_bytes
 
 
 def create_clean_timestamps_csv(
@@ -270,64 +199,102 @@ def create_clean_timestamps_csv(
     Returns:
         tuple of (et_csv_bytes, utc_csv_bytes, cc_csv_bytes)
     """
+    ids = ids_from_csv_bytes(input_data)
+    return create_clean_timestamps_from_ids(ids, output_prefix, output_prefix_utc, output_prefix_cc, trim_to_months)
+
+
+def ids_from_csv_bytes(input_data: Union[bytes, str]) -> np.ndarray:
+    """Snowflake ids (int64, file order) from the 'id' column of sanitized CSV data; invalid ids are dropped."""
+    # Normalize input and read CSV
+    file_bytes = input_data if isinstance(input_data, bytes) else input_data.encode(ENCODING, errors='replace')
+    df = _read_csv_file(file_bytes)
+
+    # Coerce ids and drop invalid rows
+    if 'id' not in df.columns:
+        return np.empty(0, dtype=np.int64)
+    return pd.to_numeric(df['id'], errors='coerce').dropna().astype('int64').to_numpy()
 
+
+def create_clean_timestamps_from_ids(
+    ids: np.ndarray,
+    output_prefix: str,
+    output_prefix_utc: str,
+    output_prefix_cc: str,
+    trim_to_months: int = 6,
+) -> tuple[bytes, bytes, bytes]:
+    """Same outputs as create_clean_timestamps_csv, straight from snowflake ids (no text CSV to parse).
+
+    Returns:
+        tuple of (et_csv_bytes, utc_csv_bytes, cc_csv_bytes)
+    """
+    output_path = _resolve_csv_path(output_prefix)
+    output_path_utc = _resolve_csv_path(output_prefix_utc)
+    output_path_cc = _resolve_csv_path(output_prefix_cc)
+
+    with metrics.stage('clean_timestamps') as st:
+        et_csv_bytes, utc_csv_bytes, cc_csv_bytes, rows = _clean_timestamps_to_files(
+            ids,
+            output_path,
+            output_path_utc,
+            output_path_cc,
+            trim_to_months,
+        )
+        st['rows'] = rows
+        st['bytes'] = len(et_csv_bytes) + len(utc_csv_bytes) + len(cc_csv_bytes)
+    if rows:
+        # Refresh the 15-minute bucket files alongside the timestamp CSVs
+        with metrics.stage('process_by_15min') as st:
+            full_csv_bytes = process_by_15min(et_csv_bytes)
+            st['bytes'] = len(full_csv_bytes)
+            st['rows'] = max(full_csv_bytes.count(b'\n') - 1, 0)
+    return et_csv_bytes, utc_csv_bytes, cc_csv_bytes
+
+
+def _clean_timestamps_to_files(
+    ids: np.ndarray,
+    output_path: str,
+    output_path_utc: str,
+    output_path_cc: str,
+    trim_to_months: int,
+) -> tuple[bytes, bytes, bytes, int]:
     def _empty_csv_bytes() -> bytes:
         return _dataframe_to_csv_bytes(pd.DataFrame(columns=['timestamp']))
 
-    def _to_csv_bytes(series: pd.Series) -> bytes:
-        df_out = pd.DataFrame({'timestamp': series.map(lambda d: d.isoformat(timespec='milliseconds'))})
-        return _dataframe_to_csv_bytes(df_out)
+    def _to_csv_bytes(labels: np.ndarray) -> bytes:
+        # ISO labels never need quoting, so this is what DataFrame.to_csv would write, minus its overhead
+        return (os.linesep.join(['timestamp', *labels.tolist()]) + os.linesep).encode(ENCODING)
 
-    def _mask_last_n_months_et(series: pd.Series, months: int = trim_to_months) -> pd.Series:
+    def _mask_last_n_months_et(epoch_ms: np.ndarray, months: int = trim_to_months) -> np.ndarray:
         now_et = pd.Timestamp.now(tz=ET_TZ)
         cutoff = now_et - pd.DateOffset(months=months)
-        return series.map(lambda d: d >= cutoff)
-
-    output_path = _resolve_csv_path(output_prefix)
-    output_path_utc = _resolve_csv_path(output_prefix_utc)
-    output_path_cc = _resolve_csv_path(output_prefix_cc)
-
-    # Normalize input and read CSV
-    file_bytes = input_data if isinstance(input_data, bytes) else input_data.encode(ENCODING, errors='replace')
-    df = _read_csv_file(file_bytes)
+        return epoch_ms * 1_000_000 >= cutoff.value
 
     # Handle missing/empty ids
-    if 'id' not in df.columns or df.empty:
-        empty_csv = _empty_csv_bytes()
-        for path in (output_path, output_path_utc, output_path_cc):
-            save_tweets_to_csv(empty_csv, path)
-        return empty_csv, empty_csv, empty_csv
-
-    # Coerce ids and drop invalid rows
-    ids = pd.to_numeric(df['id'], errors='coerce').dropna()
-    if ids.empty:
+    if len(ids) == 0:
         empty_csv = _empty_csv_bytes()
         for path in (output_path, output_path_utc, output_path_cc):
             save_tweets_to_csv(empty_csv, path)
-        return empty_csv, empty_csv, empty_csv
+        return empty_csv, empty_csv, empty_csv, 0
 
-    ids = ids.astype('int64')
+    ids = np.asarray(ids, dtype=np.int64)
 
-    # Use helper _snowflake_to_datetime for UTC and convert to ET
-    utc_series = ids.map(_snowflake_to_datetime)
-    et_series = utc_series.map(lambda d: d.astimezone(ET_TZ))
+    # Snowflake creation times, formatted like datetime.isoformat(timespec='milliseconds') in ET and UTC
+    epoch_ms = (ids >> 22) + TWITTER_EPOCH_MS
+    et_labels = tz.iso_ms(epoch_ms)
 
     # Compute last trim_to_months months mask via helper
-    mask = _mask_last_n_months_et(et_series, months=trim_to_months)
+    mask = _mask_last_n_months_et(epoch_ms, months=trim_to_months)
 
     # Build CSV bytes
-    et_csv_bytes = _to_csv_bytes(et_series)
-    utc_csv_bytes = _to_csv_bytes(utc_series)
-    cc_csv_bytes = _to_csv_bytes(et_series[mask])
+    et_csv_bytes = _to_csv_bytes(et_labels)
+    utc_csv_bytes = _to_csv_bytes(tz.iso_ms(epoch_ms, utc=True))
+    cc_csv_bytes = _to_csv_bytes(et_labels[mask])
 
     # Save all outputs
     save_tweets_to_csv(et_csv_bytes, output_path)
     save_tweets_to_csv(utc_csv_bytes, output_path_utc)
     save_tweets_to_csv(cc_csv_bytes, output_path_cc)
-    ###
-    process_by_15min(et_csv_bytes)
-    ###
-    return et_csv_bytes, utc_csv_bytes, cc_csv_bytes
+    return et_csv_bytes, utc_csv_bytes, cc_csv_bytes, int(ids.shape[0])
 
 
 def process_by_date(
@@ -336,29 +303,13 @@ def process_by_date(
 ) -> bytes:
     """Aggregate tweets per calendar day (ET), filling gaps with zero counts."""
     path = _resolve_csv_path(output_prefix, default_dir=DOWNLOAD_OUTPUT_DIR)
-    ts = _timestamps_et_from_bytes(file_bytes)
-    if ts.empty:
-        today = pd.Timestamp.now(tz=ET_TZ).floor('D')
-        out_df = pd.DataFrame({'date_start_et': [today.isoformat()], 'total_count': [0]})
-        return _write_dataframe(out_df, path)
-
-    date_start = ts.dt.floor('D')  # ET midnight
-    end_d = pd.Timestamp.now(tz=ET_TZ).floor('D')
-    start_d = ts.min().floor('D')
-    all_days = pd.date_range(start=start_d, end=end_d, freq='D', tz=ET_TZ)
-
-    grouped = (
-        date_start.rename('date_start_et')
-        .to_frame()
-        .groupby('date_start_et')
-        .size()
-        .reindex(all_days, fill_value=0)
-        .rename_axis('date_start_et')
-        .reset_index(name='total_count')
-        .sort_values('date_start_et', kind='stable')
-    )
-    grouped['date_start_et'] = _isoformat_series(grouped['date_start_et'], timespec='seconds')
-    return _write_dataframe(grouped, path)
+    return _write_dataframe(pd.DataFrame(_date_columns(_epoch_ms_from_bytes(file_bytes))), path)
+
+
+def _date_columns(epoch_ms: np.ndarray) -> Columns:
+    # Dense ET days from the first tweet's day through today
+    days = buckets.bucketize(epoch_ms, 'day', end_ms=_now_ms())
+    return {'date_start_et': days.labels(), 'total_count': days.counts}
 
 
 def process_by_hour(
@@ -367,32 +318,25 @@ def process_by_hour(
 ) -> bytes:
     """Aggregate tweets per clock hour (ET) with normalized frequency and a daily average."""
     path = _resolve_csv_path(output_prefix, default_dir=DOWNLOAD_OUTPUT_DIR)
-    ts = _timestamps_et_from_bytes(file_bytes)
-    hours = pd.Index(range(24), name='hour')
-    counts = (
-        pd.Series(ts.dt.hour, name='hour')
-        .value_counts()
-        .reindex(hours, fill_value=0)
-        .sort_index()
-        .astype('int64')
-    )
+    return _write_dataframe(pd.DataFrame(_hour_columns(_epoch_ms_from_bytes(file_bytes))), path)
 
-    days_total, _ = _span_days_and_weekday_occurrences(ts)
+
+def _hour_columns(epoch_ms: np.ndarray) -> Columns:
+    counts = buckets.cyclic_counts(epoch_ms, 'hour')
+
+    days_total, _ = _span_days_and_weekday_occurrences(epoch_ms)
     denom = days_total if days_total > 0 else 1
     avg = counts / denom
 
     total = int(counts.sum())
-    normalized = (counts.astype(float) / total) if total > 0 else pd.Series(0.0, index=hours, dtype='float64')
-
-    out_df = pd.DataFrame(
-        {
-            'hour': hours,
-            'total_count': counts.values,
-            'avg': avg.values,
-            'normalized': normalized.values,
-        },
-    )
-    return _write_dataframe(out_df, path)
+    normalized = (counts.astype(float) / total) if total > 0 else np.zeros(24, dtype='float64')
+
+    return {
+        'hour': np.arange(24),
+        'total_count': counts,
+        'avg': avg,
+        'normalized': normalized,
+    }
 
 
 def process_by_weekday(
@@ -401,39 +345,32 @@ def process_by_weekday(
 ) -> bytes:
     """Aggregate tweets by weekday with average-per-occurrence and normalized proportions."""
     path = _resolve_csv_path(output_prefix, default_dir=DOWNLOAD_OUTPUT_DIR)
-    ts = _timestamps_et_from_bytes(file_bytes)
-    days_labels = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    return _write_dataframe(pd.DataFrame(_weekday_columns(_epoch_ms_from_bytes(file_bytes))), path)
+
+
+def _weekday_columns(epoch_ms: np.ndarray) -> Columns:
+    days_labels = np.array(WEEKDAY_LABELS)
 
     # How many occurrences of each weekday in the date span (Mon=0..Sun=6)
-    _, weekday_occ = _span_days_and_weekday_occurrences(ts)
+    _, weekday_occ = _span_days_and_weekday_occurrences(epoch_ms)
 
     # Total tweets per weekday
-    counts = (
-        pd.Series(ts.dt.weekday, name='weekday')
-        .to_frame()
-        .groupby('weekday')
-        .size()
-        .reindex(range(7), fill_value=0)
-        .astype(int)
-    )
+    counts = buckets.cyclic_counts(epoch_ms, 'weekday')
 
     # Average tweets per that weekday across the span (zeros included)
-    denom = weekday_occ.replace(0, pd.NA)
-    avg_per_weekday = (counts / denom).fillna(0.0)
+    avg_per_weekday = np.divide(
+        counts, weekday_occ, out=np.zeros(7, dtype='float64'), where=weekday_occ > 0,
+    )
 
     total = int(counts.sum())
-    norm = (counts / total).fillna(0.0) if total > 0 else counts.astype(float)
-
-    out_df = pd.DataFrame(
-        {
-            'day': days_labels,
-            'total_count': counts.values,
-            'avg': avg_per_weekday.values,
-            'normalized': norm.values,
-        },
-    )
+    norm = counts / total if total > 0 else counts.astype(float)
 
-    return _write_dataframe(out_df, path)
+    return {
+        'day': days_labels,
+        'total_count': counts,
+        'avg': avg_per_weekday,
+        'normalized': norm,
+    }
 
 
 def process_by_week(
@@ -454,55 +391,38 @@ def process_by_week(
     if use_utc:
         suffix += "_utc"
     path = _resolve_csv_path(output_prefix, default_dir=DOWNLOAD_OUTPUT_DIR, suffix=suffix)
+    out_df = pd.DataFrame(_week_columns(
+        _epoch_ms_from_bytes(file_bytes),
+        anchor_weekday=anchor_weekday,
+        include_empty=include_empty,
+        use_utc=use_utc,
+    ))
+    return _write_dataframe(out_df, path)
+
+
+def _week_columns(
+    epoch_ms: np.ndarray,
+    anchor_weekday: int = 4,
+    include_empty: bool = True,
+    use_utc: bool = False,
+) -> Columns:
     col_name = "week_start_utc" if use_utc else "week_start_et"
-    ts = _timestamps_et_from_bytes(file_bytes)
-    if ts.empty:
-        out_df = pd.DataFrame(columns=[col_name, 'total_count'])
-        return _write_dataframe(out_df, path)
+    empty = {col_name: np.empty(0, dtype='<U25'), 'total_count': np.empty(0, dtype=np.int64)}
+    if epoch_ms.size == 0:
+        return empty
 
     # Trim off the first partial week so weekly counts represent complete coverage.
-    first_ts = ts.min()
-    first_anchor = _anchors_noon_weekday_et(pd.Series([first_ts]), anchor_weekday).iloc[0]
-    first_full_anchor = first_anchor if first_ts <= first_anchor else _next_week_noon_et(first_anchor)
-    ts = ts[ts >= first_full_anchor]
-    if ts.empty:
-        out_df = pd.DataFrame(columns=[col_name, 'total_count'])
-        return _write_dataframe(out_df, path)
-
-    anchors = _anchors_noon_weekday_et(ts, anchor_weekday)
-    grouped = (
-        anchors.to_frame(name="anchor_et")
-        .groupby("anchor_et", sort=True)
-        .size()
-        .reset_index(name="total_count")
-    )
-
-    if include_empty:
-        # Build a DST-aware weekly index by iterating local-noon to next week's local-noon
-        start = grouped["anchor_et"].min()
-        end = grouped["anchor_et"].max()
-        idx = [start]
-        cur = start
-        # Iterate until we've reached/passed the last anchor
-        while cur < end:
-            cur = _next_week_noon_et(cur)
-            idx.append(cur)
-        full_idx = pd.DatetimeIndex(idx, tz=ET_TZ)
-
-        grouped = (
-            grouped.set_index("anchor_et")
-            .reindex(full_idx, fill_value=0)
-            .rename_axis("anchor_et")
-            .reset_index()
-        )
+    first_ms = int(epoch_ms.min())
+    first_week = buckets.bucket_index([first_ms], 'anchored_week', anchor_weekday=anchor_weekday)
+    first_anchor_ms = int(buckets.bucket_starts(first_week, 'anchored_week', anchor_weekday=anchor_weekday)[0])
+    if first_ms > first_anchor_ms:
+        next_week = buckets.bucket_starts(first_week + 1, 'anchored_week', anchor_weekday=anchor_weekday)
+        epoch_ms = epoch_ms[epoch_ms >= next_week[0]]
+    if epoch_ms.size == 0:
+        return empty
 
-    if use_utc:
-        grouped[col_name] = grouped["anchor_et"].map(lambda x: x.tz_convert("UTC").isoformat())
-        out_df = grouped[[col_name, "total_count"]].sort_values(col_name, kind="stable")
-    else:
-        grouped[col_name] = grouped["anchor_et"].map(lambda x: x.isoformat())
-        out_df = grouped[[col_name, "total_count"]].sort_values(col_name, kind="stable")
-    return _write_dataframe(out_df, path)
+    weeks = buckets.bucketize(epoch_ms, 'anchored_week', anchor_weekday=anchor_weekday, dense=include_empty)
+    return {col_name: weeks.labels(utc=use_utc), 'total_count': weeks.counts}
 
 
 def _last_week_count_row(ts: pd.Series, anchor_weekday: int, now_et: pd.Timestamp) -> dict[str, object]:
@@ -564,6 +484,17 @@ def process_last_tue_fri_counts_with_weekly_refresh(
     return _write_dataframe(out_df, path)
 
 
+def _quarter_hour_frame(epoch_ms: np.ndarray, include_empty: bool = False) -> DataFrame:
+    """Group timestamps into 15-minute buckets, keeping tz-aware ET bucket starts."""
+    if include_empty:
+        # Complete 15-minute index from the aligned first bucket up to "now" aligned
+        quarters = buckets.bucketize(epoch_ms, '15m', end_ms=_now_ms())
+    else:
+        quarters = buckets.bucketize(epoch_ms, '15m', dense=False)
+    starts = pd.to_datetime(quarters.start_ms, unit='ms', utc=True).tz_convert(ET_TZ)
+    return pd.DataFrame({'15m_bucket_start_et': starts, 'total_count': quarters.counts})
+
+
 def process_by_15min(
     file_bytes: bytes,
     output_prefix: str = "by_15min",
@@ -617,25 +548,7 @@ def process_by_15min(
             _write_time_buckets_utc_z(empty_utc, extra_path, '15m_bucket_start_utc')
         return empty_bytes_et
 
-    bucket_start = _floor_to_minutes(ts, 15)
-    grouped = (
-        bucket_start.to_frame(name='15m_bucket_start_et')
-        .groupby('15m_bucket_start_et', sort=True)
-        .size()
-        .reset_index(name='total_count')
-    )
-
-    if include_empty:
-        # Build a complete 15-minute index from the aligned first bucket up to "now" aligned
-        start_aligned = bucket_start.min()
-        now_aligned = _align_now_to_minutes(pd.Timestamp.now(tz=ET_TZ), 15)
-        full_idx = pd.date_range(start=start_aligned, end=now_aligned, freq='15min', tz=ET_TZ)
-        grouped = (
-            grouped.set_index('15m_bucket_start_et')
-            .reindex(full_idx, fill_value=0)
-            .rename_axis('15m_bucket_start_et')
-            .reset_index()
-        )
+    grouped = _quarter_hour_frame(_epoch_ms_from_series(ts), include_empty=include_empty)
 
     # Keep a datetime copy for window filtering before string conversion
     grouped_dt = grouped.copy()
@@ -727,6 +640,61 @@ def process_by_15min(
     return full_csv_bytes
 
 
+AGGREGATE_KINDS = ('hour', 'weekday', 'date', 'week', '15min', 'buckets')
+
+
+def aggregate_columns(
+    epoch_ms: np.ndarray,
+    kind: str,
+    *,
+    anchor_weekday: int = 4,
+    use_utc: bool = False,
+    resolution: str = '15m',
+    dense: bool = False,
+) -> Columns:
+    """Compute one aggregate from epoch milliseconds as named columns (labels, counts, ...), in output order.
+
+    Columns match the corresponding process_by_* file; `use_utc` applies to weekly
+    anchors and to 15-minute buckets (formatted with a trailing 'Z'). The 'buckets'
+    kind exposes the generic engine at any `resolution`, sparse unless `dense`.
+    """
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    if kind == 'hour':
+        return _hour_columns(epoch_ms)
+    if kind == 'weekday':
+        return _weekday_columns(epoch_ms)
+    if kind == 'date':
+        return _date_columns(epoch_ms)
+    if kind == 'week':
+        _anchor_label(anchor_weekday)
+        return _week_columns(epoch_ms, anchor_weekday=anchor_weekday, use_utc=use_utc)
+    if kind == '15min':
+        quarters = buckets.bucketize(epoch_ms, '15m', dense=False)
+        column = '15m_bucket_start_utc' if use_utc else '15m_bucket_start_et'
+        return {column: quarters.labels(utc=use_utc, zulu=True), 'total_count': quarters.counts}
+    if kind == 'buckets':
+        counted = buckets.bucketize(epoch_ms, resolution, anchor_weekday=anchor_weekday, dense=dense)
+        column = 'bucket_start_utc' if use_utc else 'bucket_start_et'
+        return {column: counted.labels(utc=use_utc), 'total_count': counted.counts}
+    raise ValueError(f"unknown aggregate kind {kind!r}; expected one of {', '.join(AGGREGATE_KINDS)}")
+
+
+def aggregate_csv_bytes(
+    epoch_ms: np.ndarray,
+    kind: str,
+    *,
+    anchor_weekday: int = 4,
+    use_utc: bool = False,
+    resolution: str = '15m',
+    dense: bool = False,
+) -> bytes:
+    """Render one aggregate (see aggregate_columns) as CSV bytes without touching disk."""
+    columns = aggregate_columns(
+        epoch_ms, kind, anchor_weekday=anchor_weekday, use_utc=use_utc, resolution=resolution, dense=dense,
+    )
+    return _dataframe_to_csv_bytes(pd.DataFrame(columns))
+
+
 def count_tweets(file_bytes: bytes) -> int:
     """Return the number of tweets represented by the given CSV bytes."""
     return int(_timestamps_et_from_bytes(file_bytes).shape[0])
@@ -750,7 +718,8 @@ def get_average_tweets_per_day(file_bytes: bytes) -> float:
 
 
 def save_tweets_to_csv(csv_bytes: bytes, output_path: str) -> None:
-    """Write CSV bytes to disk ensuring the parent directory exists."""
-    _ensure_parent_dir(output_path)
-    with open(output_path, 'wb') as f:
-        f.write(csv_bytes)
+    """Write CSV bytes to disk (compressed when storage compression is configured), ensuring the parent directory exists."""
+    with metrics.stage('write') as st:
+        _ensure_parent_dir(output_path)
+        storage.write_bytes(output_path, csv_bytes)
+        st['bytes'] = len(csv_bytes)
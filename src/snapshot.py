@@ -0,0 +1,462 @@
+"""In-memory snapshots of the processed timestamp CSVs, one per data source.
+
+After every refresh a snapshot is also checkpointed to a binary file next to its CSVs,
+so a restarted process resumes from it and judges its freshness by the recorded fetch
+time rather than by file mtimes.
+"""
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable
+
+from src import metrics, storage
+from src.cadence import POLL_INTERVAL
+from src.paths import DEFAULT_HANDLE
+from src.tz import ET_TZ
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from src.weekstats import WeekStats
+
+logger = logging.getLogger(__name__)
+
+ENCODING = 'utf-8'
+UTC_SUFFIX = '+00:00'
+# Snapshots of every (source, handle) pair share this budget; least recently used ones are evicted past it
+MAX_MB_ENV = 'XT_SNAPSHOT_MAX_MB'
+DEFAULT_MAX_MB = 512
+SNAPSHOT_BYTES = 'xt_snapshot_bytes'
+SNAPSHOT_EVICTIONS = 'xt_snapshot_evictions_total'
+# Bumped whenever the checkpoint layout changes; checkpoints of other formats are ignored
+CHECKPOINT_FORMAT = 1
+# Upstream response headers kept to make the next fetch conditional
+VALIDATOR_HEADERS = {'ETag': 'If-None-Match', 'Last-Modified': 'If-Modified-Since'}
+
+
+@dataclass(frozen=True)
+class TweetStats:
+    """Scalars precomputed once per refresh so info endpoints never re-parse the CSVs."""
+    count: int
+    first_ms: int | None
+    last_ms: int | None
+
+    @property
+    def span_ms(self) -> int:
+        if self.first_ms is None or self.last_ms is None:
+            return 0
+        return self.last_ms - self.first_ms
+
+    def first_tweet_et(self) -> datetime | None:
+        if self.first_ms is None:
+            return None
+        seconds, millis = divmod(self.first_ms, 1000)
+        return datetime.fromtimestamp(seconds, tz=ET_TZ) + timedelta(milliseconds=millis)
+
+    def first_tweet_iso(self) -> str:
+        """ISO timestamp of the first tweet in ET ('NaT' when there is no data)."""
+        first = self.first_tweet_et()
+        return first.isoformat() if first is not None else 'NaT'
+
+    def seconds_since_first(self, now: float | None = None) -> float:
+        if self.first_ms is None:
+            raise ValueError('no tweets available')
+        return (time.time() if now is None else now) - self.first_ms / 1000.0
+
+    def avg_per_day(self, now: float | None = None) -> float:
+        """Average tweets per day between the first tweet and now."""
+        if self.count == 0:
+            return 0.0
+        return self.count / max(self.seconds_since_first(now) / 86400.0, 1e-12)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    source: str
+    version: int
+    fetched_at: float
+    clean_bytes: bytes
+    utc_bytes: bytes
+    cc_bytes: bytes
+    epoch_ms: 'np.ndarray'
+    stats: TweetStats
+    week_stats: 'WeekStats'
+    # Sorted unique snowflake ids; None when loaded from CSVs persisted without an ids file
+    ids: 'np.ndarray | None' = None
+    handle: str = DEFAULT_HANDLE
+    # Seconds until the upstream should be polled again (see src.cadence)
+    max_age: float = 300.0
+    # Upstream validators (ETag / Last-Modified) of the response the snapshot was built from
+    validators: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the snapshot's payloads and arrays."""
+        arrays = self.epoch_ms.nbytes + (self.ids.nbytes if self.ids is not None else 0)
+        return len(self.clean_bytes) + len(self.utc_bytes) + len(self.cc_bytes) + arrays
+
+    def age(self, now: float | None = None) -> float:
+        return (time.time() if now is None else now) - self.fetched_at
+
+    def csv_triple(self) -> tuple[bytes, bytes, bytes]:
+        return self.clean_bytes, self.utc_bytes, self.cc_bytes
+
+
+Key = tuple[str, str]
+
+_lock = threading.Lock()
+# Least recently used first
+_snapshots: 'OrderedDict[Key, Snapshot]' = OrderedDict()
+_versions: dict[Key, int] = {}
+_refresh_locks: dict[Key, threading.Lock] = {}
+_listeners: list[Callable[[Snapshot, Snapshot | None], None]] = []
+
+
+def current(source: str, handle: str = DEFAULT_HANDLE) -> Snapshot | None:
+    """Return the latest published snapshot for source and handle, if it has not been evicted."""
+    with _lock:
+        snap = _snapshots.get((source, handle))
+        if snap is not None:
+            _snapshots.move_to_end((source, handle))
+        return snap
+
+
+def max_bytes() -> int:
+    raw = os.environ.get(MAX_MB_ENV)
+    if raw:
+        try:
+            return max(int(raw), 1) * 1024 * 1024
+        except ValueError:
+            logger.warning("Ignoring invalid %s=%r", MAX_MB_ENV, raw)
+    return DEFAULT_MAX_MB * 1024 * 1024
+
+
+def _evict_locked(keep: Key) -> None:
+    """Drop least recently used snapshots until the total fits the budget; keep is never dropped."""
+    budget = max_bytes()
+    total = sum(snap.nbytes for snap in _snapshots.values())
+    for key in list(_snapshots):
+        if total <= budget:
+            break
+        if key == keep:
+            continue
+        evicted = _snapshots.pop(key)
+        total -= evicted.nbytes
+        metrics.inc(SNAPSHOT_EVICTIONS, source=key[0])
+        logger.info('Evicted %s snapshot for %s (v%s, %d bytes)', key[0], key[1], evicted.version, evicted.nbytes)
+    metrics.set_gauge(SNAPSHOT_BYTES, total)
+
+
+def add_listener(listener: Callable[[Snapshot, Snapshot | None], None]) -> None:
+    """Call listener(snapshot, previous) after every publish, outside the snapshot lock.
+
+    previous is the snapshot it replaced, or None on the first publish (or after eviction).
+    """
+    _listeners.append(listener)
+
+
+def is_fresh(snap: Snapshot | None, max_age: float | None = None) -> bool:
+    """Whether snap is younger than max_age, by default its own adaptive polling interval."""
+    if snap is None:
+        return False
+    return snap.age() < (snap.max_age if max_age is None else max_age)
+
+
+def epoch_ms_from_utc_csv(utc_bytes: bytes) -> 'np.ndarray':
+    """Parse the UTC timestamp CSV (fixed ISO format, '+00:00' offset) into sorted epoch milliseconds."""
+    import numpy as np
+
+    lines = utc_bytes.decode(ENCODING).splitlines()[1:]
+    values = [line[: -len(UTC_SUFFIX)] if line.endswith(UTC_SUFFIX) else line for line in lines if line]
+    epoch_ms = np.array(values, dtype='datetime64[ms]').astype(np.int64)
+    epoch_ms.sort()
+    return epoch_ms
+
+
+def parse_instant_ms(value: object, field: str) -> int:
+    """Parse an ISO 8601 timestamp into epoch milliseconds; naive values are taken as ET."""
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be an ISO 8601 timestamp string")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{field}' is not a valid ISO 8601 timestamp: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = ET_TZ.localize(parsed)
+    return int(parsed.timestamp() * 1000)
+
+
+def ids_path_for(clean_path: str) -> str:
+    """Where the snowflake ids behind a clean timestamp CSV are persisted."""
+    return f"{os.path.splitext(clean_path)[0]}_ids.npy"
+
+
+def save_ids(clean_path: str, ids: 'np.ndarray') -> None:
+    import numpy as np
+
+    np.save(ids_path_for(clean_path), np.asarray(ids, dtype=np.int64))
+
+
+def compute_stats(epoch_ms: 'np.ndarray') -> TweetStats:
+    if epoch_ms.size == 0:
+        return TweetStats(count=0, first_ms=None, last_ms=None)
+    return TweetStats(count=int(epoch_ms.size), first_ms=int(epoch_ms[0]), last_ms=int(epoch_ms[-1]))
+
+
+def _store(snap: Snapshot, version: int | None = None) -> Snapshot:
+    """Make snap the current snapshot of its (source, handle) under the next version, or under version if newer."""
+    key = (snap.source, snap.handle)
+    with _lock:
+        latest = _versions.get(key, 0)
+        version = version if version is not None and version > latest else latest + 1
+        _versions[key] = version
+        previous = _snapshots.get(key)
+        snap = dataclasses.replace(snap, version=version)
+        _snapshots[key] = snap
+        _snapshots.move_to_end(key)
+        _evict_locked(keep=key)
+    metrics.set_gauge(POLL_INTERVAL, snap.max_age, source=snap.source, handle=snap.handle)
+    for listener in _listeners:
+        try:
+            listener(snap, previous)
+        except Exception:
+            # Subscribers must never fail a refresh
+            logger.exception('Snapshot listener failed for %s/%s', snap.source, snap.handle)
+    return snap
+
+
+def publish(
+    source: str,
+    clean_bytes: bytes,
+    utc_bytes: bytes,
+    cc_bytes: bytes,
+    *,
+    fetched_at: float | None = None,
+    ids: 'np.ndarray | None' = None,
+    handle: str = DEFAULT_HANDLE,
+    validators: dict[str, str] | None = None,
+) -> Snapshot:
+    """Store a new snapshot for source and handle and bump its version.
+
+    Precomputes the epoch array, stats and weekly distributions, then evicts least
+    recently used snapshots of other sources/handles past the memory budget.
+    """
+    import numpy as np
+
+    from src import cadence, weekstats
+
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    if ids is not None:
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+    epoch_ms = epoch_ms_from_utc_csv(utc_bytes)
+    stats = compute_stats(epoch_ms)
+    with metrics.stage('week_stats', source=source):
+        week_stats = weekstats.compute(epoch_ms, as_of_ms=int(fetched_at * 1000))
+    return _store(Snapshot(
+        source=source,
+        version=0,
+        fetched_at=fetched_at,
+        clean_bytes=clean_bytes,
+        utc_bytes=utc_bytes,
+        cc_bytes=cc_bytes,
+        epoch_ms=epoch_ms,
+        stats=stats,
+        week_stats=week_stats,
+        ids=ids,
+        handle=handle,
+        max_age=cadence.poll_interval(epoch_ms, int(fetched_at * 1000)),
+        validators=dict(validators or {}),
+    ))
+
+
+def renew(snap: Snapshot, validators: dict[str, str] | None = None) -> Snapshot | None:
+    """Mark snap fresh again after a refresh found nothing new upstream, without publishing a new version.
+
+    Only the fetch time, polling interval and validators change. The derived data, the
+    version (and every cache keyed by it) and the checkpoint stay as they are, and no
+    listener is called, so live subscribers see no empty update. Returns None when snap
+    has to be republished instead: a noon ET boundary (the start of some anchor's market
+    week) passed since it was fetched, so its weekly distributions are out of date, or
+    it is no longer the latest version.
+    """
+    from src import cadence, tz
+
+    fetched_at = time.time()
+    noon_days = (tz.local_ms([int(snap.fetched_at * 1000), int(fetched_at * 1000)]) - 12 * tz.HOUR_MS) // tz.DAY_MS
+    if noon_days[0] != noon_days[1]:
+        return None
+    renewed = dataclasses.replace(
+        snap,
+        fetched_at=fetched_at,
+        max_age=cadence.poll_interval(snap.epoch_ms, int(fetched_at * 1000)),
+        validators=dict(snap.validators if validators is None else validators),
+    )
+    key = (snap.source, snap.handle)
+    with _lock:
+        if _versions.get(key) != snap.version:
+            return None
+        _snapshots[key] = renewed
+        _snapshots.move_to_end(key)
+        _evict_locked(keep=key)
+    metrics.set_gauge(POLL_INTERVAL, renewed.max_age, source=snap.source, handle=snap.handle)
+    return renewed
+
+
+def attach_ids(snap: Snapshot, ids: 'np.ndarray') -> Snapshot:
+    """snap with the snowflake ids it was restored without, stored in its place while it is the latest version.
+
+    The version stays the same: the ids only describe data the snapshot already holds.
+    """
+    import numpy as np
+
+    filled = dataclasses.replace(snap, ids=np.unique(np.asarray(ids, dtype=np.int64)))
+    key = (snap.source, snap.handle)
+    with _lock:
+        if _versions.get(key) == snap.version and key in _snapshots:
+            _snapshots[key] = filled
+            _evict_locked(keep=key)
+    return filled
+
+
+def refresh_lock(source: str, handle: str = DEFAULT_HANDLE) -> threading.Lock:
+    """Return the lock serializing refreshes (and their file writes) for source and handle.
+
+    Each handle has its own lock, so different handles refresh concurrently.
+    """
+    with _lock:
+        return _refresh_locks.setdefault((source, handle), threading.Lock())
+
+
+def load_from_files(
+    source: str,
+    clean_path: str,
+    utc_path: str,
+    cc_path: str,
+    handle: str = DEFAULT_HANDLE,
+) -> Snapshot | None:
+    """Publish a snapshot from previously persisted CSVs (and ids, when saved); fetched_at is the oldest file mtime."""
+    import numpy as np
+
+    paths = (clean_path, utc_path, cc_path)
+    if not all(storage.exists(p) for p in paths):
+        return None
+    contents = [storage.read_bytes(path) for path in paths]
+    fetched_at = min(storage.getmtime(p) for p in paths)
+    ids = None
+    ids_path = ids_path_for(clean_path)
+    # An ids file older than the CSVs belongs to an earlier refresh
+    if os.path.exists(ids_path) and os.path.getmtime(ids_path) >= fetched_at:
+        ids = np.load(ids_path)
+    snap = publish(source, *contents, fetched_at=fetched_at, ids=ids, handle=handle)
+    logger.info('Loaded %s snapshot for %s v%s from disk (age %.0fs)', source, handle, snap.version, snap.age())
+    return snap
+
+
+def conditional_headers(snap: Snapshot | None) -> dict[str, str]:
+    """Request headers asking the upstream to answer 304 when nothing changed since snap was fetched."""
+    if snap is None:
+        return {}
+    return {VALIDATOR_HEADERS[name]: value for name, value in snap.validators.items() if name in VALIDATOR_HEADERS}
+
+
+def validators_from(headers: Any) -> dict[str, str]:
+    return {name: headers[name] for name in VALIDATOR_HEADERS if headers.get(name)}
+
+
+def checkpoint_path_for(clean_path: str) -> str:
+    """Where the binary checkpoint of the snapshot behind a clean timestamp CSV is kept."""
+    return f"{os.path.splitext(clean_path)[0]}_snapshot.npz"
+
+
+def save_checkpoint(snap: Snapshot, clean_path: str) -> None:
+    """Write snap, its precomputed stats and upstream validators to its checkpoint (replaced atomically)."""
+    import numpy as np
+
+    meta = {
+        'format': CHECKPOINT_FORMAT,
+        'source': snap.source,
+        'handle': snap.handle,
+        'version': snap.version,
+        'fetched_at': snap.fetched_at,
+        'max_age': snap.max_age,
+        'stats': dataclasses.asdict(snap.stats),
+        'validators': snap.validators,
+        'week_summaries': [[anchor, window, summary] for (anchor, window), summary in snap.week_stats.summaries.items()],
+    }
+    arrays = {
+        'meta': np.frombuffer(json.dumps(meta).encode(ENCODING), dtype=np.uint8),
+        'clean': np.frombuffer(snap.clean_bytes, dtype=np.uint8),
+        'utc': np.frombuffer(snap.utc_bytes, dtype=np.uint8),
+        'cc': np.frombuffer(snap.cc_bytes, dtype=np.uint8),
+        'epoch_ms': snap.epoch_ms,
+    }
+    if snap.ids is not None:
+        arrays['ids'] = snap.ids
+    for weekly in snap.week_stats.weekly:
+        arrays[f'week_start_ms_{weekly.anchor}'] = weekly.start_ms
+        arrays[f'week_counts_{weekly.anchor}'] = weekly.counts
+    path = checkpoint_path_for(clean_path)
+    tmp_path = f"{path}.tmp"
+    with metrics.stage('checkpoint', source=snap.source) as st:
+        # Written uncompressed: restoring is a straight read of each array
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        st['bytes'] = os.path.getsize(path)
+
+
+def load_checkpoint(source: str, clean_path: str, handle: str = DEFAULT_HANDLE) -> Snapshot | None:
+    """Publish the snapshot checkpointed next to clean_path as it was, without re-deriving anything.
+
+    Its fetch time, polling interval and version are the recorded ones, so freshness is
+    judged exactly as before the restart. Returns None when there is no usable checkpoint.
+    """
+    import numpy as np
+
+    from src.weekstats import WeeklyCounts, WeekStats
+
+    path = checkpoint_path_for(clean_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode(ENCODING))
+            if meta.get('format') != CHECKPOINT_FORMAT or (meta['source'], meta['handle']) != (source, handle):
+                logger.info('Ignoring snapshot checkpoint %s (format %s)', path, meta.get('format'))
+                return None
+            weekly = tuple(
+                WeeklyCounts(anchor, data[f'week_start_ms_{anchor}'], data[f'week_counts_{anchor}'])
+                for anchor in range(7)
+            )
+            snap = Snapshot(
+                source=source,
+                version=0,
+                fetched_at=float(meta['fetched_at']),
+                clean_bytes=data['clean'].tobytes(),
+                utc_bytes=data['utc'].tobytes(),
+                cc_bytes=data['cc'].tobytes(),
+                epoch_ms=data['epoch_ms'],
+                stats=TweetStats(**meta['stats']),
+                week_stats=WeekStats(weekly, {(a, w): summary for a, w, summary in meta['week_summaries']}),
+                ids=data['ids'] if 'ids' in data.files else None,
+                handle=handle,
+                max_age=float(meta['max_age']),
+                validators=meta['validators'],
+            )
+    except (OSError, ValueError, KeyError, TypeError, zipfile.BadZipFile) as exc:
+        logger.warning('Ignoring unreadable snapshot checkpoint %s: %s', path, exc)
+        return None
+    snap = _store(snap, version=int(meta['version']))
+    logger.info('Restored %s snapshot for %s v%s from checkpoint (age %.0fs)', source, handle, snap.version, snap.age())
+    return snap
+
+
+metrics.describe(SNAPSHOT_BYTES, "gauge", "Memory held by in-memory snapshots across all handles.")
+metrics.describe(SNAPSHOT_EVICTIONS, "counter", "Snapshots evicted to stay within XT_SNAPSHOT_MAX_MB.")
@@ -0,0 +1,226 @@
+"""Optional compressed storage of the CSV artifacts under downloads/ and historic/.
+
+With XT_STORAGE_COMPRESSION=gzip (or zstd) every writer stores `<name>.csv.gz` (or
+`.csv.zst`) in place of `<name>.csv`. Callers keep using the plain path: readers find
+whichever variant exists and decompress it by its extension, so a tree written in
+one mode stays readable after switching to another. Appends add a compressed member
+(gzip) or frame (zstd), which both formats read back as one stream.
+
+zstd uses the standard library on Python 3.14+ and the optional zstandard package
+before that.
+"""
+import gzip
+import io
+import logging
+import os
+import threading
+import zlib
+from typing import IO, Callable
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_ENV = 'XT_STORAGE_COMPRESSION'
+# codec -> file extension; the codec names double as HTTP content-codings
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+CODECS = {ext: codec for codec, ext in EXTENSIONS.items()}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def compression() -> str | None:
+    """Configured codec for new files, or None to store plain text."""
+    raw = os.environ.get(COMPRESSION_ENV, '').strip().lower()
+    if not raw or raw in {'0', 'none', 'off'}:
+        return None
+    if raw in {'gz', 'zst'}:
+        raw = CODECS['.' + raw]
+    if raw not in EXTENSIONS:
+        logger.warning("Ignoring invalid %s=%r", COMPRESSION_ENV, raw)
+        return None
+    return raw
+
+
+def codec_of(path: str) -> str | None:
+    return CODECS.get(os.path.splitext(path)[1])
+
+
+def _plain(path: str) -> str:
+    return path[: -len(EXTENSIONS[codec_of(path)])] if codec_of(path) else path
+
+
+def stored_path(path: str) -> str:
+    """File name a write of path goes to under the configured codec."""
+    plain = _plain(path)
+    codec = compression()
+    return plain + EXTENSIONS[codec] if codec else plain
+
+
+def _variants(path: str) -> list[str]:
+    plain = _plain(path)
+    return [plain] + [plain + ext for ext in EXTENSIONS.values()]
+
+
+def locate(path: str) -> str | None:
+    """The stored file behind path: the configured variant if present, else the newest existing one."""
+    preferred = stored_path(path)
+    if os.path.exists(preferred):
+        return preferred
+    existing = [p for p in _variants(path) if os.path.exists(p)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+
+def exists(path: str) -> bool:
+    return locate(path) is not None
+
+
+def getmtime(path: str) -> float:
+    located = locate(path)
+    if located is None:
+        raise FileNotFoundError(path)
+    return os.path.getmtime(located)
+
+
+def _zstd() -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    try:
+        from compression import zstd  # Python 3.14+
+
+        return (lambda data: zstd.compress(data, level=ZSTD_LEVEL)), zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd storage needs Python 3.14+ or the zstandard package (pip install 'xt[zstd]')")
+
+    def decompress(data: bytes) -> bytes:
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        return reader.read()
+
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress, decompress
+
+
+def compress(data: bytes, codec: str | None) -> bytes:
+    if codec is None:
+        return data
+    if codec == 'gzip':
+        # mtime=0 keeps the output a pure function of the data
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return _zstd()[0](data)
+
+
+def decompress(data: bytes, codec: str | None) -> bytes:
+    if codec is None:
+        return data
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    return _zstd()[1](data)
+
+
+def _remove_other_variants(path: str, keep: str) -> None:
+    for other in _variants(path):
+        if other != keep:
+            try:
+                os.remove(other)
+            except FileNotFoundError:
+                pass
+
+
+def write_bytes(path: str, data: bytes) -> str:
+    """Store data under path (compressed per the configured codec) atomically; return the file written.
+
+    Variants of the same file in another codec are removed so readers never see stale data.
+    """
+    target = stored_path(path)
+    # Per-thread temporary name: concurrent requests may rewrite the same output file
+    tmp_path = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(compress(data, codec_of(target)))
+    os.replace(tmp_path, target)
+    _remove_other_variants(path, target)
+    return target
+
+
+def append_bytes(path: str, data: bytes) -> str:
+    """Append data to the stored file behind path (in that file's codec), creating it if missing."""
+    target = locate(path) or stored_path(path)
+    with open(target, 'ab') as f:
+        f.write(compress(data, codec_of(target)))
+    return target
+
+
+def _read_located(located: str) -> bytes:
+    with open(located, 'rb') as f:
+        return decompress(f.read(), codec_of(located))
+
+
+def read_bytes(path: str) -> bytes:
+    located = locate(path)
+    if located is None:
+        raise FileNotFoundError(path)
+    return _read_located(located)
+
+
+def open_binary(path: str) -> IO[bytes]:
+    """Readable decompressed stream of the stored file behind path (for parsers such as pandas.read_csv)."""
+    located = locate(path)
+    if located is None:
+        raise FileNotFoundError(path)
+    codec = codec_of(located)
+    if codec == 'gzip':
+        return gzip.open(located, 'rb')
+    if codec == 'zstd':
+        return io.BytesIO(_read_located(located))
+    return open(located, 'rb')
+
+
+def accepts(accept_encoding: str | None, codec: str) -> bool:
+    """Whether an Accept-Encoding header allows the given content-coding.
+
+    A listed coding (x-gzip counting as gzip) decides by its own q-value; `*` only
+    covers codings the header does not name, so `gzip;q=0, *` refuses gzip (RFC 9110).
+    """
+    names = {codec, 'x-gzip'} if codec == 'gzip' else {codec}
+    exact = wildcard = None
+    for part in (accept_encoding or '').split(','):
+        token, *params = [p.strip() for p in part.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        token = token.lower()
+        if token in names:
+            exact = q if exact is None else max(exact, q)
+        elif token == '*':
+            wildcard = q if wildcard is None else max(wildcard, q)
+    q = exact if exact is not None else wildcard
+    return q is not None and q > 0
+
+
+def _matches(stored: bytes, codec: str, data: bytes) -> bool:
+    if codec == 'gzip':
+        # The trailer holds the CRC32 and length of the uncompressed data (single-member files)
+        return len(stored) >= 18 and stored[-8:] == (
+            zlib.crc32(data).to_bytes(4, 'little') + (len(data) & 0xFFFFFFFF).to_bytes(4, 'little')
+        )
+    return decompress(stored, codec) == data
+
+
+def precompressed(path: str, data: bytes, accept_encoding: str | None) -> tuple[bytes, str] | None:
+    """(stored bytes, content-coding) of path when it is kept compressed, holds exactly data and the client
+    accepts its coding, so it can be sent as is; None otherwise."""
+    located = locate(path)
+    codec = codec_of(located) if located is not None else None
+    if codec is None or not accepts(accept_encoding, codec):
+        return None
+    try:
+        with open(located, 'rb') as f:
+            stored = f.read()
+        if _matches(stored, codec, data):
+            return stored, codec
+    except (OSError, RuntimeError, EOFError, zlib.error):
+        logger.debug('Not serving %s precompressed', located, exc_info=True)
+    return None
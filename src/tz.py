@@ -0,0 +1,158 @@
+"""America/New_York wall-clock math on epoch-millisecond arrays, from a precomputed DST transition table.
+
+The table holds every UTC offset change of the zone from 1970 through HORIZON_YEAR,
+generated from the standard library's zoneinfo (the IANA rules, which keep scheduling
+DST after 2037 just as pandas does). Instants before 1970 take the 1970 offset, and
+instants after the horizon stay on the zone's last offset. Converting an array is then a
+binary search per element plus integer additions, with no tz-aware pandas index in
+between, and the results match pandas on DST days.
+
+numpy loads on first use so importing this module (and the shared zone) stays cheap.
+"""
+import functools
+import zoneinfo
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, NamedTuple
+
+import pytz
+
+if TYPE_CHECKING:
+    import numpy as np
+
+ET_TZ = pytz.timezone('America/New_York')
+_ZONE = zoneinfo.ZoneInfo('America/New_York')
+# Last year whose DST transitions are in the table
+HORIZON_YEAR = 2100
+MINUTE_MS = 60_000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+QUARTER_MS = 15 * MINUTE_MS
+# 1970-01-01 was a Thursday; with Monday=0 the weekday of local day number d is (d + 3) % 7
+EPOCH_WEEKDAY = 3
+# Indexed by weekday (Monday=0)
+WEEKDAY_LABELS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class _Table(NamedTuple):
+    # Instant (epoch ms) each offset takes effect; the first entry stands for "since forever"
+    starts_ms: 'np.ndarray'
+    offsets_ms: 'np.ndarray'
+    # Wall-clock time each offset starts at, by that offset (ascending, like starts_ms)
+    wall_starts_ms: 'np.ndarray'
+
+
+def _offset_s(epoch_s: int) -> int:
+    return int(datetime.fromtimestamp(epoch_s, tz=_ZONE).utcoffset().total_seconds())
+
+
+def _transitions() -> list[tuple[int, int]]:
+    """(epoch second, new UTC offset in seconds) of each offset change from 1970 through HORIZON_YEAR."""
+    day_s = DAY_MS // 1000
+    end_s = int(datetime(HORIZON_YEAR + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    found = []
+    previous = _offset_s(0)
+    # Offsets change at most once a day: find the day, then bisect it to the second
+    for day_end in range(day_s, end_s + day_s, day_s):
+        offset = _offset_s(day_end)
+        if offset == previous:
+            continue
+        lo, hi = day_end - day_s, day_end
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if _offset_s(mid) == previous:
+                lo = mid
+            else:
+                hi = mid
+        found.append((hi, offset))
+        previous = offset
+    return found
+
+
+@functools.lru_cache(maxsize=None)
+def _table() -> _Table:
+    import numpy as np
+
+    transitions = _transitions()
+    # The first entry stands for "since forever" with the offset in effect at the epoch
+    starts = [np.iinfo(np.int64).min // 2] + [epoch_s * 1000 for epoch_s, _ in transitions]
+    offsets = [_offset_s(0) * 1000] + [offset * 1000 for _, offset in transitions]
+    starts_ms = np.array(starts, dtype=np.int64)
+    offsets_ms = np.array(offsets, dtype=np.int64)
+    return _Table(starts_ms, offsets_ms, starts_ms + offsets_ms)
+
+
+def utc_offset_ms(epoch_ms: 'np.ndarray') -> 'np.ndarray':
+    """UTC offset of ET (milliseconds, negative) in effect at each instant."""
+    import numpy as np
+
+    table = _table()
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    return table.offsets_ms[np.searchsorted(table.starts_ms, epoch_ms, side='right') - 1]
+
+
+def local_ms(epoch_ms: 'np.ndarray') -> 'np.ndarray':
+    """ET wall-clock time of each instant, expressed as milliseconds since 1970-01-01 local."""
+    import numpy as np
+
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    return epoch_ms + utc_offset_ms(epoch_ms)
+
+
+def localize_ms(wall_ms: 'np.ndarray') -> 'np.ndarray':
+    """Inverse of local_ms for bucket boundaries; wall times skipped by DST move forward to the transition.
+
+    Wall times that occur twice (the repeated hour when DST ends) raise ValueError.
+    """
+    import numpy as np
+
+    table = _table()
+    wall_ms = np.asarray(wall_ms, dtype=np.int64)
+    period = np.searchsorted(table.wall_starts_ms, wall_ms, side='right') - 1
+    epoch_ms = wall_ms - table.offsets_ms[period]
+    # The period before a fall-back transition also covers the first wall times after it
+    prev = np.maximum(period - 1, 0)
+    ambiguous = (period > 0) & (epoch_ms - (table.offsets_ms[prev] - table.offsets_ms[period]) < table.starts_ms[period])
+    if ambiguous.any():
+        first = int(wall_ms[ambiguous][0])
+        raise ValueError(f"wall time {first} ms occurs twice in America/New_York")
+    # Past the end of its period by its own offset: the wall time was skipped, so use the transition
+    nxt = np.minimum(period + 1, table.starts_ms.size - 1)
+    skipped = (period + 1 < table.starts_ms.size) & (epoch_ms >= table.starts_ms[nxt])
+    return np.where(skipped, table.starts_ms[nxt], epoch_ms)
+
+
+def hour_of_day(epoch_ms: 'np.ndarray') -> 'np.ndarray':
+    return (local_ms(epoch_ms) // HOUR_MS) % 24
+
+
+def weekday(epoch_ms: 'np.ndarray') -> 'np.ndarray':
+    """ET weekday of each instant (Monday=0)."""
+    return (local_ms(epoch_ms) // DAY_MS + EPOCH_WEEKDAY) % 7
+
+
+def day_number(epoch_ms: 'np.ndarray') -> 'np.ndarray':
+    """ET local day number (days since 1970-01-01) of each instant."""
+    return local_ms(epoch_ms) // DAY_MS
+
+
+def quarter_hour(epoch_ms: 'np.ndarray') -> 'np.ndarray':
+    """Position of each instant's ET quarter-hour within its day (0..95)."""
+    return (local_ms(epoch_ms) // QUARTER_MS) % 96
+
+
+def iso_ms(epoch_ms: 'np.ndarray', *, utc: bool = False) -> 'np.ndarray':
+    """ISO 8601 strings to the millisecond with their offset, like datetime.isoformat(timespec='milliseconds')."""
+    import numpy as np
+
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    offsets = np.zeros_like(epoch_ms) if utc else utc_offset_ms(epoch_ms)
+    text = np.datetime_as_string((epoch_ms + offsets).astype('datetime64[ms]'), unit='ms')
+    unique, inverse = np.unique(offsets, return_inverse=True)
+    suffixes = np.array([offset_suffix(int(o)) for o in unique], dtype='<U6')
+    return np.char.add(text, suffixes[inverse])
+
+
+def offset_suffix(offset_ms: int) -> str:
+    sign = '+' if offset_ms >= 0 else '-'
+    minutes = abs(int(offset_ms)) // MINUTE_MS
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
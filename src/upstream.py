@@ -0,0 +1,294 @@
+"""Upstream health: a circuit breaker per API and deadline-bounded refreshes backed by the last good snapshot.
+
+Each breaker remembers the outcome of the last WINDOW calls to its upstream. Once at
+least MIN_CALLS were made and FAILURE_RATE of them failed, it opens and rejects
+calls immediately for XT_BREAKER_COOLDOWN_SECONDS (default 30); the first call after
+that is a trial that closes it again or reopens it. Only transport errors, timeouts,
+5xx/429 answers and malformed payloads count against the upstream: a 404 for an
+unknown handle is still an UpstreamError, but says nothing about the API's health.
+
+When a source already has a snapshot, its refresh runs on a worker thread and a
+request waits for it at most XT_REQUEST_DEADLINE_SECONDS (default 5). Past the
+deadline, or when the upstream fails, the request is answered from the last good
+snapshot and StaleHeadersMiddleware adds X-Snapshot-Stale (age in seconds) and
+X-Snapshot-Stale-Reason to the response.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+from urllib.parse import urlsplit
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts for upstream HTTP calls, in seconds
+TIMEOUT = (5.0, 30.0)
+WINDOW = 20
+MIN_CALLS = 4
+FAILURE_RATE = 0.5
+COOLDOWN_ENV = 'XT_BREAKER_COOLDOWN_SECONDS'
+DEFAULT_COOLDOWN_SECONDS = 30.0
+DEADLINE_ENV = 'XT_REQUEST_DEADLINE_SECONDS'
+DEFAULT_DEADLINE_SECONDS = 5.0
+REFRESH_WORKERS = 4
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = 'xt_upstream_circuit_state'
+FAILURES = 'xt_upstream_failures_total'
+STALE_RESPONSES = 'xt_stale_responses_total'
+STALE_HEADER = 'X-Snapshot-Stale'
+STALE_REASON_HEADER = 'X-Snapshot-Stale-Reason'
+
+
+class UpstreamError(RuntimeError):
+    """A fetch from an upstream API failed (as opposed to succeeding with nothing new)."""
+
+    def __init__(self, upstream: str, message: str) -> None:
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class CircuitOpenError(UpstreamError):
+    """The upstream's breaker is open, so the call was not attempted."""
+
+
+def _env_seconds(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    if raw:
+        try:
+            value = float(raw)
+            if value >= 0:
+                return value
+        except ValueError:
+            pass
+        logger.warning("Ignoring invalid %s=%r", name, raw)
+    return default
+
+
+def cooldown() -> float:
+    return _env_seconds(COOLDOWN_ENV, DEFAULT_COOLDOWN_SECONDS)
+
+
+def deadline() -> float:
+    """Seconds a request waits for a refresh before it is served from a stale snapshot (0 waits for good)."""
+    return _env_seconds(DEADLINE_ENV, DEFAULT_DEADLINE_SECONDS)
+
+
+def with_origin(url: str, env: str) -> str:
+    """url with its scheme and host taken from $env when set (e.g. a local stand-in upstream)."""
+    raw = os.environ.get(env, '').strip()
+    if not raw:
+        return url
+    origin = urlsplit(raw)
+    if not origin.scheme or not origin.netloc:
+        logger.warning("Ignoring invalid %s=%r", env, raw)
+        return url
+    return urlsplit(url)._replace(scheme=origin.scheme, netloc=origin.netloc).geturl()
+
+
+def _degraded(exc: BaseException) -> bool:
+    """Whether a failed call says the upstream itself is unhealthy."""
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status is None or status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes: deque[bool] = deque(maxlen=WINDOW)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set(self, state: str) -> None:
+        if state != self._state:
+            logger.warning('Circuit for %s is now %s', self.name, state)
+        self._state = state
+        metrics.set_gauge(CIRCUIT_STATE, _STATE_VALUES[state], upstream=self.name)
+
+    def _open(self) -> None:
+        self._opened_at = time.time()
+        self._trial_running = False
+        self._set(OPEN)
+
+    def before(self) -> None:
+        """Raise CircuitOpenError while the breaker is open; after the cooldown let one trial call through."""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + cooldown() - time.time()
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, f"circuit open, retrying in {remaining:.0f}s")
+                self._set(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError(self.name, "circuit half-open, trial call in progress")
+                self._trial_running = True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if not ok:
+                metrics.inc(FAILURES, upstream=self.name)
+            if self._state == HALF_OPEN:
+                self._trial_running = False
+                self._outcomes.clear()
+                if ok:
+                    self._set(CLOSED)
+                else:
+                    self._open()
+                return
+            self._outcomes.append(ok)
+            calls = len(self._outcomes)
+            if self._state == CLOSED and calls >= MIN_CALLS and self._outcomes.count(False) / calls >= FAILURE_RATE:
+                self._open()
+
+    def abandon(self) -> None:
+        """Forget a call that ended without an outcome; a pending half-open trial is left to the next call."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_running = False
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run one upstream call; any exception is recorded and re-raised as an UpstreamError.
+
+        A call interrupted by a BaseException (task cancellation, shutdown) says nothing about
+        the upstream: it is abandoned instead of recorded, and the exception propagates as is.
+        """
+        self.before()
+        try:
+            yield
+        except Exception as exc:
+            self.record(not _degraded(exc) and not isinstance(exc, UpstreamError))
+            if isinstance(exc, UpstreamError):
+                raise
+            raise UpstreamError(self.name, str(exc) or type(exc).__name__) from exc
+        except BaseException:
+            self.abandon()
+            raise
+        self.record(True)
+
+
+_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+_inflight: dict[tuple[str, str], Future] = {}
+_pool: ThreadPoolExecutor | None = None
+# Per-request notes (shared with the handler's worker thread) read by StaleHeadersMiddleware
+_notes: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar('xt_upstream_notes', default=None)
+
+
+def breaker(name: str) -> CircuitBreaker:
+    with _lock:
+        found = _breakers.get(name)
+        if found is None:
+            found = _breakers[name] = CircuitBreaker(name)
+        return found
+
+
+def serve_stale(snap: Any, reason: str) -> Any:
+    """Answer the current request from snap, flagging the response as stale."""
+    metrics.inc(STALE_RESPONSES, source=snap.source, reason=reason)
+    notes = _notes.get()
+    if notes is not None:
+        # A request touching several sources reports its oldest data
+        age = max(snap.age(), notes.get('stale', (0.0, ''))[0])
+        notes['stale'] = (age, reason)
+    return snap
+
+
+def serve_after_failure(snap: Any, exc: UpstreamError) -> Any:
+    """Fall back to snap after its refresh failed upstream."""
+    logger.warning('Refreshing %s/%s failed, serving the last snapshot: %s', snap.source, snap.handle, exc)
+    return serve_stale(snap, 'circuit_open' if isinstance(exc, CircuitOpenError) else 'upstream_error')
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='xt-refresh')
+        return _pool
+
+
+def refresh_within_deadline(snap: Any, refresh: Callable[[], Any]) -> Any:
+    """Run refresh (one at a time per source and handle) and wait until the deadline; then fall back to snap."""
+    limit = deadline()
+    if limit <= 0:
+        return refresh()
+    key = (snap.source, snap.handle)
+    pool = _executor()
+    with _lock:
+        future = _inflight.get(key)
+        started = future is None
+        if started:
+            # The worker keeps the request's context (bound source, handle and response notes)
+            future = _inflight[key] = pool.submit(contextvars.copy_context().run, refresh)
+    if started:
+        future.add_done_callback(lambda done: _forget(key, done))
+    try:
+        return future.result(timeout=limit)
+    except FutureTimeout:
+        logger.warning('Refresh of %s/%s exceeded %.1fs; serving the last snapshot', snap.source, snap.handle, limit)
+        return serve_stale(snap, 'deadline')
+
+
+def _forget(key: tuple[str, str], future: Future) -> None:
+    with _lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def shutdown() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class StaleHeadersMiddleware:
+    """ASGI middleware adding the staleness headers to responses served from an outdated snapshot."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        notes: dict[str, Any] = {}
+        token = _notes.set(notes)
+
+        async def send_wrapper(message: dict) -> None:
+            if message.get("type") == "http.response.start" and 'stale' in notes:
+                age, reason = notes['stale']
+                headers = list(message.get("headers", []))
+                headers.append((STALE_HEADER.lower().encode(), f"{age:.0f}".encode()))
+                headers.append((STALE_REASON_HEADER.lower().encode(), reason.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _notes.reset(token)
+
+
+metrics.describe(CIRCUIT_STATE, "gauge", "Upstream circuit breaker state (0 closed, 1 half-open, 2 open).")
+metrics.describe(FAILURES, "counter", "Failed upstream calls (transport errors, timeouts, 5xx/429, bad payloads).")
+metrics.describe(STALE_RESPONSES, "counter", "Requests answered from a stale snapshot, by reason.")
@@ -0,0 +1,133 @@
+"""Distribution of anchored weekly counts, precomputed once per snapshot for all seven anchors."""
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from src import buckets
+from src.tz import WEEKDAY_LABELS
+
+TRAILING_WEEKS = (4, 12, 26, 52)
+QUANTILES = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95)
+BRACKET_WIDTH = 20
+ALL = 'all'
+
+
+@dataclass(frozen=True)
+class WeeklyCounts:
+    """Counts of every complete anchored week (empty weeks included), oldest first."""
+    anchor: int
+    start_ms: np.ndarray
+    counts: np.ndarray
+
+    def trailing(self, weeks: int | None) -> np.ndarray:
+        return self.counts if weeks is None else self.counts[-weeks:]
+
+
+@dataclass(frozen=True)
+class WeekStats:
+    weekly: tuple[WeeklyCounts, ...]
+    summaries: dict[tuple[int, str], dict[str, Any]]
+
+
+def weekly_counts(epoch_ms: np.ndarray, as_of_ms: int) -> tuple[WeeklyCounts, ...]:
+    """Per-anchor counts of complete weeks: the first partial week and the week containing as_of_ms are left out."""
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    local = buckets.local_ms(epoch_ms)
+    as_of_local = buckets.local_ms(np.array([as_of_ms], dtype=np.int64))
+    out = []
+    for anchor in range(7):
+        idx = buckets.anchored_week_from_local(local, anchor)
+        current = int(buckets.anchored_week_from_local(as_of_local, anchor)[0])
+        if idx.size == 0:
+            out.append(WeeklyCounts(anchor, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)))
+            continue
+        first = int(idx.min())
+        first_start = buckets.bucket_starts([first], 'anchored_week', anchor_weekday=anchor)[0]
+        if epoch_ms.min() > first_start:
+            first += 1
+        keys = np.arange(first, current, dtype=np.int64)
+        kept = idx[(idx >= first) & (idx < current)]
+        counts = np.bincount(kept - first, minlength=keys.size).astype(np.int64)[: keys.size]
+        starts = buckets.bucket_starts(keys, 'anchored_week', anchor_weekday=anchor)
+        out.append(WeeklyCounts(anchor, starts, counts))
+    return tuple(out)
+
+
+def brackets(counts: np.ndarray, width: int = BRACKET_WIDTH) -> list[dict[str, Any]]:
+    if not 1 <= width <= 1000:
+        raise ValueError("bracket width must be between 1 and 1000")
+    if counts.size == 0:
+        return []
+    lower, freq = np.unique((counts // width) * width, return_counts=True)
+    return [
+        {'lower': int(lo), 'upper': int(lo) + width - 1, 'weeks': int(f), 'frequency': float(f) / counts.size}
+        for lo, f in zip(lower, freq)
+    ]
+
+
+def summarize(weekly: WeeklyCounts, weeks: int | None, width: int = BRACKET_WIDTH) -> dict[str, Any]:
+    counts = weekly.trailing(weeks)
+    starts = weekly.start_ms[-counts.size:] if counts.size else weekly.start_ms[:0]
+    summary: dict[str, Any] = {
+        'anchor': weekly.anchor,
+        'weekday': WEEKDAY_LABELS[weekly.anchor],
+        'window': ALL if weeks is None else weeks,
+        'weeks': int(counts.size),
+        'first_week_start_et': str(buckets.iso_labels(starts[:1])[0]) if counts.size else None,
+        'last_week_start_et': str(buckets.iso_labels(starts[-1:])[0]) if counts.size else None,
+    }
+    if counts.size == 0:
+        return summary | {'mean': None, 'stdev': None, 'min': None, 'max': None, 'quantiles': {}, 'brackets': []}
+    return summary | {
+        'mean': float(counts.mean()),
+        'stdev': float(counts.std(ddof=1)) if counts.size > 1 else 0.0,
+        'min': int(counts.min()),
+        'max': int(counts.max()),
+        'quantiles': {
+            f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, np.quantile(counts, QUANTILES))
+        },
+        'brackets': brackets(counts, width),
+    }
+
+
+def compute(epoch_ms: np.ndarray, as_of_ms: int) -> WeekStats:
+    """Weekly counts and default summaries (full history plus each TRAILING_WEEKS window) for every anchor."""
+    weekly = weekly_counts(epoch_ms, as_of_ms)
+    summaries = {}
+    for wc in weekly:
+        summaries[(wc.anchor, ALL)] = summarize(wc, None)
+        for n in TRAILING_WEEKS:
+            summaries[(wc.anchor, str(n))] = summarize(wc, n)
+    return WeekStats(weekly, summaries)
+
+
+def select(
+    stats: WeekStats,
+    anchor: int | None = None,
+    window: str | None = None,
+    width: int = BRACKET_WIDTH,
+) -> list[dict[str, Any]]:
+    """Return precomputed summaries filtered by anchor and window ('all' or a trailing week count).
+
+    Custom bracket widths or trailing windows are derived from the stored weekly counts,
+    never from raw timestamps.
+    """
+    anchors = range(7) if anchor is None else [anchor]
+    if anchor is not None and anchor not in range(7):
+        raise ValueError("anchor must be in range 0..6 (0=Mon .. 6=Sun).")
+    if window is None:
+        windows = [ALL] + [str(n) for n in TRAILING_WEEKS]
+    elif window == ALL or (window.isdigit() and int(window) > 0):
+        windows = [window]
+    else:
+        raise ValueError("window must be 'all' or a positive number of trailing weeks")
+    out = []
+    for a in anchors:
+        for w in windows:
+            cached = stats.summaries.get((a, w))
+            if cached is not None and width == BRACKET_WIDTH:
+                out.append(cached)
+            else:
+                out.append(summarize(stats.weekly[a], None if w == ALL else int(w), width))
+    return out
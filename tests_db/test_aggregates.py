@@ -0,0 +1,129 @@
+"""Pin the CSV bytes of the process_by_* aggregates on a fixture spanning both 2025 DST transitions.
+
+The expected files under tests_db/golden/ were written by the pandas implementation
+these aggregates replaced; the bucketing engine must keep reproducing them exactly.
+Run with --regenerate only when an output change is intended.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src import sanitize
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+# Every aggregate that counts through "today" sees this instant as now
+FROZEN_NOW = pd.Timestamp("2025-11-20T15:00:00", tz="UTC")
+ZONE = "America/New_York"
+
+
+def _fixture_bytes() -> bytes:
+    """Clean ET timestamp CSV: dense tweets around both transitions, a sparse trail between them."""
+    instants = []
+    for transition in ("2025-03-09T07:00:00Z", "2025-11-02T06:00:00Z"):
+        instants += list(pd.date_range(end=transition, periods=50, freq="7min")[:-1])
+        instants += list(pd.date_range(start=transition, periods=50, freq="7min"))
+    instants += list(pd.date_range("2025-03-01T17:13:00Z", "2025-11-15T17:13:00Z", freq="3D"))
+    # Either side of the Tuesday noon ET anchor
+    instants += [pd.Timestamp("2025-06-10T15:59:59.999Z"), pd.Timestamp("2025-06-10T16:00:00Z")]
+    series = pd.Series(sorted(instants)).dt.tz_convert(ZONE)
+    frame = pd.DataFrame({"timestamp": series.map(lambda ts: ts.isoformat(timespec="milliseconds"))})
+    return frame.to_csv(index=False, lineterminator="\n").encode("utf-8")
+
+
+@contextmanager
+def _frozen_now():
+    original = pd.Timestamp.now
+    pd.Timestamp.now = classmethod(
+        lambda cls, tz=None: FROZEN_NOW.tz_convert(tz) if tz is not None else FROZEN_NOW.tz_localize(None)
+    )
+    try:
+        yield
+    finally:
+        pd.Timestamp.now = original
+
+
+def _outputs(directory: str) -> dict[str, bytes]:
+    """Golden name -> CSV bytes (LF line endings) of every pinned aggregate."""
+    data = _fixture_bytes()
+
+    def prefix(name: str) -> str:
+        return os.path.join(directory, name)
+
+    with _frozen_now():
+        outputs = {
+            "by_hour": sanitize.process_by_hour(data, prefix("by_hour")),
+            "by_date": sanitize.process_by_date(data, prefix("by_date")),
+            "by_weekday": sanitize.process_by_weekday(data, prefix("by_weekday")),
+            "by_week_tue": sanitize.process_by_week(data, prefix("by_week"), anchor_weekday=1),
+            "by_week_tue_utc": sanitize.process_by_week(data, prefix("by_week"), anchor_weekday=1, use_utc=True),
+            "by_15min": sanitize.process_by_15min(
+                data, *(prefix(f"by_15min{part}") for part in (
+                    "", "_recent", "_last_tue", "_last_fri", "_utc", "_recent_utc", "_last_tue_utc", "_last_fri_utc",
+                )),
+            ),
+        }
+    with open(prefix("by_15min_utc.csv"), "rb") as f:
+        outputs["by_15min_utc"] = f.read()
+    return {name: csv_bytes.replace(b"\r\n", b"\n") for name, csv_bytes in outputs.items()}
+
+
+def _golden(name: str) -> bytes:
+    with open(os.path.join(GOLDEN_DIR, f"{name}.csv"), "rb") as f:
+        # A checkout may have converted the golden files to CRLF
+        return f.read().replace(b"\r\n", b"\n")
+
+
+def test_aggregates_match_golden():
+    """Each aggregate reproduces its pinned bytes, DST days included."""
+    print("Testing aggregates against the pinned CSVs...")
+    # Compressed storage would change how the 15-minute UTC file is read back
+    compression = os.environ.pop("XT_STORAGE_COMPRESSION", None)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = _outputs(directory)
+    finally:
+        if compression is not None:
+            os.environ["XT_STORAGE_COMPRESSION"] = compression
+    for name, csv_bytes in outputs.items():
+        assert csv_bytes == _golden(name), name
+        rows = len(csv_bytes.splitlines()) - 1
+        print(f"✓ {name}: {rows} rows match")
+
+
+def regenerate() -> None:
+    """Rewrite the golden files from the current implementation."""
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory() as directory:
+        for name, csv_bytes in _outputs(directory).items():
+            with open(os.path.join(GOLDEN_DIR, f"{name}.csv"), "wb") as f:
+                f.write(csv_bytes)
+            print(f"Wrote {name}.csv")
+
+
+def main_test():
+    """Run all tests."""
+    print("=" * 60)
+    print("AGGREGATE OUTPUT TEST SUITE")
+    print("=" * 60)
+
+    try:
+        test_aggregates_match_golden()
+        passed = True
+    except AssertionError as e:
+        print(f"✗ {e} differs from its golden file")
+        passed = False
+
+    print("\n" + "=" * 60)
+    print(f"{'Pinned Aggregates':.<40} {'✓ PASS' if passed else '✗ FAIL'}")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    if "--regenerate" in sys.argv:
+        regenerate()
+    else:
+        sys.exit(main_test())
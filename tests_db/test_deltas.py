@@ -0,0 +1,102 @@
+"""Check that applying a `since` delta to an earlier response matches recomputing the aggregate in full."""
+import sys
+
+import numpy as np
+
+from src import deltas, snapshot, tz
+from src.dataset import TWITTER_EPOCH_MS
+
+HANDLE = 'delta_check'
+NOW_MS = 1_760_800_000_000
+# A timestamp cursor before the first tweet asks for every bucket
+SINCE_START = '2025-06-01T00:00:00'
+
+
+def _ids(epoch_ms: np.ndarray, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return ((epoch_ms - TWITTER_EPOCH_MS) << 22) | rng.integers(0, 1 << 22, epoch_ms.size)
+
+
+def _publish(ids: np.ndarray, fetched_ms: int) -> snapshot.Snapshot:
+    epoch_ms = np.sort((ids >> 22) + TWITTER_EPOCH_MS)
+    utc_bytes = '\n'.join(['timestamp', *tz.iso_ms(epoch_ms, utc=True).tolist()]).encode() + b'\n'
+    return snapshot.publish('xtracker', b'', utc_bytes, b'', ids=ids, handle=HANDLE, fetched_at=fetched_ms / 1000)
+
+
+def _two_versions() -> tuple[snapshot.Snapshot, snapshot.Snapshot]:
+    """A snapshot and its successor, which adds recent and late tweets and drops a few old ones."""
+    rng = np.random.default_rng(43)
+    start = NOW_MS - 90 * tz.DAY_MS
+    first = _ids(np.sort(rng.integers(start, NOW_MS - 2 * tz.DAY_MS, 4000)), seed=1)
+    recent = _ids(rng.integers(NOW_MS - 2 * tz.DAY_MS, NOW_MS, 60), seed=2)
+    late = _ids(rng.integers(start, NOW_MS - 2 * tz.DAY_MS, 15), seed=3)
+    kept = np.delete(first, rng.choice(first.size, 10, replace=False))
+    older = _publish(first, NOW_MS - 2 * tz.DAY_MS)
+    newer = _publish(np.concatenate([kept, recent, late]), NOW_MS)
+    return older, newer
+
+
+def test_delta_round_trip():
+    """For each delta kind, the previous response patched with the delta equals a full response."""
+    print("Testing since deltas...")
+    older, newer = _two_versions()
+    for kind in deltas.KINDS:
+        before = deltas.bucket_delta(older, kind, SINCE_START, now_ms=NOW_MS - 2 * tz.DAY_MS)
+        delta = deltas.bucket_delta(newer, kind, before['cursor'], now_ms=NOW_MS)
+        full = deltas.bucket_delta(newer, kind, SINCE_START, now_ms=NOW_MS)
+        assert not delta['full'] and delta['cursor'] == f"{deltas.BOOT_TOKEN}:{newer.version}", kind
+        assert 0 < len(delta['rows']) < len(full['rows']), kind
+
+        rows = dict(before['rows'])
+        rows.update(dict(delta['rows']))
+        dense = deltas.KINDS[kind][2]
+        if not dense:
+            # Sparse kinds report emptied buckets with a zero count
+            rows = {label: count for label, count in rows.items() if count}
+        assert sorted(rows.items()) == sorted(map(tuple, full['rows'])), kind
+        print(f"✓ {kind}: {len(delta['rows'])} delta rows rebuild all {len(full['rows'])} rows")
+
+
+def test_foreign_cursor_is_full():
+    """A cursor from another process, or a bare version, gets the full table even when its version matches."""
+    print("\nTesting cursors from before a restart...")
+    _, newer = _two_versions()
+    full = deltas.bucket_delta(newer, '15min', SINCE_START, now_ms=NOW_MS)
+    current = deltas.bucket_delta(newer, '15min', full['cursor'], now_ms=NOW_MS)
+    assert not current['full'] and current['rows'] == [], current['rows'][:3]
+    other = 'ffffffff' if deltas.BOOT_TOKEN != 'ffffffff' else '00000000'
+    for cursor in (f"{other}:{newer.version}", str(newer.version)):
+        delta = deltas.bucket_delta(newer, '15min', cursor, now_ms=NOW_MS)
+        assert delta['full'] and delta['rows'] == full['rows'], cursor
+    print("✓ foreign and bare cursors get the full table")
+
+
+def main_test():
+    """Run all tests."""
+    print("=" * 60)
+    print("BUCKET DELTA TEST SUITE")
+    print("=" * 60)
+
+    tests = [("Delta Round Trip", test_delta_round_trip), ("Foreign Cursor", test_foreign_cursor_is_full)]
+    results = []
+    for name, test in tests:
+        try:
+            test()
+            results.append((name, True))
+        except AssertionError as e:
+            print(f"✗ {name} failed: {e}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    for name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{name:.<40} {status}")
+    passed = sum(1 for _, p in results if p)
+    print("=" * 60)
+    print(f"TOTAL: {passed}/{len(results)} tests passed")
+    print("=" * 60)
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main_test())
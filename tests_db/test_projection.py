@@ -0,0 +1,65 @@
+"""Check that a renewed snapshot is projected as of its new fetch time instead of from the cache."""
+import sys
+import time
+
+import numpy as np
+
+from src import buckets, projection, snapshot, tz
+
+HANDLE = 'projection_check'
+
+
+def _publish(epoch_ms: np.ndarray, fetched_at: float) -> snapshot.Snapshot:
+    utc_bytes = '\n'.join(['timestamp', *tz.iso_ms(epoch_ms, utc=True).tolist()]).encode() + b'\n'
+    return snapshot.publish('polymarket', b'', utc_bytes, b'', handle=HANDLE, fetched_at=fetched_at)
+
+
+def _fetch_time(now_ms: int) -> float:
+    """Three hours ago, or just after the last noon ET if sooner, so renew stays within one market day."""
+    local = int(tz.local_ms([now_ms])[0])
+    last_noon_wall = (local - 12 * tz.HOUR_MS) // tz.DAY_MS * tz.DAY_MS + 12 * tz.HOUR_MS
+    last_noon_ms = int(tz.localize_ms([last_noon_wall])[0])
+    return max(now_ms - 3 * tz.HOUR_MS, last_noon_ms + 1000) / 1000
+
+
+def test_projection_follows_renew():
+    """Project, renew, project again: the second projection is as of the renewed fetch time."""
+    print("Testing projection after renew...")
+    now_ms = int(time.time() * 1000)
+    rng = np.random.default_rng(48)
+    epoch_ms = np.sort(rng.integers(now_ms - 30 * tz.DAY_MS, now_ms - 4 * tz.HOUR_MS, 3000))
+    snap = _publish(epoch_ms, _fetch_time(now_ms))
+
+    first = projection.cached_projection(snap, simulations=1000)
+    assert projection.cached_projection(snap, simulations=1000) is first
+    renewed = snapshot.renew(snap)
+    assert renewed is not None and renewed.version == snap.version and renewed.fetched_at > snap.fetched_at
+
+    second = projection.cached_projection(renewed, simulations=1000)
+    assert second is not first
+    assert second['as_of_et'] == str(buckets.iso_labels([int(renewed.fetched_at * 1000)])[0]), second['as_of_et']
+    assert second['as_of_et'] != first['as_of_et'], first['as_of_et']
+    print(f"✓ as_of_et moved from {first['as_of_et']} to {second['as_of_et']}")
+
+
+def main_test():
+    """Run all tests."""
+    print("=" * 60)
+    print("PROJECTION CACHE TEST SUITE")
+    print("=" * 60)
+
+    try:
+        test_projection_follows_renew()
+        passed = True
+    except AssertionError as e:
+        print(f"✗ Projection after renew failed: {e}")
+        passed = False
+
+    print("\n" + "=" * 60)
+    print(f"{'Projection After Renew':.<40} {'✓ PASS' if passed else '✗ FAIL'}")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main_test())
@@ -0,0 +1,99 @@
+"""Check that sanitizing a raw export in parallel chunks gives the same CSV as one serial pass."""
+import random
+import sys
+
+from src import records
+
+HEADER = 'id,text,created_at'
+# Line breaks that str.splitlines honours inside tweet text
+BREAKS = ['\n', '\r\n', '\r', '\x0b', ' ', '\x85']
+
+
+def _raw_export(rows: int = 3000, seed: int = 7) -> str:
+    """A raw export like XTracker's: multi-line texts, quotes, commas and digit-led continuation lines."""
+    rng = random.Random(seed)
+    lines = [HEADER]
+    for i in range(rows):
+        tweet_id = 1_900_000_000_000_000_000 + i * 7919
+        text = f'tweet {i}, with a comma'
+        if i % 5 == 0:
+            text += rng.choice(BREAKS) + f'continued "quoted" {i}'
+        if i % 11 == 0:
+            # Starts with digits but is not an id, so it stays part of the record above
+            text += '\n2024 was a year'
+        lines.append(f'{tweet_id},{text},"2025-01-01T00:00:{i % 60:02d}.000Z"')
+    return '\n'.join(lines) + '\n'
+
+
+def test_split_cuts_at_record_starts():
+    """Pieces rejoin to the input and every piece after the first starts with a record id."""
+    print("Testing split_records...")
+    text = _raw_export()
+    for parts in (1, 2, 3, 8, 64):
+        pieces = records.split_records(text, parts)
+        assert ''.join(pieces) == text, parts
+        assert 1 <= len(pieces) <= parts, (parts, len(pieces))
+        assert all(records._ID_LINE.match(piece) for piece in pieces[1:]), parts
+    print("✓ split_records cuts only before record lines")
+
+
+def test_chunked_matches_serial():
+    """Joining sanitize_lines over the pieces reproduces sanitizing the whole text."""
+    print("\nTesting chunked sanitize against the serial pass...")
+    text = _raw_export()
+    serial = records.sanitize_lines(text)
+    for parts in (2, 3, 8, 64):
+        pieces = records.split_records(text, parts)
+        chunked = ''.join(records.sanitize_lines(piece, has_header=i == 0) for i, piece in enumerate(pieces))
+        assert chunked == serial, parts
+    print("✓ chunked output is identical for 2 to 64 pieces")
+
+
+def test_pool_matches_serial():
+    """sanitize_text through the process pool gives the serial output."""
+    print("\nTesting sanitize_text with a process pool...")
+    text = _raw_export()
+    previous = records.PARALLEL_MIN_CHARS
+    records.PARALLEL_MIN_CHARS = 0
+    try:
+        assert records.sanitize_text(text, workers=2) == records.sanitize_lines(text)
+        # A failed pool falls back to the serial pass and shuts itself down
+        assert records._pool is not None, 'the pool failed and sanitize_text fell back to one process'
+    finally:
+        records.PARALLEL_MIN_CHARS = previous
+        records.shutdown_pool()
+    print("✓ pooled output is identical to the serial pass")
+
+
+def main_test():
+    """Run all tests."""
+    print("=" * 60)
+    print("PARALLEL SANITIZE TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        ("Split Records", test_split_cuts_at_record_starts), ("Chunked Sanitize", test_chunked_matches_serial),
+        ("Process Pool", test_pool_matches_serial),
+    ]
+    results = []
+    for name, test in tests:
+        try:
+            test()
+            results.append((name, True))
+        except AssertionError as e:
+            print(f"✗ {name} failed: {e}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    for name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{name:.<40} {status}")
+    passed = sum(1 for _, p in results if p)
+    print("=" * 60)
+    print(f"TOTAL: {passed}/{len(results)} tests passed")
+    print("=" * 60)
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main_test())
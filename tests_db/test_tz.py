@@ -0,0 +1,104 @@
+"""Check the ET transition table in src/tz.py against pandas on DST transition days."""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src import tz
+
+ZONE = 'America/New_York'
+# Both sides of 2038 and the last year in the table
+YEARS = [1990, 2007, 2024, 2025, 2026, 2037, 2038, 2039, 2060, tz.HORIZON_YEAR]
+
+
+def _dst_days() -> list[pd.Timestamp]:
+    """Local midnights of the days DST starts and ends in each of YEARS."""
+    days = []
+    for year in YEARS:
+        changes = pd.date_range(f'{year}-03-01', f'{year}-11-30', freq='D', tz=ZONE)
+        offsets = np.array([ts.utcoffset().total_seconds() for ts in changes])
+        # The offset differs at the next midnight, so the change happened during the day
+        days += list(changes[:-1][np.diff(offsets) != 0])
+    return days
+
+
+def _minutes_around(day: pd.Timestamp) -> np.ndarray:
+    """Every minute (epoch ms) of the UTC span covering the local day, plus a millisecond before each hour."""
+    start = day.tz_convert('UTC').value // 1_000_000 - tz.HOUR_MS
+    minutes = np.arange(start, start + 27 * tz.HOUR_MS, tz.MINUTE_MS, dtype=np.int64)
+    return np.sort(np.concatenate([minutes, minutes[::60] - 1]))
+
+
+def test_transition_days_found():
+    """Each year in the table has one spring and one autumn transition."""
+    print("Testing DST transition days...")
+    days = _dst_days()
+    assert len(days) == 2 * len(YEARS), days
+    print(f"✓ {len(days)} transition days between {YEARS[0]} and {YEARS[-1]}")
+
+
+def test_local_time_matches_pandas():
+    """Wall-clock times, hours and ISO labels agree with a tz-aware pandas index."""
+    print("\nTesting local time against pandas...")
+    for day in _dst_days():
+        epoch_ms = _minutes_around(day)
+        index = pd.to_datetime(epoch_ms, unit='ms', utc=True).tz_convert(ZONE)
+        expected_local = index.tz_localize(None).as_unit('ms').asi8
+        assert np.array_equal(tz.local_ms(epoch_ms), expected_local), day
+        assert np.array_equal(tz.hour_of_day(epoch_ms), index.hour), day
+        expected_iso = [ts.isoformat(timespec='milliseconds') for ts in index]
+        assert tz.iso_ms(epoch_ms).tolist() == expected_iso, day
+    print(f"✓ local_ms, hour_of_day and iso_ms match pandas on {len(_dst_days())} days")
+
+
+def test_localize_matches_pandas():
+    """Wall times skipped in spring move forward to the transition; the repeated autumn hour is rejected."""
+    print("\nTesting localize_ms against pandas...")
+    for day in _dst_days():
+        wall = pd.date_range(day.tz_localize(None), periods=24 * 4, freq='15min')
+        wall_ms = wall.as_unit('ms').asi8
+        try:
+            expected = wall.tz_localize(ZONE, nonexistent='shift_forward', ambiguous='raise')
+        except Exception:
+            # Autumn: pandas refuses the repeated hour, and so must tz
+            try:
+                tz.localize_ms(wall_ms)
+            except ValueError:
+                continue
+            raise AssertionError(f"ambiguous wall times accepted on {day.date()}")
+        assert np.array_equal(tz.localize_ms(wall_ms), expected.as_unit('ms').asi8), day
+    print("✓ localize_ms matches pandas on both kinds of transition day")
+
+
+def main_test():
+    """Run all tests."""
+    print("=" * 60)
+    print("TZ TRANSITION TABLE TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        ("Transition Days", test_transition_days_found), ("Local Time", test_local_time_matches_pandas),
+        ("Localize", test_localize_matches_pandas),
+    ]
+    results = []
+    for name, test in tests:
+        try:
+            test()
+            results.append((name, True))
+        except AssertionError as e:
+            print(f"✗ {name} failed: {e}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    for name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{name:.<40} {status}")
+    passed = sum(1 for _, p in results if p)
+    print("=" * 60)
+    print(f"TOTAL: {passed}/{len(results)} tests passed")
+    print("=" * 60)
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main_test())